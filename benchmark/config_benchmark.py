@@ -0,0 +1,76 @@
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath('src')))
+
+from app.PriceCheckerConfig import PriceCheckerConfig
+
+def build_config(item_count: int, group_count: int, selector_count: int, distinct_selector_count: int, changed_share: float=0) -> str:
+    # many selector names share a definition, like sites of one shop platform
+    price_selectors = [
+        {'selector_name': f"selector_{index}", 'full_price_selector': f"div#app div.product-price-{index % distinct_selector_count} > ul > li.price-current > strong"}
+        for index in range(selector_count)
+    ]
+    special_tweaks = [{'tweak_name': f"tweak_{index}", 'cookies': [{'currency': 'CAD'}]} for index in range(selector_count // 10)]
+    items_per_group = max(1, item_count // group_count)
+    changed_count = int(item_count * changed_share)
+    item_groups = []
+    for group_index in range((item_count + items_per_group - 1) // items_per_group):
+        items = []
+        for item_index in range(group_index * items_per_group, min(item_count, (group_index + 1) * items_per_group)):
+            item = {
+                'name': f"Item {item_index}",
+                'url': f"https://www.site{item_index % selector_count}.com/product/{item_index}" + ('?changed' if item_index < changed_count else ''),
+                'price_selector': f"selector_{item_index % selector_count}"
+            }
+            if item_index % 10 == 0:
+                item['special_tweak'] = f"tweak_{item_index % len(special_tweaks)}"
+            items.append(item)
+        item_groups.append({'group_name': f"Group {group_index}", 'items': items})
+    return yaml.safe_dump({'price_selectors': price_selectors, 'special_tweaks': special_tweaks, 'item_groups': item_groups}, sort_keys=False)
+
+def load(config_text: str, previous_config: PriceCheckerConfig=None) -> tuple[PriceCheckerConfig, float]:
+    start = time.perf_counter()
+    config = PriceCheckerConfig(io.StringIO(config_text), previous_config)
+    return config, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark loading and reloading a large config file')
+    parser.add_argument('--items', dest='items', type=int, default=20000, help='Number of items')
+    parser.add_argument('--groups', dest='groups', type=int, default=500, help='Number of item groups')
+    parser.add_argument('--selectors', dest='selectors', type=int, default=500, help='Number of price selectors')
+    parser.add_argument('--distinct-selectors', dest='distinct_selectors', type=int, default=50, help='Number of distinct price selector definitions')
+    parser.add_argument('--changed-share', dest='changed_share', type=float, default=0.01, help='Share of items changed before the reload')
+    args = parser.parse_args()
+
+    config_text = build_config(args.items, args.groups, args.selectors, args.distinct_selectors)
+    changed_config_text = build_config(args.items, args.groups, args.selectors, args.distinct_selectors, args.changed_share)
+    yaml_start = time.perf_counter()
+    yaml.load(config_text, Loader=yaml.SafeLoader)
+    yaml_seconds = time.perf_counter() - yaml_start
+
+    config, load_seconds = load(config_text)
+    # memory is measured in a separate load, tracing slows loading down
+    tracemalloc.start()
+    traced_config, _ = load(config_text)
+    config_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced_config
+    _, unchanged_reload_seconds = load(config_text, config)
+    changed_config, changed_reload_seconds = load(changed_config_text, config)
+
+    print(f"Config with {args.items} items in {args.groups} groups, {len(config_text) / 1024 / 1024:.1f} MiB of YAML")
+    print(f"Pure python YAML parse:  {yaml_seconds:8.2f} s")
+    print(f"Load:                    {load_seconds:8.2f} s")
+    print(f"Reload, unchanged:       {unchanged_reload_seconds:8.2f} s")
+    print(f"Reload, changed:         {changed_reload_seconds:8.2f} s, {changed_config.config_diff.summary()}")
+    print(f"Config model memory:     {config_bytes / 1024 / 1024:8.1f} MiB")
+    print(f"Price selector instances: {len(set(map(id, config.price_selectors.values())))} for {len(config.price_selectors)} names")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from pyquery import PyQuery
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath('src')))
+
+from model.PriceSelector import PriceSelector
+
+SELECTOR = 'div#app div.product-price > ul > li.price-current > strong'
+
+def build_page(size: int, price_position: float, with_json_ld: bool) -> bytes:
+    # void tags without closing slash keep the page from being valid XML, like real retailer pages
+    filler = '<div class="review"><p>Lorem ipsum dolor sit amet,<br> consectetur adipiscing elit.</p><img src="star.png"><span>5 stars</span></div>\n'
+    filler_count = size // len(filler)
+    before = int(filler_count * price_position)
+    json_ld = '<script type="application/ld+json">{"@type": "Product", "offers": {"@type": "Offer", "price": "1299.99"}}</script>' if with_json_ld else ''
+    page = (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Product</title>{json_ld}</head><body><div id=\"app\">"
+        + filler * before
+        + '<div class="product-price"><ul><li class="price-current">$<strong>1,299</strong><sup>.99</sup></li></ul></div>'
+        + filler * (filler_count - before)
+        + '</div></body></html>'
+    )
+    return page.encode('utf-8')
+
+def legacy_scrape(page: bytes) -> float:
+    # the extraction path used before compiled selectors: full PyQuery DOM over the decoded page
+    text = PyQuery(page.decode('utf-8'))(SELECTOR).eq(0).text()
+    return float(text.replace(',', ''))
+
+def run(strategy: str, page: bytes, rounds: int, queue: multiprocessing.Queue) -> None:
+    if strategy == 'legacy':
+        scrape = legacy_scrape
+    else:
+        price_selector = PriceSelector(full_price_selector=SELECTOR, use_structured_data=(strategy == 'structured'))
+        scrape = price_selector.scrape_price
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.process_time()
+    for _ in range(rounds):
+        scrape(page)
+    cpu = (time.process_time() - start) / rounds
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((cpu, rss_after - rss_before))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark price extraction per page')
+    parser.add_argument('--page-size', dest='page_size', type=int, default=2 * 1024 * 1024, help='Page size in bytes')
+    parser.add_argument('--price-position', dest='price_position', type=float, default=0.05, help='Relative position of the price in the page, from 0 to 1')
+    parser.add_argument('--rounds', dest='rounds', type=int, default=20, help='Number of pages to parse per strategy')
+    args = parser.parse_args()
+    page = build_page(args.page_size, args.price_position, with_json_ld=True)
+    print(f"Page size: {len(page) / 1024:.0f} KiB, price position: {args.price_position}, rounds: {args.rounds}")
+    for strategy in ('legacy', 'selector', 'structured'):
+        # each strategy runs in a fresh process so peak RSS is not shared between them
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run, args=(strategy, page, args.rounds, queue))
+        process.start()
+        cpu, rss = queue.get()
+        process.join()
+        print(f"{strategy:>10}: {cpu * 1000:8.2f} ms CPU per page, {rss / 1024:8.1f} MiB peak RSS growth")
+
+if __name__ == '__main__':
+    main()
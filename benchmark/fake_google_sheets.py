@@ -0,0 +1,156 @@
+import re
+from collections import Counter
+from gspread.utils import a1_range_to_grid_range
+
+RANGE_PATTERN = re.compile(r"^'((?:[^']|'')*)'!(.*)$")
+
+class FakeResponse(object):
+    def __init__(self, body: dict, status_code: int=200):
+        self.body = body
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = str(body)
+
+    def json(self) -> dict:
+        return self.body
+
+class FakeSheet(object):
+    def __init__(self, sheet_id: int, title: str, row_count: int, col_count: int):
+        self.sheet_id = sheet_id
+        self.title = title
+        self.row_count = row_count
+        self.col_count = col_count
+        self.rows: list[list[object]] = []
+
+    def properties(self) -> dict:
+        return {'sheetId': self.sheet_id, 'title': self.title, 'gridProperties': {'rowCount': self.row_count, 'columnCount': self.col_count}}
+
+    def set_cell(self, row: int, col: int, value: object) -> None:
+        if row >= self.row_count or col >= self.col_count:
+            raise IndexError(f"Cell ({row}, {col}) is out of grid ({self.row_count}, {self.col_count}) in sheet: {self.title}")
+        while len(self.rows) <= row:
+            self.rows.append([])
+        cells = self.rows[row]
+        while len(cells) <= col:
+            cells.append(None)
+        cells[col] = value
+
+class FakeSheetsSession(object):
+    """
+    In-memory stand-in for the Google Sheets API, used as the session of a `gspread.Client`.
+    Supports the calls used by `GoogleSheetExporter` and counts every call by endpoint.
+    """
+    def __init__(self, spreadsheet_id: str, title: str='Fake Spreadsheet'):
+        self.spreadsheet_id = spreadsheet_id
+        self.title = title
+        self.sheets: dict[str, FakeSheet] = {}
+        self.calls: Counter = Counter()
+        self.headers = {}
+
+    def get(self, url: str, params: dict=None, **kwargs) -> FakeResponse:
+        if url.endswith('/values:batchGet'):
+            self.calls['values.batchGet'] += 1
+            return FakeResponse({'valueRanges': [self.__get_range(range_name) for range_name in params['ranges']]})
+        if '/values/' in url:
+            self.calls['values.get'] += 1
+            return FakeResponse(self.__get_range(url.split('/values/', 1)[1]))
+        self.calls['spreadsheets.get'] += 1
+        params = params or {}
+        if 'ranges' not in params:
+            return FakeResponse({
+                'spreadsheetId': self.spreadsheet_id,
+                'properties': {'title': self.title},
+                'sheets': [{'properties': sheet.properties()} for sheet in self.sheets.values()]
+            })
+        # only the sheets of the ranges are returned, with their cells if `includeGridData` is set
+        sheets = []
+        for range_name in params['ranges']:
+            sheet = self.sheets.get(self.__range_title(range_name), None)
+            if sheet is None:
+                return FakeResponse({'error': f"Unable to parse range: {range_name}"}, 400)
+            sheet_data = {'properties': sheet.properties()}
+            if params.get('includeGridData', 'false') == 'true':
+                values = self.__get_range(range_name)['values']
+                sheet_data['data'] = [{'rowData': [{'values': [{'formattedValue': str(cell)} if cell != '' else {} for cell in row]} for row in values]}]
+            sheets.append(sheet_data)
+        return FakeResponse({'spreadsheetId': self.spreadsheet_id, 'properties': {'title': self.title}, 'sheets': sheets})
+
+    def post(self, url: str, json: dict=None, **kwargs) -> FakeResponse:
+        if url.endswith(':batchUpdate'):
+            self.calls['spreadsheets.batchUpdate'] += 1
+            replies = [self.__apply(request) for request in json['requests']]
+            return FakeResponse({'spreadsheetId': self.spreadsheet_id, 'replies': replies})
+        self.calls[f"post {url}"] += 1
+        return FakeResponse({'error': f"Unsupported call: {url}"}, 400)
+
+    def put(self, url: str, **kwargs) -> FakeResponse:
+        self.calls[f"put {url}"] += 1
+        return FakeResponse({'error': f"Unsupported call: {url}"}, 400)
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def __get_range(self, range_name: str) -> dict:
+        grid_range = a1_range_to_grid_range(RANGE_PATTERN.match(range_name).group(2))
+        sheet = self.sheets[self.__range_title(range_name)]
+        start_row, end_row = grid_range.get('startRowIndex', 0), grid_range.get('endRowIndex', len(sheet.rows))
+        start_col, end_col = grid_range.get('startColumnIndex', 0), grid_range.get('endColumnIndex', None)
+        values = []
+        for row in sheet.rows[start_row:end_row]:
+            cells = ['' if cell is None else cell for cell in row[start_col:end_col]]
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return {'range': range_name, 'majorDimension': 'ROWS', 'values': values}
+
+    def __range_title(self, range_name: str) -> str:
+        return RANGE_PATTERN.match(range_name).group(1).replace("''", "'")
+
+    def __apply(self, request: dict) -> dict:
+        (kind, body), = request.items()
+        if kind == 'addSheet':
+            properties = body['properties']
+            if any(title.lower() == properties['title'].lower() for title in self.sheets):
+                raise ValueError(f"A sheet with the name \"{properties['title']}\" already exists")
+            grid = properties.get('gridProperties', {})
+            sheet_id = properties.get('sheetId', len(self.sheets) + 1)
+            self.sheets[properties['title']] = FakeSheet(sheet_id, properties['title'], grid.get('rowCount', 1000), grid.get('columnCount', 26))
+            return {'addSheet': {'properties': self.sheets[properties['title']].properties()}}
+        sheet = self.__sheet_by_id(body['sheetId'] if 'sheetId' in body else body['start']['sheetId'])
+        if kind == 'appendDimension':
+            if body['dimension'] == 'ROWS':
+                sheet.row_count += body['length']
+            else:
+                sheet.col_count += body['length']
+        elif kind == 'updateCells':
+            start = body['start']
+            for row_offset, row in enumerate(body['rows']):
+                for col_offset, cell in enumerate(row['values']):
+                    sheet.set_cell(start['rowIndex'] + row_offset, start['columnIndex'] + col_offset, self.__value(cell))
+        elif kind == 'appendCells':
+            for row in body['rows']:
+                row_index = len(sheet.rows)
+                if row_index >= sheet.row_count:
+                    sheet.row_count = row_index + 1
+                for col, cell in enumerate(row['values']):
+                    sheet.set_cell(row_index, col, self.__value(cell))
+                if not sheet.rows[row_index:]:
+                    sheet.rows.append([])
+        else:
+            raise ValueError(f"Unsupported request: {kind}")
+        return {}
+
+    def __sheet_by_id(self, sheet_id: int) -> FakeSheet:
+        for sheet in self.sheets.values():
+            if sheet.sheet_id == sheet_id:
+                return sheet
+        raise KeyError(f"No sheet with id: {sheet_id}")
+
+    def __value(self, cell: dict) -> object:
+        value = cell.get('userEnteredValue', None)
+        if value is None:
+            return None
+        (_, raw_value), = value.items()
+        return raw_value
@@ -0,0 +1,131 @@
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from extraction_benchmark import build_page
+
+# the price is filled in by a first party script, the page also references resources a browser should not load
+RENDERED_PAGE = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>Product</title>
+<link rel="preload" href="/static/font.woff2" as="font" crossorigin>
+<script src="/static/price.js"></script>
+<script src="http://localhost:{port}/static/tracker.js"></script>
+</head><body><div id="app"><img src="/static/product.png">
+<div class="product-price"><ul><li class="price-current">$<strong></strong><sup></sup></li></ul></div>
+</div></body></html>"""
+PRICE_SCRIPT = """document.addEventListener('DOMContentLoaded', function () {
+  setTimeout(function () {
+    document.querySelector('li.price-current > strong').textContent = '1,299';
+    document.querySelector('li.price-current > sup').textContent = '.99';
+  }, 50);
+});"""
+
+class FakeRetailerServer(object):
+    """
+    Local HTTP server serving product pages with configurable latency, failures and rate limiting.
+    It listens on all loopback addresses, so items spread over 127.0.0.x hosts are treated as different sites.
+    Pages under `/rendered/` only have a price after their scripts ran. `/stats` returns request counts by path.
+    Product page requests in flight and their start times are also recorded per `Host` header.
+    """
+    def __init__(self,
+                 port: int=0,
+                 page_size: int=512 * 1024,
+                 latency: float=0.05,
+                 failure_rate: float=0,
+                 rate_limit_rate: float=0,
+                 retry_after: int=1):
+        self.page = build_page(page_size, 0.05, with_json_ld=True)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.server = ThreadingHTTPServer(('', port), self.__handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.rendered_page = RENDERED_PAGE.format(port=self.port).encode('utf-8')
+        self.request_counts = Counter()
+        self.active_requests = Counter()
+        self.max_active_requests = Counter()
+        self.max_active_total = 0
+        self.request_starts: dict[str, list[float]] = {}
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        threading.Thread(target=self.server.serve_forever, name='fake-retailer', daemon=True).start()
+
+    def serve_forever(self) -> None:
+        self.server.serve_forever()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+    def __handler(self):
+        fake_server = self
+
+        class ProductPageHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/stats':
+                    with fake_server.lock:
+                        self.__send(200, json.dumps(fake_server.request_counts).encode('utf-8'), {'content-type': 'application/json'})
+                    return
+                with fake_server.lock:
+                    fake_server.request_counts['/rendered/' if path.startswith('/rendered/') else '/product/' if path.startswith('/product/') else path] += 1
+                if path == '/static/price.js':
+                    self.__send(200, PRICE_SCRIPT.encode('utf-8'), {'content-type': 'application/javascript'})
+                    return
+                if path.startswith('/static/'):
+                    self.__send(200, b'', {'content-type': 'application/octet-stream'})
+                    return
+                host = self.headers.get('host', '')
+                with fake_server.lock:
+                    fake_server.active_requests[host] += 1
+                    fake_server.max_active_requests[host] = max(fake_server.max_active_requests[host], fake_server.active_requests[host])
+                    fake_server.max_active_total = max(fake_server.max_active_total, sum(fake_server.active_requests.values()))
+                    fake_server.request_starts.setdefault(host, []).append(time.monotonic())
+                try:
+                    if fake_server.latency > 0:
+                        time.sleep(fake_server.latency)
+                    dice = random.random()
+                    if dice < fake_server.rate_limit_rate:
+                        self.__send(429, b'', {'retry-after': str(fake_server.retry_after)})
+                    elif dice < fake_server.rate_limit_rate + fake_server.failure_rate:
+                        self.__send(503, b'')
+                    else:
+                        page = fake_server.rendered_page if path.startswith('/rendered/') else fake_server.page
+                        self.__send(200, page, {'content-type': 'text/html; charset=utf-8'})
+                finally:
+                    with fake_server.lock:
+                        fake_server.active_requests[host] -= 1
+
+            def __send(self, status: int, body: bytes, headers: dict[str, str]=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('content-length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ProductPageHandler
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake retailer server')
+    parser.add_argument('--port', dest='port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--page-size', dest='page_size', type=int, default=512 * 1024, help='Product page size in bytes')
+    parser.add_argument('--latency', dest='latency', type=float, default=0.05, help='Seconds to wait before each response')
+    parser.add_argument('--failure-rate', dest='failure_rate', type=float, default=0, help='Share of responses with HTTP 503')
+    parser.add_argument('--rate-limit-rate', dest='rate_limit_rate', type=float, default=0, help='Share of responses with HTTP 429')
+    args = parser.parse_args()
+    server = FakeRetailerServer(args.port, args.page_size, args.latency, args.failure_rate, args.rate_limit_rate)
+    print(f"Serving fake product pages on port: {server.port}")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
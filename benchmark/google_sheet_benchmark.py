@@ -0,0 +1,49 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+import gspread
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath('src')))
+
+from exporter.GoogleSheetExporter import GoogleSheetExporter
+from fake_google_sheets import FakeSheetsSession
+from model.Item import Item
+from model.ItemGroup import ItemGroup
+from model.PriceSelector import PriceSelector
+
+def build_item_groups(group_count: int, item_count: int) -> list[ItemGroup]:
+    price_selector = PriceSelector(full_price_selector='span.price')
+    item_groups = []
+    for group_index in range(group_count):
+        item_group = ItemGroup(f"Group {group_index}")
+        for item_index in range(item_count):
+            item_group.add(Item(f"Item {group_index}-{item_index}", f"http://localhost/{group_index}/{item_index}", price_selector, price=100 + item_index))
+        item_groups.append(item_group)
+    return item_groups
+
+def main():
+    parser = argparse.ArgumentParser(description='Count Google Sheets API calls of GoogleSheetExporter against a fake Sheets API')
+    parser.add_argument('--groups', dest='groups', type=int, default=50, help='Number of item groups')
+    parser.add_argument('--items', dest='items', type=int, default=10, help='Number of items per group')
+    parser.add_argument('--runs', dest='runs', type=int, default=3, help='Number of exports')
+    parser.add_argument('--no-layout-cache', dest='layout_cache', action='store_false', help='Export without the worksheet layout cache file')
+    args = parser.parse_args()
+    item_groups = build_item_groups(args.groups, args.items)
+    session = FakeSheetsSession('fake_spreadsheet_id')
+    with tempfile.NamedTemporaryFile(suffix='.json') as key_file, tempfile.TemporaryDirectory() as state_dir:
+        layout_cache_file = Path(state_dir).joinpath('layout_cache.json') if args.layout_cache else None
+        exporter = GoogleSheetExporter(key_file.name, 'fake_spreadsheet_id', layout_cache_file)
+        exporter.gspread_client = gspread.Client(None, session=session)
+        for run in range(args.runs):
+            session.calls.clear()
+            start = time.perf_counter()
+            exporter.export_data(item_groups)
+            elapsed = time.perf_counter() - start
+            print(f"Run {run + 1}: {session.total_calls()} API calls {dict(session.calls)} for {args.groups} groups in {elapsed * 1000:.1f} ms")
+    rows = [len(sheet.rows) for sheet in session.sheets.values()]
+    print(f"Worksheets: {len(session.sheets)}, rows per worksheet: {min(rows)}-{max(rows)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import queue
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+import gspread
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.joinpath('src')))
+
+from app.PriceChecker import PriceChecker
+from app.PriceCheckerConfig import PriceCheckerConfig
+from exporter.GoogleSheetExporter import GoogleSheetExporter
+from fake_google_sheets import FakeSheetsSession
+from fake_retailer_server import FakeRetailerServer
+from shard.ShardCoordinator import ShardCoordinator
+
+SELECTOR = 'div#app div.product-price > ul > li.price-current > strong'
+
+RESULT_POLL_TIMEOUT = 1
+
+def build_config(work_dir: Path, port: int, item_count: int, args: argparse.Namespace) -> dict:
+    key_file = work_dir.joinpath('service_account.json')
+    key_file.touch()
+    items_per_group = max(1, item_count // args.groups)
+    item_groups = []
+    for group_index in range((item_count + items_per_group - 1) // items_per_group):
+        items = []
+        for item_index in range(group_index * items_per_group, min(item_count, (group_index + 1) * items_per_group)):
+            # every 127.0.0.x address is a different host for the per-host concurrency limit
+            host = f"127.0.0.{item_index % args.hosts + 1}"
+            if item_index < item_count * args.rendered_share:
+                items.append({'name': f"Item {item_index}", 'url': f"http://{host}:{port}/rendered/{item_index}", 'price_selector': 'rendered_selector'})
+            else:
+                items.append({'name': f"Item {item_index}", 'url': f"http://{host}:{port}/product/{item_index}", 'price_selector': 'benchmark_selector'})
+        item_groups.append({'group_name': f"Group {group_index}", 'items': items})
+    price_fetcher = {
+        'max_concurrency': args.max_concurrency,
+        'max_concurrency_per_host': args.max_concurrency_per_host,
+        'max_retry_delay': 5,
+        'retry_budget': 600
+    }
+    if args.parse_processes:
+        price_fetcher['parse_pool'] = {'processes': args.parse_processes}
+    price_selectors = [{'selector_name': 'benchmark_selector', 'full_price_selector': SELECTOR}]
+    if args.rendered_share > 0:
+        price_fetcher['browser'] = {'max_pages': args.browser_pages}
+        price_selectors.append({'selector_name': 'rendered_selector', 'full_price_selector': SELECTOR, 'render_javascript': True})
+    config = {
+        'price_selectors': price_selectors,
+        'special_tweaks': [],
+        'price_fetcher': price_fetcher,
+        'item_groups': item_groups,
+        'data_exporters': [
+            {'type': 'csv', 'csv_file_directory': str(work_dir.joinpath('csv'))},
+            {'type': 'google_sheet', 'google_service_account_key_file': str(key_file), 'spreadsheet_id': 'benchmark_spreadsheet_id'}
+        ]
+    }
+    if args.workers:
+        config['sharding'] = {'workers': args.workers}
+        if args.shard_queue == 'sqlite':
+            config['sharding']['queue_file'] = str(work_dir.joinpath('shard_queue.db'))
+    return config
+
+def serve_retailer(args: argparse.Namespace, result_queue: multiprocessing.Queue) -> None:
+    # the server is created in its own process, so it works with any multiprocessing start method
+    server = FakeRetailerServer(0, args.page_size, args.latency, args.failure_rate, args.rate_limit_rate)
+    result_queue.put(server.port)
+    server.serve_forever()
+
+def run_scale(item_count: int, port: int, args: argparse.Namespace, result_queue: multiprocessing.Queue) -> None:
+    logging.basicConfig(level=logging.ERROR)
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_file = Path(work_dir).joinpath('config.yaml')
+        config_file.write_text(yaml.safe_dump(build_config(Path(work_dir), port, item_count, args)))
+        load_start = time.perf_counter()
+        with config_file.open('r') as file:
+            config = PriceCheckerConfig(file)
+        load_seconds = time.perf_counter() - load_start
+        sheets_session = FakeSheetsSession('benchmark_spreadsheet_id')
+        for data_exporter in config.data_exporters:
+            if isinstance(data_exporter, GoogleSheetExporter):
+                data_exporter.gspread_client = gspread.Client(None, session=sheets_session)
+        shard_coordinator = ShardCoordinator.from_config(config_file, config) if config.shard_workers else None
+        start = time.perf_counter()
+        try:
+            PriceChecker(config, shard_coordinator).run()
+        finally:
+            if shard_coordinator:
+                shard_coordinator.close()
+            config.price_fetcher.close()
+        wall_seconds = time.perf_counter() - start
+        items = [item for item_group in config.item_groups for item in item_group.items]
+        result_queue.put({
+            'items': item_count,
+            'load_seconds': load_seconds,
+            'wall_seconds': wall_seconds,
+            'throughput': item_count / wall_seconds,
+            'failed': sum(1 for item in items if item.price is None),
+            'rendered': sum(1 for item in items if item.fetch_status == 'rendered'),
+            'retries': sum(max(0, item.fetch_attempts - 1) for item in items),
+            # largest of this process and its shard workers or parse pool workers
+            'peak_rss_mib': max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024,
+            'sheets_api_calls': sheets_session.total_calls()
+        })
+
+def wait_for_result(process: multiprocessing.Process, result_queue: multiprocessing.Queue, timeout: float):
+    """
+    Returns the result the process put in the queue, or raises if the process exits without one or takes longer than `timeout`.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return result_queue.get(timeout=RESULT_POLL_TIMEOUT)
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            # the result may have been put right before the process exited
+            try:
+                return result_queue.get(timeout=RESULT_POLL_TIMEOUT)
+            except queue.Empty:
+                raise Exception(f"Benchmark process: {process.name} exited with code: {process.exitcode} without a result")
+        if time.monotonic() >= deadline:
+            process.terminate()
+            raise Exception(f"Benchmark process: {process.name} did not finish in {timeout} seconds")
+
+def check_regressions(results: list[dict], baseline: dict[str, dict], max_regression: float) -> list[str]:
+    regressions = []
+    for result in results:
+        baseline_result = baseline.get(str(result['items']), None)
+        if baseline_result is None:
+            continue
+        if result['throughput'] < baseline_result['throughput'] * (1 - max_regression):
+            regressions.append(f"{result['items']} items: throughput {result['throughput']:.1f} items/s, baseline {baseline_result['throughput']:.1f} items/s")
+        if result['peak_rss_mib'] > baseline_result['peak_rss_mib'] * (1 + max_regression):
+            regressions.append(f"{result['items']} items: peak RSS {result['peak_rss_mib']:.1f} MiB, baseline {baseline_result['peak_rss_mib']:.1f} MiB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the full price check pipeline against a local fake retailer server')
+    parser.add_argument('--items', dest='items', type=int, nargs='+', default=[10, 1000, 10000], help='Number of items per scale')
+    parser.add_argument('--groups', dest='groups', type=int, default=50, help='Number of item groups')
+    parser.add_argument('--hosts', dest='hosts', type=int, default=50, help='Number of distinct hosts')
+    parser.add_argument('--max-concurrency', dest='max_concurrency', type=int, default=64, help='price_fetcher.max_concurrency')
+    parser.add_argument('--max-concurrency-per-host', dest='max_concurrency_per_host', type=int, default=2, help='price_fetcher.max_concurrency_per_host')
+    parser.add_argument('--parse-processes', dest='parse_processes', type=int, default=0, help='price_fetcher.parse_pool.processes, 0 to scrape prices in the fetching threads')
+    parser.add_argument('--rendered-share', dest='rendered_share', type=float, default=0, help='Share of items whose price is rendered by JavaScript, requires playwright')
+    parser.add_argument('--browser-pages', dest='browser_pages', type=int, default=2, help='price_fetcher.browser.max_pages')
+    parser.add_argument('--workers', dest='workers', type=int, default=0, help='sharding.workers, 0 to fetch in the benchmark process')
+    parser.add_argument('--shard-queue', dest='shard_queue', choices=['memory', 'sqlite'], default='memory', help='Queue between shard coordinator and workers')
+    parser.add_argument('--page-size', dest='page_size', type=int, default=512 * 1024, help='Product page size in bytes')
+    parser.add_argument('--latency', dest='latency', type=float, default=0.05, help='Seconds the server waits before each response')
+    parser.add_argument('--failure-rate', dest='failure_rate', type=float, default=0.01, help='Share of responses with HTTP 503')
+    parser.add_argument('--rate-limit-rate', dest='rate_limit_rate', type=float, default=0.01, help='Share of responses with HTTP 429')
+    parser.add_argument('--timeout', dest='timeout', type=float, default=3600, help='Seconds to wait for each scale before failing the benchmark')
+    parser.add_argument('--save-baseline', dest='save_baseline', type=Path, help='Write the results to this JSON file, to compare later runs with `--baseline`')
+    parser.add_argument('--baseline', dest='baseline', type=Path, help='Exit with code 1 if throughput or peak RSS of a scale is worse than in this JSON file')
+    parser.add_argument('--max-regression', dest='max_regression', type=float, default=0.2, help='Share by which a result may be worse than the baseline')
+    args = parser.parse_args()
+
+    # the server runs in its own process, so it does not count towards CPU time and peak RSS of the pipeline
+    server_queue = multiprocessing.Queue()
+    server_process = multiprocessing.Process(target=serve_retailer, args=(args, server_queue), name='fake-retailer', daemon=True)
+    server_process.start()
+    results = []
+    try:
+        port = wait_for_result(server_process, server_queue, args.timeout)
+        print(f"{'items':>8} {'load s':>8} {'wall s':>8} {'items/s':>8} {'failed':>7} {'rendered':>9} {'retries':>8} {'RSS MiB':>8} {'Sheets calls':>13}")
+        for item_count in args.items:
+            result_queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run_scale, args=(item_count, port, args, result_queue), name=f"scale-{item_count}")
+            process.start()
+            result = wait_for_result(process, result_queue, args.timeout)
+            process.join()
+            results.append(result)
+            print(f"{result['items']:>8} {result['load_seconds']:>8.2f} {result['wall_seconds']:>8.2f} {result['throughput']:>8.1f} {result['failed']:>7} {result['rendered']:>9} {result['retries']:>8} {result['peak_rss_mib']:>8.1f} {result['sheets_api_calls']:>13}")
+    finally:
+        server_process.terminate()
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps({str(result['items']): result for result in results}, indent=2))
+        print(f"Saved baseline: {args.save_baseline}")
+    if args.baseline:
+        regressions = check_regressions(results, json.loads(args.baseline.read_text()), args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against baseline: {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import logging
+import sys
+from pathlib import Path
+from alert.Notifier import Notifier
+from alert.PriceAlert import PriceAlert
+
+logger = logging.getLogger(__name__)
+
+class LogNotifier(Notifier):
+    def __init__(self, log_file: Path=None):
+        super().__init__()
+        self.log_file = log_file
+
+    def notifier_info(self) -> str:
+        return f"Log notifier writes alerts to: {self.log_file.absolute() if self.log_file else 'stdout'}"
+
+    def notify(self, price_alerts: list[PriceAlert]) -> None:
+        lines = [f"{price_alert.message()}\n" for price_alert in price_alerts]
+        if self.log_file:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            with self.log_file.open('a') as log_file:
+                log_file.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
+            sys.stdout.flush()
@@ -0,0 +1,12 @@
+from abc import ABC, abstractmethod
+from alert.PriceAlert import PriceAlert
+
+class Notifier(ABC):
+
+    @abstractmethod
+    def notifier_info(self) -> str:
+        pass
+
+    @abstractmethod
+    def notify(self, price_alerts: list[PriceAlert]) -> None:
+        pass
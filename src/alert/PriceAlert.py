@@ -0,0 +1,22 @@
+class PriceAlert(object):
+    def __init__(self,
+                 group_name: str,
+                 item_name: str,
+                 url: str,
+                 old_price: float,
+                 new_price: float,
+                 lowest_price: float,
+                 reasons: list[str]):
+        self.group_name = group_name
+        self.item_name = item_name
+        self.url = url
+        self.old_price = old_price
+        self.new_price = new_price
+        self.lowest_price = lowest_price
+        self.reasons = reasons
+
+    def message(self) -> str:
+        return f"'{self.item_name}' in '{self.group_name}' dropped from {self.old_price} to {self.new_price} ({', '.join(self.reasons)}): {self.url}"
+
+    def to_dict(self) -> dict:
+        return vars(self).copy()
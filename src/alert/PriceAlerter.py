@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import threading
+import traceback
+from pathlib import Path
+from alert.Notifier import Notifier
+from alert.PriceAlert import PriceAlert
+from model.ItemGroup import ItemGroup
+
+logger = logging.getLogger(__name__)
+
+class PriceAlerter(object):
+    """
+    Compares fetched prices with the last known and lowest price of each item, and notifies about price drops.
+    Only the last known state per item is kept, so each run costs O(items).
+    """
+    def __init__(self,
+                 notifiers: list[Notifier],
+                 state_file: Path=None,
+                 absolute_drop: float=None,
+                 percent_drop: float=None,
+                 all_time_low: bool=False):
+        self.notifiers = notifiers
+        self.state_file = state_file
+        self.absolute_drop = absolute_drop
+        self.percent_drop = percent_drop
+        self.all_time_low = all_time_low
+        self.states: dict[str, dict[str, float]] = None
+        self.price_alerts: list[PriceAlert] = []
+        self.lock = threading.Lock()
+
+    def check(self, item_group: ItemGroup) -> None:
+        with self.lock:
+            if self.states is None:
+                self.states = self.__load_states()
+            for item in item_group.items:
+                # hard coded prices are not observed, they would never drop
+                if item.price is None or item.is_hard_coded:
+                    continue
+                key = f"{item_group.group_name}\t{item.name}"
+                state = self.states.get(key, None)
+                if state is None:
+                    self.states[key] = {'last_price': item.price, 'lowest_price': item.price}
+                    continue
+                reasons = self.__reasons(state['last_price'], state['lowest_price'], item.price)
+                if reasons:
+                    self.price_alerts.append(PriceAlert(item_group.group_name, item.name, item.url, state['last_price'], item.price, state['lowest_price'], reasons))
+                state['last_price'] = item.price
+                state['lowest_price'] = min(state['lowest_price'], item.price)
+
+    def flush(self) -> None:
+        """
+        Sends all alerts collected since last flush and saves the last known prices.
+        """
+        with self.lock:
+            price_alerts = self.price_alerts
+            self.price_alerts = []
+            if self.states is not None:
+                self.__save_states(self.states)
+        if not price_alerts:
+            return
+        logger.info(f"Sending {len(price_alerts)} price alerts")
+        for notifier in self.notifiers:
+            try:
+                notifier.notify(price_alerts)
+            except Exception as error:
+                logger.error(f"Unable to send price alerts for notifier: {notifier.notifier_info()}. Error: {error}")
+                traceback.print_exc()
+                continue
+
+    def __reasons(self, last_price: float, lowest_price: float, price: float) -> list[str]:
+        reasons = []
+        drop = last_price - price
+        if drop <= 0:
+            return reasons
+        if self.absolute_drop is not None and drop >= self.absolute_drop:
+            reasons.append(f"dropped by {drop:.2f}")
+        if self.percent_drop is not None and last_price > 0 and drop / last_price * 100 >= self.percent_drop:
+            reasons.append(f"dropped by {drop / last_price * 100:.1f}%")
+        if self.all_time_low and price < lowest_price:
+            reasons.append('all time low')
+        return reasons
+
+    def __load_states(self) -> dict[str, dict[str, float]]:
+        if not self.state_file or not self.state_file.exists():
+            return {}
+        try:
+            with self.state_file.open('r') as file:
+                return json.load(file)
+        except (OSError, ValueError) as error:
+            logger.warn(f"Unable to load price alert state file: {self.state_file.absolute()}. Error: {error}")
+            return {}
+
+    def __save_states(self, states: dict[str, dict[str, float]]) -> None:
+        if not self.state_file:
+            return
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        new_state_file = self.state_file.with_name(f"{self.state_file.name}.tmp")
+        try:
+            with new_state_file.open('w') as file:
+                json.dump(states, file)
+            os.replace(new_state_file, self.state_file)
+        except OSError as error:
+            logger.error(f"Unable to save price alert state file: {self.state_file.absolute()}. Error: {error}")
+            new_state_file.unlink(missing_ok=True)
@@ -0,0 +1,25 @@
+import logging
+import requests
+from retry import retry
+from alert.Notifier import Notifier
+from alert.PriceAlert import PriceAlert
+
+logger = logging.getLogger(__name__)
+
+class WebhookNotifier(Notifier):
+    def __init__(self, url: str, headers: dict[str, str]=None):
+        super().__init__()
+        self.url = url
+        self.headers = headers if headers else {}
+
+    def notifier_info(self) -> str:
+        return f"Webhook notifier posts alerts to: {self.url}"
+
+    @retry((Exception), tries=3, delay=1, backoff=2)
+    def notify(self, price_alerts: list[PriceAlert]) -> None:
+        body = {
+            'text': '\n'.join(price_alert.message() for price_alert in price_alerts),
+            'alerts': [price_alert.to_dict() for price_alert in price_alerts]
+        }
+        response = requests.post(self.url, json=body, headers=self.headers, timeout=20)
+        response.raise_for_status()
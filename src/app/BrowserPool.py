@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit
+from model.SpecialTweak import SpecialTweak, default_headers
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:
+    async_playwright = None
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'media'}
+
+# second level labels under country code top level domains where sites register, like `co.uk` or `com.au`
+PUBLIC_SECOND_LEVEL_LABELS = {'ac', 'co', 'com', 'edu', 'gen', 'go', 'gob', 'gov', 'govt', 'ltd', 'ne', 'net', 'nic', 'or', 'org', 'plc', 'sch'}
+
+# elements are often rendered empty and filled in later, so wait for text instead of the element itself
+HAS_TEXT_SCRIPT = '''selector => {
+    try {
+        const element = document.querySelector(selector);
+        return element !== null && element.textContent.trim().length > 0;
+    } catch (error) {
+        // jQuery style selectors are not supported by the browser
+        return true;
+    }
+}'''
+
+class BrowserPool(object):
+    """
+    Renders pages with JavaScript in one long-lived headless browser.
+    The browser runs on its own event loop thread and is started on first use.
+    Browser contexts are kept per special tweak and their pages are reused across items.
+    Images, fonts, media and scripts from other sites are not loaded.
+    """
+    def __init__(self, max_pages: int=2, timeout: float=30):
+        if async_playwright is None:
+            message = 'Rendering pages requires playwright. Install it with `pip install playwright` and `playwright install chromium`'
+            logger.error(message)
+            raise Exception(message)
+        if max_pages < 1:
+            message = f"Number of browser pages must be positive. Got: {max_pages}"
+            logger.error(message)
+            raise Exception(message)
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.loop: asyncio.AbstractEventLoop = None
+        self.thread: threading.Thread = None
+        self.playwright = None
+        self.browser = None
+        self.page_semaphore: asyncio.Semaphore = None
+        self.contexts = {}
+        self.idle_pages: dict[str, list] = {}
+        self.page_hosts = {}
+        self.cookie_origins: set[tuple[str, str]] = set()
+
+    def render(self, url: str, special_tweak: SpecialTweak=None, wait_selector: str=None) -> bytes:
+        """
+        Returns the html of the page after its scripts ran, blocking the calling thread.
+        If `wait_selector` is set, waits until the first matching element has text.
+        """
+        with self.lock:
+            if self.loop is None:
+                self.__start()
+        return asyncio.run_coroutine_threadsafe(self.__render(url, special_tweak, wait_selector), self.loop).result()
+
+    def close(self) -> None:
+        with self.lock:
+            if self.loop is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self.__close_browser(), self.loop).result()
+            finally:
+                # the loop thread is stopped even if the browser already crashed
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.thread.join()
+                self.loop.close()
+                self.loop = None
+                self.thread = None
+
+    def __start(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='browser-pool', daemon=True)
+        self.thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self.__start_browser(), self.loop).result()
+        except Exception:
+            # next render tries to start the browser again
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
+            self.loop = None
+            self.thread = None
+            raise
+        logger.info('Started headless browser')
+
+    async def __start_browser(self) -> None:
+        self.page_semaphore = asyncio.Semaphore(self.max_pages)
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=True)
+
+    async def __close_browser(self) -> None:
+        self.contexts.clear()
+        self.idle_pages.clear()
+        self.page_hosts.clear()
+        self.cookie_origins.clear()
+        await self.browser.close()
+        await self.playwright.stop()
+        logger.info('Stopped headless browser')
+
+    async def __render(self, url: str, special_tweak: SpecialTweak, wait_selector: str) -> bytes:
+        key = special_tweak.key if special_tweak else ''
+        async with self.page_semaphore:
+            page = await self.__acquire_page(key, special_tweak)
+            try:
+                await self.__add_cookies(page.context, key, url, special_tweak)
+                self.page_hosts[page] = urlsplit(url).hostname
+                await page.goto(url, wait_until='domcontentloaded', timeout=self.timeout * 1000)
+                if wait_selector:
+                    await page.wait_for_function(HAS_TEXT_SCRIPT, arg=wait_selector, timeout=self.timeout * 1000)
+                content = await page.content()
+            except Exception:
+                # a page in an unknown state is not reused
+                self.page_hosts.pop(page, None)
+                await page.close()
+                raise
+            self.idle_pages[key].append(page)
+        return content.encode('utf-8')
+
+    async def __acquire_page(self, key: str, special_tweak: SpecialTweak):
+        idle_pages = self.idle_pages.setdefault(key, [])
+        if idle_pages:
+            return idle_pages.pop()
+        context = self.contexts.get(key, None)
+        if context is None:
+            context = await self.browser.new_context(user_agent=default_headers['user-agent'])
+            if special_tweak and special_tweak.headers:
+                await context.set_extra_http_headers(special_tweak.headers)
+            self.contexts[key] = context
+        page = await context.new_page()
+        await page.route('**/*', lambda route: self.__route(route, page))
+        return page
+
+    async def __add_cookies(self, context, key: str, url: str, special_tweak: SpecialTweak) -> None:
+        # browser cookies belong to a site, so the cookies of a special tweak are added for each site it is used with
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc.lower()}"
+        if not special_tweak or not special_tweak.cookies or (key, origin) in self.cookie_origins:
+            return
+        await context.add_cookies([{'name': name, 'value': str(value), 'url': origin} for name, value in special_tweak.cookies.items()])
+        self.cookie_origins.add((key, origin))
+
+    async def __route(self, route, page) -> None:
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        elif request.resource_type == 'script' and self.__is_third_party(urlsplit(request.url).hostname, self.page_hosts.get(page, None)):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def __is_third_party(self, host: str, page_host: str) -> bool:
+        if not host or not page_host:
+            return False
+        # scripts from other subdomains of the site, like `static.site3.com` for `www.site3.com`, are first party
+        return registrable_domain(host) != registrable_domain(page_host)
+
+def registrable_domain(host: str) -> str:
+    """
+    Returns the domain a site registered, e.g. `site3.com` for `www.site3.com` and `amazon.co.uk` for `www.amazon.co.uk`.
+    Public suffixes with two labels are recognized by `PUBLIC_SECOND_LEVEL_LABELS` under two letter top level domains.
+    IP addresses are returned as they are.
+    """
+    host = host.lower().rstrip('.')
+    if host.replace('.', '').isdigit() or ':' in host:
+        return host
+    labels = host.split('.')
+    suffix_length = 2 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in PUBLIC_SECOND_LEVEL_LABELS else 1
+    return '.'.join(labels[-suffix_length - 1:])
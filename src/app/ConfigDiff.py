@@ -0,0 +1,37 @@
+from model.Item import Item
+
+class ConfigDiff(object):
+    """
+    Items added, changed and removed by a config reload, by item group name.
+    An item is changed if any of its settings changed, including the definition of its price selector or special tweak.
+    `changed_intervals` has the new interval of item groups whose interval changed, including by a changed `daemon.interval`.
+    """
+    def __init__(self,
+                 previous_item_definitions: dict[tuple[str, str], tuple[tuple, Item]],
+                 item_definitions: dict[tuple[str, str], tuple[tuple, Item]],
+                 previous_intervals: dict[str, float]=None,
+                 intervals: dict[str, float]=None):
+        self.added_items: dict[str, list[str]] = {}
+        self.changed_items: dict[str, list[str]] = {}
+        self.removed_items: dict[str, list[str]] = {}
+        self.changed_intervals: dict[str, float] = {}
+        previous_intervals = previous_intervals or {}
+        for group_name, interval in (intervals or {}).items():
+            if group_name in previous_intervals and previous_intervals[group_name] != interval:
+                self.changed_intervals[group_name] = interval
+        for (group_name, item_name), (definition, _) in item_definitions.items():
+            previous = previous_item_definitions.get((group_name, item_name), None)
+            if previous is None:
+                self.added_items.setdefault(group_name, []).append(item_name)
+            elif previous[0] != definition:
+                self.changed_items.setdefault(group_name, []).append(item_name)
+        for group_name, item_name in previous_item_definitions.keys():
+            if (group_name, item_name) not in item_definitions:
+                self.removed_items.setdefault(group_name, []).append(item_name)
+
+    def rescheduled_items(self, group_name: str) -> set[str]:
+        return set(self.added_items.get(group_name, [])) | set(self.changed_items.get(group_name, []))
+
+    def summary(self) -> str:
+        counts = [sum(len(item_names) for item_names in items.values()) for items in (self.added_items, self.changed_items, self.removed_items)]
+        return f"{counts[0]} added, {counts[1]} changed and {counts[2]} removed items, and {len(self.changed_intervals)} item groups with changed interval"
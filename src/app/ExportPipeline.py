@@ -0,0 +1,76 @@
+import logging
+import queue
+import threading
+import time
+import traceback
+from app.Metrics import metrics
+from exporter.DataExporter import DataExporter
+from model.ItemGroup import ItemGroup
+
+logger = logging.getLogger(__name__)
+
+class ExportPipeline(object):
+    """
+    Exports item groups as soon as they are fetched. Each data exporter runs in its own thread,
+    so a slow exporter does not delay the others. Item groups that queue up while an exporter
+    is busy are exported together in its next call. Exporters that batch remote writes export
+    all item groups once, when the pipeline is closed.
+    """
+    __END = object()
+
+    def __init__(self, data_exporters: list[DataExporter]):
+        self.data_exporters = data_exporters
+        self.queues: list[queue.Queue] = []
+        self.threads: list[threading.Thread] = []
+        self.export_seconds: dict[str, float] = {}
+
+    def start(self) -> None:
+        for data_exporter in self.data_exporters:
+            data_exporter.api_calls.clear()
+            self.export_seconds[data_exporter.exportor_info()] = 0
+            export_queue = queue.Queue()
+            thread = threading.Thread(target=self.__export, args=(data_exporter, export_queue), name=f"exporter-{len(self.threads)}", daemon=True)
+            self.queues.append(export_queue)
+            self.threads.append(thread)
+            thread.start()
+
+    def submit(self, item_group: ItemGroup) -> None:
+        for export_queue in self.queues:
+            export_queue.put(item_group)
+
+    def close(self) -> None:
+        for export_queue in self.queues:
+            export_queue.put(self.__END)
+        for thread in self.threads:
+            thread.join()
+        self.queues.clear()
+        self.threads.clear()
+
+    def __export(self, data_exporter: DataExporter, export_queue: queue.Queue) -> None:
+        is_ended = False
+        item_groups = []
+        while not is_ended:
+            item_group = export_queue.get()
+            while True:
+                if item_group is self.__END:
+                    is_ended = True
+                else:
+                    item_groups.append(item_group)
+                try:
+                    item_group = export_queue.get_nowait()
+                except queue.Empty:
+                    break
+            if not item_groups or (data_exporter.batches_exports and not is_ended):
+                continue
+            export_start = time.monotonic()
+            try:
+                data_exporter.export_data(item_groups)
+            except Exception as error:
+                logger.error(f"Unable to export data for exporter: {data_exporter.exportor_info()}. Error: {error}")
+                traceback.print_exc()
+                metrics.inc('pricechecker_export_errors_total', {'exporter': type(data_exporter).__name__}, help='Failed exports')
+            finally:
+                export_seconds = time.monotonic() - export_start
+                self.export_seconds[data_exporter.exportor_info()] += export_seconds
+                metrics.observe('pricechecker_export_seconds', export_seconds, {'exporter': type(data_exporter).__name__}, help='Duration of exports')
+                item_groups = []
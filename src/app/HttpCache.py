@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from model.PriceSelector import PriceSelector
+from model.SpecialTweak import SpecialTweak
+
+logger = logging.getLogger(__name__)
+
+class HttpCacheEntry(object):
+    def __init__(self, etag: str=None, last_modified: str=None, price: float=None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.price = price
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['if-none-match'] = self.etag
+        if self.last_modified:
+            headers['if-modified-since'] = self.last_modified
+        return headers
+
+class HttpCache(object):
+    def __init__(self, cache_file: Path, max_entries: int=10000):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, HttpCacheEntry] = OrderedDict()
+        self.lock = threading.Lock()
+        self.is_loaded = False
+
+    def load(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.is_loaded = True
+            if not self.cache_file.exists():
+                return
+            try:
+                with self.cache_file.open('r') as file:
+                    raw_entries = json.load(file)
+            except (OSError, ValueError) as error:
+                logger.warn(f"Unable to load http cache file: {self.cache_file.absolute()}. Error: {error}")
+                return
+            try:
+                for key, raw_entry in raw_entries:
+                    self.entries[key] = HttpCacheEntry(**raw_entry)
+            except (TypeError, ValueError, AttributeError) as error:
+                # e.g. a file of an older version, the cache is filled again by this run
+                logger.warn(f"Unable to read http cache file: {self.cache_file.absolute()}, starting with an empty cache. Error: {error}")
+                self.entries.clear()
+                return
+        logger.info(f"Loaded {len(self.entries)} entries from http cache file: {self.cache_file.absolute()}")
+
+    def save(self) -> None:
+        with self.lock:
+            raw_entries = [[key, vars(entry)] for key, entry in self.entries.items()]
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        new_cache_file = self.cache_file.with_name(f"{self.cache_file.name}.tmp")
+        try:
+            with new_cache_file.open('w') as file:
+                json.dump(raw_entries, file)
+            os.replace(new_cache_file, self.cache_file)
+        except OSError as error:
+            logger.error(f"Unable to save http cache file: {self.cache_file.absolute()}. Error: {error}")
+            new_cache_file.unlink(missing_ok=True)
+
+    def get(self, url: str, price_selector: PriceSelector, special_tweak: SpecialTweak=None) -> HttpCacheEntry:
+        if not self.is_loaded:
+            self.load()
+        key = self.__cache_key(url, price_selector, special_tweak)
+        with self.lock:
+            entry = self.entries.get(key, None)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, url: str, price_selector: PriceSelector, special_tweak: SpecialTweak, etag: str, last_modified: str, price: float) -> None:
+        key = self.__cache_key(url, price_selector, special_tweak)
+        with self.lock:
+            if not etag and not last_modified:
+                self.entries.pop(key, None)
+                return
+            self.entries[key] = HttpCacheEntry(etag, last_modified, price)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __cache_key(self, url: str, price_selector: PriceSelector, special_tweak: SpecialTweak) -> str:
+        # the cached price is only valid for the selector that scraped it,
+        # and cookies and headers may change the page content, e.g. currency cookies
+        definition = f"{price_selector.key}\n{special_tweak.key if special_tweak else ''}"
+        return f"{url} {hashlib.sha1(definition.encode('utf-8')).hexdigest()}"
@@ -0,0 +1,98 @@
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+class Metrics(object):
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text exposition format.
+    Counters and summaries only grow, so they stay valid across runs in daemon mode.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.types: dict[str, str] = {}
+        self.helps: dict[str, str] = {}
+        self.values: dict[str, dict[tuple, float]] = {}
+
+    def inc(self, name: str, labels: dict[str, str]=None, value: float=1, help: str='') -> None:
+        with self.lock:
+            samples = self.__samples(name, 'counter', help)
+            key = self.__key(labels)
+            samples[key] = samples.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: dict[str, str]=None, help: str='') -> None:
+        with self.lock:
+            self.__samples(name, 'gauge', help)[self.__key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: dict[str, str]=None, help: str='') -> None:
+        with self.lock:
+            samples = self.__samples(name, 'summary', help)
+            key = self.__key(labels)
+            count, total = samples.get(key, (0, 0))
+            samples[key] = (count + 1, total + value)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for name in sorted(self.values):
+                if self.helps[name]:
+                    lines.append(f"# HELP {name} {self.helps[name]}")
+                lines.append(f"# TYPE {name} {self.types[name]}")
+                for key, value in sorted(self.values[name].items()):
+                    if self.types[name] == 'summary':
+                        lines.append(f"{name}_count{self.__format_labels(key)} {value[0]}")
+                        lines.append(f"{name}_sum{self.__format_labels(key)} {value[1]}")
+                    else:
+                        lines.append(f"{name}{self.__format_labels(key)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, metrics_file: Path) -> None:
+        metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        new_metrics_file = metrics_file.with_name(f"{metrics_file.name}.tmp")
+        try:
+            new_metrics_file.write_text(self.render())
+            os.replace(new_metrics_file, metrics_file)
+        except OSError as error:
+            logger.error(f"Unable to write metrics file: {metrics_file.absolute()}. Error: {error}")
+            new_metrics_file.unlink(missing_ok=True)
+
+    def serve(self, port: int) -> ThreadingHTTPServer:
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('content-type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('content-length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('', port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        logger.info(f"Serving metrics on port: {port}")
+        return server
+
+    def __samples(self, name: str, type: str, help: str) -> dict[tuple, object]:
+        if name not in self.values:
+            self.values[name] = {}
+            self.types[name] = type
+            self.helps[name] = help
+        return self.values[name]
+
+    def __key(self, labels: dict[str, str]) -> tuple:
+        return tuple(sorted(labels.items())) if labels else ()
+
+    def __format_labels(self, key: tuple) -> str:
+        if not key:
+            return ''
+        escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in key]
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+metrics = Metrics()
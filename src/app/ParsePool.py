@@ -0,0 +1,71 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from model.PriceSelector import PriceSelector
+
+logger = logging.getLogger(__name__)
+
+# price selectors of the worker process, sent once when the worker starts
+worker_price_selectors: dict[str, PriceSelector] = {}
+
+def init_worker(price_selectors: dict[str, PriceSelector]) -> None:
+    global worker_price_selectors
+    worker_price_selectors = price_selectors
+
+def scrape_price(selector_name: str, page: bytes) -> float:
+    return worker_price_selectors[selector_name].scrape_price(page)
+
+class ParsePool(object):
+    """
+    Scrapes prices from fetched pages in worker processes, so parsing of large pages is not limited by the GIL.
+    Price selectors are pickled once per worker, each page only sends the selector name and the raw response bytes.
+    If a worker process dies, e.g. killed for running out of memory, the pool is started again and the page is retried once.
+    """
+    def __init__(self, price_selectors: dict[str, PriceSelector], processes: int=None):
+        if processes is not None and processes < 1:
+            message = f"Number of parse processes must be positive. Got: {processes}"
+            logger.error(message)
+            raise Exception(message)
+        self.processes = processes
+        self.price_selectors = price_selectors
+        self.selector_names = {id(price_selector): selector_name for selector_name, price_selector in price_selectors.items()}
+        self.lock = threading.Lock()
+        self.executor = self.__create_executor()
+
+    def scrape_price(self, price_selector: PriceSelector, page: bytes) -> float:
+        """
+        Blocks the calling thread until a worker process has scraped the price.
+        Price selectors that are not known by the pool are run in the calling thread.
+        """
+        selector_name = self.selector_names.get(id(price_selector), None)
+        if selector_name is None:
+            return price_selector.scrape_price(page)
+        executor = self.executor
+        try:
+            return executor.submit(scrape_price, selector_name, page).result()
+        except BrokenProcessPool as error:
+            logger.warn(f"Parse worker process died, restarting parse pool. Error: {error}")
+            self.__replace_executor(executor)
+        return self.executor.submit(scrape_price, selector_name, page).result()
+
+    def close(self) -> None:
+        with self.lock:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __create_executor(self) -> ProcessPoolExecutor:
+        # fetching runs in threads, forking a multithreaded process is not safe
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(self.price_selectors,)
+        )
+
+    def __replace_executor(self, broken_executor: ProcessPoolExecutor) -> None:
+        # all pages in flight fail together, only the first of them starts a new pool
+        with self.lock:
+            if self.executor is broken_executor:
+                broken_executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self.__create_executor()
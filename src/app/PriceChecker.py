@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import tempfile
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+from app.ExportPipeline import ExportPipeline
+from app.Metrics import metrics
+from app.PriceCheckerConfig import PriceCheckerConfig
+from app.PriceFetcher import PriceFetcher
+from alert.PriceAlerter import PriceAlerter
+from model.Item import Item
+from model.ItemGroup import ItemGroup
+from shard.ShardCoordinator import ShardCoordinator
+
+logger = logging.getLogger(__name__)
+
+# price of items without hard coded price in dry runs
+DRY_RUN_PRICE = 99.99
+
+class PriceChecker(object):
+    def __init__(self, config: PriceCheckerConfig, price_fetcher: Optional[Union[PriceFetcher, ShardCoordinator]]=None):
+        """
+        `price_fetcher` replaces the price fetcher of the config, e.g. with a `ShardCoordinator`.
+        """
+        self.config = config
+        self.price_fetcher = price_fetcher if price_fetcher else config.price_fetcher
+
+    def run(self, item_groups: list[ItemGroup]=None, no_export: bool=False) -> None:
+        item_groups = item_groups if item_groups is not None else self.config.item_groups
+        started_at = datetime.now()
+        start = time.monotonic()
+        export_pipeline = ExportPipeline(self.config.data_exporters if not no_export else [])
+        try:
+            self.__run(item_groups, export_pipeline, no_export)
+        finally:
+            run_seconds = time.monotonic() - start
+            metrics.observe('pricechecker_run_seconds', run_seconds, help='Duration of price check runs')
+            metrics.set('pricechecker_last_run_timestamp_seconds', time.time(), help='Unix time of the end of the last price check run')
+            if self.config.metrics_file:
+                metrics.write(self.config.metrics_file)
+            if self.config.run_summary_file:
+                self.__write_run_summary(item_groups, export_pipeline, started_at, run_seconds)
+
+    def dry_run(self) -> bool:
+        """
+        Exports hard coded prices, and a sample price for the other items, with every data exporter without fetching any price.
+        Configured files and databases are not changed, see `DataExporter.dry_run`. Returns whether all exporters succeeded.
+        """
+        item_groups = []
+        for item_group in self.config.item_groups:
+            items = [Item(item.name, item.url, item.price_selector, item.special_tweak, price=item.price if item.is_hard_coded else DRY_RUN_PRICE) for item in item_group.items]
+            item_groups.append(ItemGroup(item_group.group_name, items, item_group.interval))
+        failed_count = 0
+        with tempfile.TemporaryDirectory(prefix='pricechecker-dry-run-') as work_directory:
+            for index, data_exporter in enumerate(self.config.data_exporters):
+                try:
+                    data_exporter.dry_run(item_groups, Path(work_directory).joinpath(str(index)))
+                    logger.info(f"Dry run succeeded for exporter: {data_exporter.exportor_info()}")
+                except Exception as error:
+                    failed_count += 1
+                    logger.error(f"Dry run failed for exporter: {data_exporter.exportor_info()}. Error: {error}")
+                    traceback.print_exc()
+        return failed_count == 0
+
+    def __run(self, item_groups: list[ItemGroup], export_pipeline: ExportPipeline, no_export: bool) -> None:
+        if no_export:
+            self.price_fetcher.fetch_all(item_groups)
+            logger.info('Skip exporting data')
+            return
+        price_alerter = self.config.price_alerter
+        # item groups are exported while other item groups are still being fetched
+        export_pipeline.start()
+        try:
+            self.price_fetcher.fetch_all(item_groups, on_group_fetched=lambda item_group: self.__on_group_fetched(item_group, export_pipeline, price_alerter))
+        finally:
+            export_pipeline.close()
+            if price_alerter:
+                price_alerter.flush()
+
+    def __on_group_fetched(self, item_group: ItemGroup, export_pipeline: ExportPipeline, price_alerter: PriceAlerter) -> None:
+        if price_alerter:
+            price_alerter.check(item_group)
+        export_pipeline.submit(item_group)
+
+    def __write_run_summary(self, item_groups: list[ItemGroup], export_pipeline: ExportPipeline, started_at: datetime, run_seconds: float) -> None:
+        summary = {
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'run_seconds': run_seconds,
+            'items': [
+                {
+                    'group_name': item_group.group_name,
+                    'item_name': item.name,
+                    'url': item.url,
+                    'price': item.price,
+                    'status': item.fetch_status,
+                    'attempts': item.fetch_attempts,
+                    'latency': item.fetch_latency,
+                    'timings': item.fetch_timings,
+                    'response_size': item.response_size
+                }
+                for item_group in item_groups
+                for item in item_group.items
+            ],
+            'exporters': [
+                {
+                    'exporter': data_exporter.exportor_info(),
+                    'export_seconds': export_pipeline.export_seconds.get(data_exporter.exportor_info(), None),
+                    'api_calls': data_exporter.api_calls
+                }
+                for data_exporter in export_pipeline.data_exporters
+            ]
+        }
+        run_summary_file = self.config.run_summary_file
+        run_summary_file.parent.mkdir(parents=True, exist_ok=True)
+        new_run_summary_file = run_summary_file.with_name(f"{run_summary_file.name}.tmp")
+        try:
+            with new_run_summary_file.open('w') as file:
+                json.dump(summary, file, indent=2)
+            os.replace(new_run_summary_file, run_summary_file)
+        except OSError as error:
+            logger.error(f"Unable to write run summary file: {run_summary_file.absolute()}. Error: {error}")
+            new_run_summary_file.unlink(missing_ok=True)
@@ -1,67 +1,376 @@
+import difflib
+import json
 import logging
 import yaml
 from typing import IO, Any
 from pathlib import Path
+from alert.LogNotifier import LogNotifier
+from alert.Notifier import Notifier
+from alert.PriceAlerter import PriceAlerter
+from alert.WebhookNotifier import WebhookNotifier
 from exporter.CsvExporter import CsvExporter
 from exporter.DataExporter import DataExporter
 from exporter.GoogleSheetExporter import GoogleSheetExporter
+from exporter.SqliteExporter import SqliteExporter
+from app.BrowserPool import BrowserPool
+from app.ConfigDiff import ConfigDiff
+from app.HttpCache import HttpCache
+from app.ParsePool import ParsePool
+from app.PriceFetcher import PriceFetcher
+from app.RetryScheduler import RetryScheduler
 from model.Item import Item
 from model.ItemGroup import ItemGroup
 from model.PriceSelector import PriceSelector
 from model.SpecialTweak import SpecialTweak
 
+try:
+    # libyaml parses large config files many times faster than the pure python loader
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 logger = logging.getLogger(__name__)
 
+# settings each data exporter and notifier type requires
+DATA_EXPORTER_KEYS = {
+    'google_sheet': ['google_service_account_key_file', 'spreadsheet_id'],
+    'csv': ['csv_file_directory'],
+    'sqlite': ['database_file']
+}
+NOTIFIER_KEYS = {
+    'webhook': ['url'],
+    'log': []
+}
+
 class PriceCheckerConfig(object):
-    def __init__(self, config_file: IO[Any]):
+    def __init__(self, config_file: IO[Any], previous_config: 'PriceCheckerConfig'=None, fetch_only: bool=False):
+        """
+        With `previous_config`, price selectors, special tweaks and items that did not change are reused,
+        and `config_diff` lists the items that changed.
+        With `fetch_only`, data exporters and price alerts are not created, e.g. for shard workers which only fetch prices.
+        """
         self.price_selectors: dict[str, PriceSelector] = {}
         self.special_tweaks: dict[str, SpecialTweak] = {}
         self.item_groups: list[ItemGroup] = []
         self.data_exporters: list[DataExporter] = []
-        self.__parse_config(config_file)
+        self.price_alerter: PriceAlerter = None
+        self.metrics_file: Path = None
+        self.run_summary_file: Path = None
+        self.metrics_port: int = None
+        self.price_fetcher: PriceFetcher = None
+        self.daemon_interval: float = 3600
+        self.config_check_interval: float = 30
+        self.shard_workers: int = None
+        self.shard_queue_file: Path = None
+        self.shard_local_workers: bool = True
+        self.shard_result_timeout: float = 3600
+        # price selectors and special tweaks with the same definition share one instance
+        self.price_selector_definitions: dict[str, PriceSelector] = {}
+        self.special_tweak_definitions: dict[str, SpecialTweak] = {}
+        self.item_definitions: dict[tuple[str, str], tuple[tuple, Item]] = {}
+        self.config_diff: ConfigDiff = None
+        self.__parse_config(config_file, previous_config, fetch_only)
 
-    def __parse_config(self, config_file: IO[Any]) -> None:
-        config = yaml.safe_load(config_file)
-        for price_selector_yaml in config['price_selectors']:
-            self.price_selectors[price_selector_yaml['selector_name']] = PriceSelector(
-                full_price_selector=price_selector_yaml.get('full_price_selector', None),
-                decimal_integer_selector=price_selector_yaml.get('decimal_integer_selector', None),
-                decimal_fraction_selector=price_selector_yaml.get('decimal_fraction_selector', None)
-            )
-        for special_tweak_yaml in config['special_tweaks']:
-            self.special_tweaks[special_tweak_yaml['tweak_name']] = SpecialTweak(
-                cookies=special_tweak_yaml.get('cookies', None),
-                headers=special_tweak_yaml.get('headers', None)
-            )
-        for item_group_yaml in config['item_groups']:
-            item_group_name = item_group_yaml['group_name']
-            if 'disabled' in item_group_yaml and item_group_yaml['disabled']:
-                logger.warn(f"Skip item group: {item_group_name}")
-            else:
-                item_group = ItemGroup(item_group_name)
-                for item_yaml in item_group_yaml['items']:
-                    item_name = item_yaml['name']
-                    if 'disabled' in item_yaml and item_yaml['disabled']:
-                        logger.warn(f"Skip item: {item_name} in item group: {item_group_name}")
-                    else:
-                        item_group.add(
-                            Item(
-                                name=item_name,
-                                url=item_yaml['url'],
-                                price_selector=self.price_selectors[item_yaml['price_selector']],
-                                special_tweak=self.special_tweaks[item_yaml['special_tweak']] if 'special_tweak' in item_yaml else None,
-                                get_price_delay=item_yaml.get('get_price_delay', 0),
-                                price=item_yaml.get('price', None))
-                        )
-                self.item_groups.append(item_group)
-        for data_exporter in config.get('data_exporters', []):
+    def __parse_config(self, config_file: IO[Any], previous_config: 'PriceCheckerConfig', fetch_only: bool) -> None:
+        config = yaml.load(config_file, Loader=SafeLoader)
+        if not isinstance(config, dict):
+            message = f"Invalid config file, expected a mapping of settings. Got: {config}"
+            logger.error(message)
+            raise Exception(message)
+        # all settings are validated before anything is created
+        errors = self.__parse_items(config, previous_config) + self.__validate_settings(config)
+        if errors:
+            for error in errors:
+                logger.error(error)
+            raise Exception(f"Invalid config file with {len(errors)} errors: {' '.join(errors)}")
+        price_fetcher_yaml = config.get('price_fetcher', None) or {}
+        http_cache = None
+        http_cache_yaml = price_fetcher_yaml.get('http_cache', None)
+        if http_cache_yaml:
+            http_cache = HttpCache(Path(http_cache_yaml['cache_file']), http_cache_yaml.get('max_entries', 10000))
+        parse_pool = None
+        parse_pool_yaml = price_fetcher_yaml.get('parse_pool', None)
+        if parse_pool_yaml:
+            parse_pool = ParsePool(self.price_selectors, parse_pool_yaml.get('processes', None))
+        browser_pool = None
+        browser_yaml = price_fetcher_yaml.get('browser', None)
+        if browser_yaml:
+            browser_pool = BrowserPool(browser_yaml.get('max_pages', 2), browser_yaml.get('timeout', 30))
+        else:
+            rendering_names = [name for name, price_selector in self.price_selectors.items() if price_selector.render_javascript]
+            rendering_names += [name for name, special_tweak in self.special_tweaks.items() if special_tweak.render_javascript]
+            if rendering_names:
+                message = f"price_fetcher.browser must be configured to render pages for: {', '.join(rendering_names)}"
+                logger.error(message)
+                raise Exception(message)
+        self.price_fetcher = PriceFetcher(
+            max_concurrency=price_fetcher_yaml.get('max_concurrency', 16),
+            max_concurrency_per_host=price_fetcher_yaml.get('max_concurrency_per_host', 2),
+            retry_scheduler=RetryScheduler(
+                max_tries=price_fetcher_yaml.get('max_tries', 5),
+                max_delay=price_fetcher_yaml.get('max_retry_delay', 60),
+                retry_budget=price_fetcher_yaml.get('retry_budget', 300)
+            ),
+            http_cache=http_cache,
+            parse_pool=parse_pool,
+            browser_pool=browser_pool
+        )
+        metrics_yaml = config.get('metrics', None) or {}
+        self.metrics_file = Path(metrics_yaml['metrics_file']) if 'metrics_file' in metrics_yaml else None
+        self.run_summary_file = Path(metrics_yaml['run_summary_file']) if 'run_summary_file' in metrics_yaml else None
+        self.metrics_port = metrics_yaml.get('http_port', None)
+        daemon_yaml = config.get('daemon', None) or {}
+        self.daemon_interval = daemon_yaml.get('interval', 3600)
+        self.config_check_interval = daemon_yaml.get('config_check_interval', 30)
+        if previous_config:
+            self.config_diff = ConfigDiff(previous_config.item_definitions, self.item_definitions, previous_config.item_group_intervals(), self.item_group_intervals())
+        sharding_yaml = config.get('sharding', None)
+        if sharding_yaml:
+            self.shard_workers = sharding_yaml['workers']
+            self.shard_queue_file = Path(sharding_yaml['queue_file']) if 'queue_file' in sharding_yaml else None
+            self.shard_local_workers = sharding_yaml.get('local_workers', True)
+            self.shard_result_timeout = sharding_yaml.get('result_timeout', 3600)
+        if fetch_only:
+            return
+        for data_exporter in config.get('data_exporters', None) or []:
             type = data_exporter['type']
             if type == 'google_sheet':
-                exporter = GoogleSheetExporter(data_exporter['google_service_account_key_file'], data_exporter['spreadsheet_id'])
+                layout_cache_file = data_exporter.get('layout_cache_file', None)
+                exporter = GoogleSheetExporter(
+                    data_exporter['google_service_account_key_file'],
+                    data_exporter['spreadsheet_id'],
+                    Path(layout_cache_file) if layout_cache_file else None
+                )
             elif type == 'csv':
                 exporter = CsvExporter(Path(data_exporter['csv_file_directory']))
+            elif type == 'sqlite':
+                exporter = SqliteExporter(Path(data_exporter['database_file']))
             else:
                 message = f"Unsupported data exporter type: {type}"
                 logger.error(message)
                 raise Exception(message)
             self.data_exporters.append(exporter)
+        price_alerts_yaml = config.get('price_alerts', None)
+        if price_alerts_yaml:
+            notifiers: list[Notifier] = []
+            for notifier_yaml in price_alerts_yaml.get('notifiers', None) or []:
+                type = notifier_yaml['type']
+                if type == 'webhook':
+                    notifier = WebhookNotifier(notifier_yaml['url'], notifier_yaml.get('headers', None))
+                elif type == 'log':
+                    notifier = LogNotifier(Path(notifier_yaml['file']) if 'file' in notifier_yaml else None)
+                else:
+                    message = f"Unsupported notifier type: {type}"
+                    logger.error(message)
+                    raise Exception(message)
+                notifiers.append(notifier)
+            state_file = price_alerts_yaml.get('state_file', None)
+            self.price_alerter = PriceAlerter(
+                notifiers=notifiers,
+                state_file=Path(state_file) if state_file else None,
+                absolute_drop=price_alerts_yaml.get('absolute_drop', None),
+                percent_drop=price_alerts_yaml.get('percent_drop', None),
+                all_time_low=price_alerts_yaml.get('all_time_low', False)
+            )
+
+    def item_group_intervals(self) -> dict[str, float]:
+        """
+        Returns the seconds between price checks of each item group in daemon mode.
+        """
+        return {item_group.group_name: item_group.interval if item_group.interval else self.daemon_interval for item_group in self.item_groups}
+
+    def __parse_items(self, config: dict, previous_config: 'PriceCheckerConfig') -> list[str]:
+        errors: list[str] = []
+        previous_price_selectors = previous_config.price_selector_definitions if previous_config else {}
+        previous_special_tweaks = previous_config.special_tweak_definitions if previous_config else {}
+        price_selector_keys: dict[str, str] = {}
+        for index, price_selector_yaml in enumerate(config.get('price_selectors', None) or []):
+            selector_name = price_selector_yaml.get('selector_name', None)
+            if not selector_name:
+                errors.append(f"Price selector {index + 1} has no selector_name.")
+                continue
+            if selector_name in price_selector_keys:
+                errors.append(f"Duplicate price selector: {selector_name}.")
+                continue
+            key = self.__definition_key(price_selector_yaml, 'selector_name')
+            price_selector = self.price_selector_definitions.get(key, None) or previous_price_selectors.get(key, None)
+            if price_selector is None:
+                try:
+                    price_selector = PriceSelector(
+                        full_price_selector=price_selector_yaml.get('full_price_selector', None),
+                        decimal_integer_selector=price_selector_yaml.get('decimal_integer_selector', None),
+                        decimal_fraction_selector=price_selector_yaml.get('decimal_fraction_selector', None),
+                        use_structured_data=price_selector_yaml.get('use_structured_data', False),
+                        decimal_point=price_selector_yaml.get('decimal_point', None),
+                        currency=price_selector_yaml.get('currency', None),
+                        render_javascript=price_selector_yaml.get('render_javascript', False)
+                    )
+                except Exception as error:
+                    errors.append(f"Invalid price selector: {selector_name}. {error}")
+                    continue
+            self.price_selector_definitions[key] = price_selector
+            self.price_selectors[selector_name] = price_selector
+            price_selector_keys[selector_name] = key
+        special_tweak_keys: dict[str, str] = {}
+        for index, special_tweak_yaml in enumerate(config.get('special_tweaks', None) or []):
+            tweak_name = special_tweak_yaml.get('tweak_name', None)
+            if not tweak_name:
+                errors.append(f"Special tweak {index + 1} has no tweak_name.")
+                continue
+            if tweak_name in special_tweak_keys:
+                errors.append(f"Duplicate special tweak: {tweak_name}.")
+                continue
+            key = self.__definition_key(special_tweak_yaml, 'tweak_name')
+            special_tweak = self.special_tweak_definitions.get(key, None) or previous_special_tweaks.get(key, None)
+            if special_tweak is None:
+                special_tweak = SpecialTweak(
+                    cookies=special_tweak_yaml.get('cookies', None),
+                    headers=special_tweak_yaml.get('headers', None),
+                    render_javascript=special_tweak_yaml.get('render_javascript', False)
+                )
+            self.special_tweak_definitions[key] = special_tweak
+            self.special_tweaks[tweak_name] = special_tweak
+            special_tweak_keys[tweak_name] = key
+        previous_item_definitions = previous_config.item_definitions if previous_config else {}
+        item_group_names: set[str] = set()
+        for index, item_group_yaml in enumerate(config.get('item_groups', None) or []):
+            item_group_name = item_group_yaml.get('group_name', None)
+            if item_group_yaml.get('disabled', False):
+                logger.warn(f"Skip item group: {item_group_name}")
+                continue
+            if not item_group_name:
+                errors.append(f"Item group {index + 1} has no group_name.")
+                continue
+            if item_group_name in item_group_names:
+                errors.append(f"Duplicate item group: {item_group_name}.")
+                continue
+            item_group_names.add(item_group_name)
+            interval = item_group_yaml.get('interval', None)
+            if interval is not None and not self.__is_positive_number(interval):
+                errors.append(f"interval must be a positive number of seconds for item group: {item_group_name}. Got: {interval}")
+                continue
+            item_group = ItemGroup(item_group_name, interval=interval)
+            for item_yaml in item_group_yaml.get('items', None) or []:
+                if item_yaml.get('disabled', False):
+                    logger.warn(f"Skip item: {item_yaml.get('name', None)} in item group: {item_group_name}")
+                    continue
+                item_name = item_yaml.get('name', None)
+                item_errors = self.__validate_item(item_group_name, item_yaml, price_selector_keys, special_tweak_keys)
+                if not item_errors and (item_group_name, item_name) in self.item_definitions:
+                    item_errors.append(f"Duplicate item: {item_name} in item group: {item_group_name}.")
+                if item_errors:
+                    errors.extend(item_errors)
+                    continue
+                special_tweak_name = item_yaml.get('special_tweak', None)
+                definition = (
+                    item_yaml['url'],
+                    price_selector_keys[item_yaml['price_selector']],
+                    special_tweak_keys[special_tweak_name] if special_tweak_name else None,
+                    item_yaml.get('get_price_delay', 0),
+                    item_yaml.get('price', None)
+                )
+                previous = previous_item_definitions.get((item_group_name, item_name), None)
+                if previous and previous[0] == definition:
+                    item = previous[1]
+                else:
+                    item = Item(
+                        name=item_name,
+                        url=item_yaml['url'],
+                        price_selector=self.price_selectors[item_yaml['price_selector']],
+                        special_tweak=self.special_tweaks[special_tweak_name] if special_tweak_name else None,
+                        get_price_delay=item_yaml.get('get_price_delay', 0),
+                        price=item_yaml.get('price', None)
+                    )
+                self.item_definitions[(item_group_name, item_name)] = (definition, item)
+                item_group.add(item)
+            self.item_groups.append(item_group)
+        return errors
+
+    def __validate_item(self, item_group_name: str, item_yaml: dict, price_selector_keys: dict[str, str], special_tweak_keys: dict[str, str]) -> list[str]:
+        item_name = item_yaml.get('name', None)
+        if not item_name:
+            return [f"Item without name in item group: {item_group_name}."]
+        item_description = f"item: {item_name} in item group: {item_group_name}"
+        errors = []
+        if not item_yaml.get('url', None):
+            errors.append(f"No url for {item_description}.")
+        price_selector_name = item_yaml.get('price_selector', None)
+        if not price_selector_name:
+            errors.append(f"No price_selector for {item_description}.")
+        elif price_selector_name not in price_selector_keys:
+            errors.append(self.__unknown_name_error('price_selector', price_selector_name, item_description, price_selector_keys.keys()))
+        special_tweak_name = item_yaml.get('special_tweak', None)
+        if special_tweak_name and special_tweak_name not in special_tweak_keys:
+            errors.append(self.__unknown_name_error('special_tweak', special_tweak_name, item_description, special_tweak_keys.keys()))
+        get_price_delay = item_yaml.get('get_price_delay', 0)
+        if not isinstance(get_price_delay, (int, float)) or get_price_delay < 0:
+            errors.append(f"get_price_delay must be a non-negative number for {item_description}. Got: {get_price_delay}")
+        price = item_yaml.get('price', None)
+        if price is not None and not isinstance(price, (int, float)):
+            errors.append(f"price must be a number for {item_description}. Got: {price}")
+        return errors
+
+    def __validate_settings(self, config: dict) -> list[str]:
+        errors: list[str] = []
+        price_fetcher_yaml = self.__section(config, 'price_fetcher', dict, errors)
+        http_cache_yaml = self.__section(price_fetcher_yaml, 'http_cache', dict, errors, 'price_fetcher.')
+        if http_cache_yaml:
+            if not http_cache_yaml.get('cache_file', None):
+                errors.append('No cache_file for price_fetcher.http_cache.')
+            self.__validate_positive_number(http_cache_yaml, 'max_entries', 'price_fetcher.http_cache', errors, integer=True)
+        daemon_yaml = self.__section(config, 'daemon', dict, errors)
+        for key in ('interval', 'config_check_interval'):
+            self.__validate_positive_number(daemon_yaml, key, 'daemon', errors)
+        sharding_yaml = self.__section(config, 'sharding', dict, errors)
+        if sharding_yaml:
+            if 'workers' not in sharding_yaml:
+                errors.append('No workers for sharding.')
+            self.__validate_positive_number(sharding_yaml, 'workers', 'sharding', errors, integer=True)
+            self.__validate_positive_number(sharding_yaml, 'result_timeout', 'sharding', errors)
+            if not sharding_yaml.get('local_workers', True) and not sharding_yaml.get('queue_file', None):
+                errors.append('sharding.queue_file must be set for workers that are not started by the coordinator.')
+        for index, data_exporter_yaml in enumerate(self.__section(config, 'data_exporters', list, errors)):
+            errors.extend(self.__validate_typed_entry(data_exporter_yaml, f"Data exporter {index + 1}", DATA_EXPORTER_KEYS))
+        price_alerts_yaml = self.__section(config, 'price_alerts', dict, errors)
+        for index, notifier_yaml in enumerate(self.__section(price_alerts_yaml, 'notifiers', list, errors, 'price_alerts.')):
+            errors.extend(self.__validate_typed_entry(notifier_yaml, f"Notifier {index + 1}", NOTIFIER_KEYS))
+        return errors
+
+    def __section(self, parent_yaml: dict, key: str, section_type: type, errors: list[str], prefix: str=''):
+        # a missing or empty section is an empty one
+        section = parent_yaml.get(key, None) or section_type()
+        if not isinstance(section, section_type):
+            errors.append(f"{prefix}{key} must be a {'list' if section_type is list else 'mapping'}. Got: {section}")
+            return section_type()
+        return section
+
+    def __validate_positive_number(self, section_yaml: dict, key: str, section_name: str, errors: list[str], integer: bool=False) -> None:
+        value = section_yaml.get(key, None)
+        if value is None:
+            return
+        if not self.__is_positive_number(value) or (integer and not isinstance(value, int)):
+            errors.append(f"{section_name}.{key} must be a positive {'integer' if integer else 'number'}. Got: {value}")
+
+    def __validate_typed_entry(self, entry_yaml: dict, description: str, required_keys: dict[str, list[str]]) -> list[str]:
+        if not isinstance(entry_yaml, dict):
+            return [f"{description} must be a mapping. Got: {entry_yaml}"]
+        entry_type = entry_yaml.get('type', None)
+        if not entry_type:
+            return [f"{description} has no type."]
+        if entry_type not in required_keys:
+            return [f"{description} has unsupported type: {entry_type}. Supported types: {', '.join(required_keys)}"]
+        return [f"No {key} for {description} of type: {entry_type}." for key in required_keys[entry_type] if not entry_yaml.get(key, None)]
+
+    def __is_positive_number(self, value) -> bool:
+        # YAML booleans are ints in python
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+    def __unknown_name_error(self, setting: str, name: str, item_description: str, known_names) -> str:
+        message = f"Unknown {setting}: '{name}' for {item_description}."
+        close_matches = difflib.get_close_matches(str(name), list(known_names), n=1)
+        if close_matches:
+            message += f" Did you mean '{close_matches[0]}'?"
+        return message
+
+    def __definition_key(self, definition_yaml: dict, name_key: str) -> str:
+        return json.dumps({key: value for key, value in definition_yaml.items() if key != name_key}, sort_keys=True, default=str)
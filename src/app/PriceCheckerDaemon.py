@@ -0,0 +1,179 @@
+import hashlib
+import io
+import logging
+import signal
+import threading
+import time
+import traceback
+from pathlib import Path
+from app.Metrics import metrics
+from app.PriceChecker import PriceChecker
+from app.PriceCheckerConfig import PriceCheckerConfig
+from model.ItemGroup import ItemGroup
+from shard.ShardCoordinator import ShardCoordinator
+
+logger = logging.getLogger(__name__)
+
+class PriceCheckerDaemon(object):
+    def __init__(self, config_file: Path, no_export: bool=False):
+        self.config_file = config_file
+        self.no_export = no_export
+        self.config: PriceCheckerConfig = None
+        self.config_mtime: float = None
+        self.config_digest: str = None
+        self.next_runs: dict[str, float] = {}
+        # added and changed items of item groups that are not due yet, run on their own after a reload
+        self.pending_items: dict[str, set[str]] = {}
+        self.shard_coordinator: ShardCoordinator = None
+        self.stop_event = threading.Event()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        self.__reload_config_if_changed()
+        if self.config is None:
+            message = f"Unable to load config file: {self.config_file}"
+            logger.error(message)
+            raise Exception(message)
+        metrics_server = metrics.serve(self.config.metrics_port) if self.config.metrics_port else None
+        logger.info(f"Started daemon with config file: {self.config_file}")
+        while not self.stop_event.is_set():
+            self.__reload_config_if_changed()
+            due_item_groups = self.__pop_due_item_groups()
+            if due_item_groups:
+                logger.info(f"Checking prices for item groups: {[item_group.group_name for item_group in due_item_groups]}")
+                try:
+                    PriceChecker(self.config, self.shard_coordinator).run(due_item_groups, no_export=self.no_export)
+                except Exception as error:
+                    logger.error(f"Unable to check prices. Error: {error}")
+                    traceback.print_exc()
+            self.stop_event.wait(self.__seconds_until_next_run())
+        if self.shard_coordinator:
+            self.shard_coordinator.close()
+        self.config.price_fetcher.close()
+        for data_exporter in self.config.data_exporters:
+            data_exporter.close()
+        if metrics_server:
+            metrics_server.shutdown()
+        logger.info('Stopped daemon')
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def __pop_due_item_groups(self) -> list[ItemGroup]:
+        now = time.monotonic()
+        due_item_groups = []
+        for item_group in self.config.item_groups:
+            group_name = item_group.group_name
+            if self.next_runs.get(group_name, 0) <= now:
+                due_item_groups.append(item_group)
+                self.next_runs[group_name] = now + self.__interval(item_group)
+                self.pending_items.pop(group_name, None)
+            elif group_name in self.pending_items:
+                item_names = self.pending_items.pop(group_name)
+                items = [item for item in item_group.items if item.name in item_names]
+                if items:
+                    due_item_groups.append(ItemGroup(group_name, items, item_group.interval))
+        return due_item_groups
+
+    def __seconds_until_next_run(self) -> float:
+        next_run = min(self.next_runs.values(), default=time.monotonic() + self.config.daemon_interval)
+        seconds = max(0, next_run - time.monotonic())
+        return min(seconds, self.config.config_check_interval)
+
+    def __interval(self, item_group: ItemGroup) -> float:
+        return item_group.interval if item_group.interval else self.config.daemon_interval
+
+    def __reload_config_if_changed(self) -> None:
+        try:
+            mtime = self.config_file.stat().st_mtime
+        except OSError as error:
+            logger.error(f"Unable to read config file: {self.config_file}. Error: {error}")
+            return
+        if mtime == self.config_mtime:
+            return
+        try:
+            config_bytes = self.config_file.read_bytes()
+        except OSError as error:
+            logger.error(f"Unable to read config file: {self.config_file}. Error: {error}")
+            return
+        # e.g. a file touched or saved without changes is not loaded again
+        digest = hashlib.sha256(config_bytes).hexdigest()
+        if digest == self.config_digest:
+            self.config_mtime = mtime
+            return
+        try:
+            config = PriceCheckerConfig(io.StringIO(config_bytes.decode('utf-8')), self.config)
+        except Exception as error:
+            # keep running with the last valid config
+            logger.error(f"Unable to reload config file: {self.config_file}. Error: {error}")
+            traceback.print_exc()
+            self.config_mtime = mtime
+            self.config_digest = digest
+            return
+        if self.config is not None:
+            self.__reuse_warm_state(self.config, config)
+            logger.info(f"Reloaded config file: {self.config_file} with {config.config_diff.summary()}")
+        group_names = {item_group.group_name for item_group in config.item_groups}
+        self.next_runs = {name: next_run for name, next_run in self.next_runs.items() if name in group_names}
+        self.pending_items = {name: item_names for name, item_names in self.pending_items.items() if name in group_names}
+        if config.config_diff:
+            # unchanged items keep their schedule, new item groups are due right away
+            previous_intervals = self.config.item_group_intervals()
+            for group_name in self.next_runs.keys():
+                item_names = config.config_diff.rescheduled_items(group_name)
+                if item_names:
+                    self.pending_items.setdefault(group_name, set()).update(item_names)
+                # the next run is counted from the last run with the new interval, it is due right away if that is in the past
+                interval = config.config_diff.changed_intervals.get(group_name, None)
+                if interval is not None:
+                    self.next_runs[group_name] += interval - previous_intervals[group_name]
+        self.__update_shard_coordinator(self.config, config)
+        self.config = config
+        self.config_mtime = mtime
+        self.config_digest = digest
+
+    def __update_shard_coordinator(self, old_config: PriceCheckerConfig, new_config: PriceCheckerConfig) -> None:
+        # local shard workers keep running, and reload the config file themselves, unless sharding changed
+        sharding = (new_config.shard_workers, new_config.shard_queue_file, new_config.shard_local_workers, new_config.shard_result_timeout)
+        if old_config is not None and sharding == (old_config.shard_workers, old_config.shard_queue_file, old_config.shard_local_workers, old_config.shard_result_timeout):
+            return
+        if self.shard_coordinator:
+            self.shard_coordinator.close()
+            self.shard_coordinator = None
+        if new_config.shard_workers:
+            self.shard_coordinator = ShardCoordinator.from_config(self.config_file, new_config)
+
+    def __reuse_warm_state(self, old_config: PriceCheckerConfig, new_config: PriceCheckerConfig) -> None:
+        old_price_fetcher = old_config.price_fetcher
+        new_price_fetcher = new_config.price_fetcher
+        if old_price_fetcher.max_concurrency_per_host == new_price_fetcher.max_concurrency_per_host:
+            new_price_fetcher.session_pool = old_price_fetcher.session_pool
+        else:
+            old_price_fetcher.session_pool.close()
+        old_browser_pool = old_price_fetcher.browser_pool
+        new_browser_pool = new_price_fetcher.browser_pool
+        if old_browser_pool and new_browser_pool and (old_browser_pool.max_pages, old_browser_pool.timeout) == (new_browser_pool.max_pages, new_browser_pool.timeout):
+            new_price_fetcher.browser_pool = old_browser_pool
+        elif old_browser_pool:
+            old_browser_pool.close()
+        # the parse pool belongs to the price selectors of the old config
+        if old_price_fetcher.parse_pool:
+            old_price_fetcher.parse_pool.close()
+        # without a state file, the last known prices of price alerts only live in the old alerter
+        old_price_alerter = old_config.price_alerter
+        new_price_alerter = new_config.price_alerter
+        if old_price_alerter and new_price_alerter and new_price_alerter.state_file in (None, old_price_alerter.state_file):
+            new_price_alerter.states = old_price_alerter.states
+        # exporters with the same settings keep their loaded clients, the others are closed
+        old_data_exporters = {data_exporter.exportor_info(): data_exporter for data_exporter in old_config.data_exporters}
+        data_exporters = []
+        for data_exporter in new_config.data_exporters:
+            old_data_exporter = old_data_exporters.pop(data_exporter.exportor_info(), None)
+            if old_data_exporter is not None:
+                data_exporter.close()
+                data_exporter = old_data_exporter
+            data_exporters.append(data_exporter)
+        for old_data_exporter in old_data_exporters.values():
+            old_data_exporter.close()
+        new_config.data_exporters = data_exporters
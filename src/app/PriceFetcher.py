@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from urllib.parse import urlsplit
+from app.BrowserPool import BrowserPool
+from app.HttpCache import HttpCache
+from app.ParsePool import ParsePool
+from app.Metrics import metrics
+from app.RetryScheduler import FetchError, RetryScheduler
+from app.SessionPool import SessionPool
+from model.Item import Item
+from model.ItemGroup import ItemGroup
+
+logger = logging.getLogger(__name__)
+
+class RenderRequired(Exception):
+    """
+    Raised when the fetched page has no price and the item is rendered in the browser instead.
+    """
+    def __init__(self, error: ValueError, etag: str, last_modified: str):
+        super().__init__(str(error))
+        self.etag = etag
+        self.last_modified = last_modified
+
+class PriceFetcher(object):
+    def __init__(self,
+                 max_concurrency: int=16,
+                 max_concurrency_per_host: int=2,
+                 retry_scheduler: RetryScheduler=None,
+                 http_cache: HttpCache=None,
+                 parse_pool: ParsePool=None,
+                 browser_pool: BrowserPool=None):
+        if max_concurrency < 1 or max_concurrency_per_host < 1:
+            message = f"Fetch concurrency limits must be positive. Got max_concurrency: {max_concurrency}, max_concurrency_per_host: {max_concurrency_per_host}"
+            logger.error(message)
+            raise Exception(message)
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.session_pool = SessionPool(pool_maxsize=max_concurrency_per_host)
+        self.retry_scheduler = retry_scheduler if retry_scheduler else RetryScheduler()
+        self.http_cache = http_cache
+        self.parse_pool = parse_pool
+        self.browser_pool = browser_pool
+
+    def fetch_all(self, item_groups: list[ItemGroup], on_group_fetched: Callable[[ItemGroup], None]=None) -> None:
+        """
+        Fetches prices of all items in the item groups.
+        `on_group_fetched` is called with each item group as soon as all of its items are fetched.
+        """
+        items = [item for item_group in item_groups for item in item_group.items if not item.is_hard_coded]
+        start = time.monotonic()
+        self.retry_scheduler.reset()
+        if self.http_cache:
+            self.http_cache.load()
+        asyncio.run(self.__fetch_items(item_groups, on_group_fetched))
+        if self.http_cache:
+            self.http_cache.save()
+        logger.info(f"Fetched {len(items)} items in {time.monotonic() - start:.2f} seconds")
+
+    def close(self) -> None:
+        self.session_pool.close()
+        if self.parse_pool:
+            self.parse_pool.close()
+        if self.browser_pool:
+            self.browser_pool.close()
+
+    async def __fetch_items(self, item_groups: list[ItemGroup], on_group_fetched: Callable[[ItemGroup], None]) -> None:
+        # the default executor of `to_thread` has fewer threads than `max_concurrency` on small machines
+        render_concurrency = self.browser_pool.max_pages if self.browser_pool else 0
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.max_concurrency + render_concurrency, thread_name_prefix='fetcher'))
+        global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        render_semaphore = asyncio.Semaphore(max(render_concurrency, 1))
+        host_semaphores: dict[str, asyncio.Semaphore] = {}
+        host_locks: dict[str, asyncio.Lock] = {}
+        host_next_start: dict[str, float] = {}
+        group_tasks = []
+        for item_group in item_groups:
+            tasks = []
+            for item in item_group.items:
+                if item.is_hard_coded:
+                    continue
+                host = urlsplit(item.url).netloc.lower()
+                if host not in host_semaphores:
+                    host_semaphores[host] = asyncio.Semaphore(self.max_concurrency_per_host)
+                    host_locks[host] = asyncio.Lock()
+                    host_next_start[host] = 0
+                tasks.append(asyncio.create_task(self.__fetch_item(item, host, global_semaphore, host_semaphores[host], host_locks[host], host_next_start, render_semaphore)))
+            group_tasks.append(self.__fetch_group(item_group, tasks, on_group_fetched))
+        await asyncio.gather(*group_tasks)
+
+    async def __fetch_group(self, item_group: ItemGroup, tasks: list[asyncio.Task], on_group_fetched: Callable[[ItemGroup], None]) -> None:
+        await asyncio.gather(*tasks)
+        if on_group_fetched:
+            on_group_fetched(item_group)
+
+    async def __fetch_item(self,
+                           item: Item,
+                           host: str,
+                           global_semaphore: asyncio.Semaphore,
+                           host_semaphore: asyncio.Semaphore,
+                           host_lock: asyncio.Lock,
+                           host_next_start: dict[str, float],
+                           render_semaphore: asyncio.Semaphore) -> None:
+        attempt = 0
+        while True:
+            attempt += 1
+            item.fetch_attempts = attempt
+            render_required = None
+            async with host_semaphore:
+                # `get_price_delay` spaces out requests to the same host instead of pausing the whole run
+                async with host_lock:
+                    now = time.monotonic()
+                    start_at = max(now, host_next_start[host]) + item.get_price_delay
+                    host_next_start[host] = start_at
+                if start_at > now:
+                    await asyncio.sleep(start_at - now)
+                async with global_semaphore:
+                    fetch_start = time.monotonic()
+                    try:
+                        item.price = await asyncio.to_thread(self.__fetch_price, item)
+                        item.fetch_latency = time.monotonic() - fetch_start
+                        logger.info(f"Fetched '{item.name}' priced at {item.price}")
+                        self.__record_metrics(item, host)
+                        return
+                    except RenderRequired as error:
+                        render_required = error
+                    except Exception as error:
+                        item.fetch_latency = time.monotonic() - fetch_start
+                        last_error = error
+            if render_required:
+                # rendering is limited by the pages of the browser, other items keep fetching in the meantime
+                async with render_semaphore:
+                    try:
+                        item.price = await asyncio.to_thread(self.__render_price, item, render_required)
+                        item.fetch_latency = time.monotonic() - fetch_start
+                        logger.info(f"Fetched '{item.name}' priced at {item.price}")
+                        self.__record_metrics(item, host)
+                        return
+                    except Exception as error:
+                        item.fetch_latency = time.monotonic() - fetch_start
+                        last_error = error
+            # back off outside of the semaphores so other items keep fetching in the meantime
+            delay = self.retry_scheduler.next_delay(last_error, attempt)
+            if delay is None:
+                item.price = None
+                item.fetch_status = 'failed'
+                logger.error(f"Unable to get price for '{item.name}' after {attempt} attempts. Error: {last_error}")
+                if not isinstance(last_error, FetchError):
+                    traceback.print_exception(type(last_error), last_error, last_error.__traceback__)
+                self.__record_metrics(item, host)
+                return
+            logger.warn(f"Retrying '{item.name}' in {delay:.2f} seconds. Error: {last_error}")
+            metrics.inc('pricechecker_fetch_retries_total', {'host': host}, help='Retried price fetches')
+            await asyncio.sleep(delay)
+
+    def __fetch_price(self, item: Item) -> float:
+        session = self.session_pool.get_session(item.url, item.special_tweak)
+        cache_entry = self.http_cache.get(item.url, item.price_selector, item.special_tweak) if self.http_cache else None
+        headers = cache_entry.conditional_headers() if cache_entry and cache_entry.price is not None else None
+        item.fetch_timings = {}
+        item.response_size = None
+        # the body is streamed, so time to first byte and download time can be told apart
+        with session.get(item.url, headers=headers, timeout=20, stream=True) as response:
+            # requests measures `elapsed` until the response headers are parsed, including dns lookup and connect
+            item.fetch_timings['ttfb'] = response.elapsed.total_seconds()
+            if response.status_code == 304 and headers:
+                logger.info(f"'{item.name}' is not modified since last fetch")
+                item.fetch_status = 'not_modified'
+                return cache_entry.price
+            if response.status_code >= 400:
+                raise FetchError.from_response(response)
+            download_start = time.monotonic()
+            content = response.content
+            item.fetch_timings['download'] = time.monotonic() - download_start
+        item.response_size = len(content)
+        parse_start = time.monotonic()
+        try:
+            price = self.__scrape_price(item, content)
+        except ValueError as error:
+            item.fetch_timings['parse'] = time.monotonic() - parse_start
+            if not self.__should_render(item):
+                raise
+            # the price is likely rendered by JavaScript, the browser is only used when the static page has no price
+            raise RenderRequired(error, response.headers.get('etag', None), response.headers.get('last-modified', None))
+        item.fetch_timings['parse'] = time.monotonic() - parse_start
+        item.fetch_status = 'fetched'
+        if self.http_cache:
+            self.http_cache.put(item.url, item.price_selector, item.special_tweak, response.headers.get('etag', None), response.headers.get('last-modified', None), price)
+        return price
+
+    def __render_price(self, item: Item, render_required: RenderRequired) -> float:
+        logger.info(f"No price in static page of '{item.name}', rendering it in browser. Error: {render_required}")
+        render_start = time.monotonic()
+        price_selector = item.price_selector
+        rendered_content = self.browser_pool.render(item.url, item.special_tweak, price_selector.full_price_selector or price_selector.decimal_integer_selector)
+        price = self.__scrape_price(item, rendered_content)
+        item.fetch_timings['render'] = time.monotonic() - render_start
+        item.fetch_status = 'rendered'
+        if self.http_cache:
+            self.http_cache.put(item.url, item.price_selector, item.special_tweak, render_required.etag, render_required.last_modified, price)
+        return price
+
+    def __scrape_price(self, item: Item, content: bytes) -> float:
+        if self.parse_pool:
+            return self.parse_pool.scrape_price(item.price_selector, content)
+        return item.price_selector.scrape_price(content)
+
+    def __should_render(self, item: Item) -> bool:
+        if not self.browser_pool:
+            return False
+        return item.price_selector.render_javascript or (item.special_tweak is not None and item.special_tweak.render_javascript)
+
+    def __record_metrics(self, item: Item, host: str) -> None:
+        metrics.inc('pricechecker_fetch_total', {'host': host, 'status': item.fetch_status}, help='Price fetches by final status')
+        if item.fetch_latency is not None:
+            metrics.observe('pricechecker_fetch_seconds', item.fetch_latency, {'host': host}, help='Duration of the last attempt of price fetches')
+        for phase, seconds in item.fetch_timings.items():
+            metrics.observe('pricechecker_fetch_phase_seconds', seconds, {'host': host, 'phase': phase}, help='Duration of price fetch phases: ttfb, download, render and parse')
+        if item.response_size is not None:
+            metrics.observe('pricechecker_response_bytes', item.response_size, {'host': host}, help='Size of product pages')
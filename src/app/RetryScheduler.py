@@ -0,0 +1,70 @@
+import logging
+import random
+import requests
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+class FetchError(Exception):
+    def __init__(self, message: str, status_code: int=None, retry_after: float=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @staticmethod
+    def from_response(response: requests.Response) -> 'FetchError':
+        retry_after = parse_retry_after(response.headers.get('retry-after', None))
+        return FetchError(f"HTTP {response.status_code} from {response.url}", response.status_code, retry_after)
+
+class RetryScheduler(object):
+    def __init__(self, max_tries: int=5, base_delay: float=1, max_delay: float=60, retry_budget: float=300):
+        self.max_tries = max_tries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.remaining_budget = retry_budget
+
+    def reset(self) -> None:
+        self.remaining_budget = self.retry_budget
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, FetchError):
+            return error.status_code is None or error.status_code in RETRYABLE_STATUS_CODES
+        # connection errors, timeouts and broken responses are transient, parse failures are not
+        return isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+
+    def next_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Returns seconds to wait before the next attempt, or None if the failed attempt should not be retried.
+        `attempt` is the number of attempts made so far.
+        """
+        if attempt >= self.max_tries or not self.is_retryable(error):
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None
+            delay = max(delay, retry_after)
+        if delay > self.remaining_budget:
+            logger.warn(f"Retry budget exhausted. Remaining: {self.remaining_budget:.2f} seconds, needed: {delay:.2f} seconds")
+            return None
+        self.remaining_budget -= delay
+        return delay
+
+def parse_retry_after(value: str) -> float:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
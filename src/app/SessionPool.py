@@ -0,0 +1,48 @@
+import logging
+import requests
+import threading
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from model.SpecialTweak import SpecialTweak, default_headers
+
+try:
+    import brotli  # noqa: F401  urllib3 decodes `br` responses only when brotli is installed
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+logger = logging.getLogger(__name__)
+
+class SessionPool(object):
+    def __init__(self, pool_maxsize: int=2):
+        self.pool_maxsize = pool_maxsize
+        self.sessions: dict[tuple[str, str], requests.Session] = {}
+        self.lock = threading.Lock()
+
+    def get_session(self, url: str, special_tweak: SpecialTweak=None) -> requests.Session:
+        parts = urlsplit(url)
+        key = (f"{parts.scheme}://{parts.netloc.lower()}", special_tweak.key if special_tweak else None)
+        with self.lock:
+            session = self.sessions.get(key, None)
+            if session is None:
+                session = self.__create_session(key[0], special_tweak)
+                self.sessions[key] = session
+                logger.debug(f"Created new session for {key[0]}")
+            return session
+
+    def close(self) -> None:
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+
+    def __create_session(self, base_url: str, special_tweak: SpecialTweak) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session.mount(base_url, adapter)
+        session.headers.update({'accept-encoding': ACCEPT_ENCODING, 'connection': 'keep-alive'})
+        session.headers.update(default_headers)
+        if special_tweak:
+            session.headers.update(special_tweak.headers)
+            session.cookies.update(special_tweak.cookies)
+        return session
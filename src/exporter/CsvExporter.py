@@ -1,5 +1,7 @@
 import csv
+import io
 import logging
+import os
 import traceback
 import shutil
 from datetime import datetime
@@ -16,12 +18,12 @@ class CsvExporter(DataExporter):
         super().__init__()
         self.csv_dir = csv_dir
         self.csv_dir.mkdir(parents=True, exist_ok=True)
-        self.insert_time = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
 
     def exportor_info(self) -> str:
         return f"CSV exporter exports all data to directory: {self.csv_dir.absolute()}"
 
     def export_data(self, item_groups: list[ItemGroup]) -> None:
+        self.insert_time = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
         for item_group in item_groups:
             try:
                 item_group_name = item_group.group_name
@@ -29,35 +31,26 @@ class CsvExporter(DataExporter):
                 item_headers = [i.name for i in items]
                 item_group_csv_file = self.csv_dir.joinpath(f"{item_group_name}.csv")
                 new_item_group_csv_file = self.csv_dir.joinpath(f"{item_group_name}.csv.tmp")
-                if not new_item_group_csv_file.exists():
-                    new_item_group_csv_file.open('x').close()
-                if not item_group_csv_file.exists():
-                    all_rows = []
-                else:
-                    with item_group_csv_file.open('r', newline='') as csv_file:
-                        reader = csv.reader(csv_file)
-                        all_rows = [row for row in reader]
-                if not all_rows:
-                    item_headers.insert(0, 'Date')
-                    item_prices = [self.insert_time]
-                    item_prices.extend([i.price for i in items])
-                    all_rows.append(item_headers)
-                    logger.info(f"Added new headers: {item_headers}")
-                    all_rows.append(item_prices)
-                    logger.info(f"Added new row: {item_prices}")
+                headers = self.__read_headers(item_group_csv_file)
+                if not headers:
+                    headers = ['Date']
+                    new_headers = [h for h in dict.fromkeys(item_headers)]
                 else:
-                    headers = all_rows[0]
-                    new_headers = [h for h in item_headers if h not in headers]
+                    new_headers = [h for h in dict.fromkeys(item_headers) if h not in headers]
+                # number of fields of the rows already in the file
+                field_count = len(headers)
+                item_price_dict = {item.name: item.price for item in items}
+                new_row = [self.insert_time]
+                for header in headers[1:] + new_headers:
+                    new_row.append(item_price_dict.get(header, None))
+                if new_headers or len(headers) == 1:
+                    # header changes are rare, only then the whole file is rewritten
                     headers.extend(new_headers)
                     logger.info(f"Added new headers: {new_headers}")
-                    item_price_dict = {item.name: item.price for item in items}
-                    new_row = [self.insert_time]
-                    for header in headers[1:]:
-                        new_row.append(item_price_dict.get(header, None))
-                    all_rows.append(new_row)
-                    logger.info(f"Added new row: {new_row}")
-                self.__write_to_csv(new_item_group_csv_file, all_rows)
-                shutil.move(new_item_group_csv_file, item_group_csv_file)
+                    self.__rewrite_csv(item_group_csv_file, new_item_group_csv_file, field_count, headers, new_row)
+                else:
+                    self.__append_to_csv(item_group_csv_file, field_count, new_row)
+                logger.info(f"Added new row: {new_row}")
                 logger.info(f"Finished exporting data to csv file: {item_group_csv_file.absolute()}")
             except Exception as error:
                     logger.error(f"Unable to export data to csv file: {item_group_csv_file.absolute()}. Error: {error}")
@@ -66,9 +59,85 @@ class CsvExporter(DataExporter):
                     continue
         logger.info(f"Finished exporting data to csv files under directory: {self.csv_dir.absolute()}")
 
+    def dry_run(self, item_groups: list[ItemGroup], work_directory: Path) -> None:
+        # copies of the existing files get the new rows, so new headers are added the same way
+        dry_run_dir = work_directory.joinpath('csv')
+        dry_run_dir.mkdir(parents=True, exist_ok=True)
+        for item_group in item_groups:
+            csv_file = self.csv_dir.joinpath(f"{item_group.group_name}.csv")
+            if csv_file.exists():
+                shutil.copyfile(csv_file, dry_run_dir.joinpath(csv_file.name))
+        CsvExporter(dry_run_dir).export_data(item_groups)
+
+    def __read_headers(self, csv_file_path: Path) -> list[str]:
+        if not csv_file_path.exists():
+            return []
+        with csv_file_path.open('r', newline='') as csv_file:
+            return next(csv.reader(csv_file), [])
+
+    @retry((Exception), tries=5, delay=1)
+    def __append_to_csv(self, csv_file_path: Path, field_count: int, row: list[object]) -> None:
+        with csv_file_path.open('rb+') as csv_file:
+            self.__terminate_last_row(csv_file, field_count)
+        with csv_file_path.open('a', newline='') as csv_file:
+            csv.writer(csv_file).writerow(row)
+            csv_file.flush()
+            os.fsync(csv_file.fileno())
+
+    def __terminate_last_row(self, csv_file: io.BufferedRandom, field_count: int) -> None:
+        # the last row has no line ending after a crash during the previous append, or after the file was saved by another app.
+        # a complete row gets its line ending, a partial row is dropped to keep the file valid
+        size = csv_file.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        csv_file.seek(size - 1)
+        if csv_file.read(1) == b'\n':
+            return
+        line_start = 0
+        position = size
+        while position > 0:
+            chunk_start = max(0, position - 4096)
+            csv_file.seek(chunk_start)
+            chunk = csv_file.read(position - chunk_start)
+            newline_index = chunk.rfind(b'\n')
+            if newline_index >= 0:
+                line_start = chunk_start + newline_index + 1
+                break
+            position = chunk_start
+        csv_file.seek(line_start)
+        last_line = csv_file.read(size - line_start).decode('utf-8', 'replace')
+        if self.__is_complete_row(last_line, field_count):
+            csv_file.seek(max(0, line_start - 2))
+            line_ending = b'\n' if line_start > 0 and csv_file.read(2) != b'\r\n' else b'\r\n'
+            csv_file.seek(size)
+            csv_file.write(line_ending)
+        else:
+            csv_file.truncate(line_start)
+            logger.warn(f"Removed partial row at the end of csv file: {csv_file.name}")
+
+    def __is_complete_row(self, line: str, field_count: int) -> bool:
+        try:
+            rows = list(csv.reader([line], strict=True))
+        except csv.Error:
+            return False
+        return len(rows) == 1 and len(rows[0]) == field_count
+
     @retry((Exception), tries=5, delay=1)
-    def __write_to_csv(self, csv_file_path: Path, all_rows: list[list[str]]) -> None:
-        with csv_file_path.open('w', newline='') as csv_file:
-            writer = csv.writer(csv_file)
-            for row in all_rows:
-                writer.writerow(row)
+    def __rewrite_csv(self, csv_file_path: Path, new_csv_file_path: Path, field_count: int, headers: list[str], row: list[object]) -> None:
+        with new_csv_file_path.open('w', newline='') as new_csv_file:
+            csv.writer(new_csv_file).writerow(headers)
+            if csv_file_path.exists():
+                # copy existing rows line by line, without loading the whole file into memory
+                with csv_file_path.open('r', newline='') as csv_file:
+                    csv_file.readline()
+                    for line in csv_file:
+                        if line.endswith('\n'):
+                            new_csv_file.write(line)
+                        elif self.__is_complete_row(line, field_count):
+                            new_csv_file.write(line + '\r\n')
+                        else:
+                            logger.warn(f"Removed partial row at the end of csv file: {csv_file_path.absolute()}")
+            csv.writer(new_csv_file).writerow(row)
+            new_csv_file.flush()
+            os.fsync(new_csv_file.fileno())
+        shutil.move(new_csv_file_path, csv_file_path)
@@ -1,7 +1,14 @@
 from abc import ABC, abstractmethod
+from pathlib import Path
 from model.ItemGroup import ItemGroup
 
 class DataExporter(ABC):
+    # exporters that batch remote writes get all item groups of a run in one `export_data` call instead of as soon as they are fetched
+    batches_exports = False
+
+    def __init__(self):
+        # number of calls per remote API endpoint, reset at the start of each run
+        self.api_calls: dict[str, int] = {}
 
     @abstractmethod
     def exportor_info(self) -> str:
@@ -10,3 +17,17 @@ class DataExporter(ABC):
     @abstractmethod
     def export_data(self, item_groups: list[ItemGroup]) -> None:
         pass
+
+    @abstractmethod
+    def dry_run(self, item_groups: list[ItemGroup], work_directory: Path) -> None:
+        """
+        Exports the item groups like `export_data` without changing the configured target.
+        Files are written to `work_directory` instead, remote targets are only read.
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Releases connections and files held between exports.
+        """
+        pass
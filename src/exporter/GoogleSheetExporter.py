@@ -1,12 +1,16 @@
 import gspread
+import json
 import logging
+import os
 import os.path
 import traceback
 from datetime import datetime
+from pathlib import Path
 from google.oauth2 import service_account
-from gspread.models import Spreadsheet, Worksheet
-from gspread.utils import absolute_range_name, rowcol_to_a1
+from gspread.models import Spreadsheet
+from gspread.utils import absolute_range_name
 from retry import retry
+from app.Metrics import metrics
 from exporter.DataExporter import DataExporter
 from model.Item import Item
 from model.ItemGroup import ItemGroup
@@ -18,8 +22,19 @@ SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets'
 ]
 
+NEW_WORKSHEET_ROWS = 10000
+NEW_WORKSHEET_COLS = 50
+COLS_TO_ADD = 50
+COLS_THRESHOLD = 20
+
+# Google Sheets counts date time values in days since 1899-12-30
+SHEETS_EPOCH = datetime(1899, 12, 30)
+
 class GoogleSheetExporter(DataExporter):
-    def __init__(self, service_account_key_file: str, spreadsheet_id: str):
+    # every export costs a spreadsheets.get, a values.batchGet and a batchUpdate
+    batches_exports = True
+
+    def __init__(self, service_account_key_file: str, spreadsheet_id: str, layout_cache_file: Path=None):
         super().__init__()
         if not os.path.isfile(service_account_key_file):
             message = f"Service Account key file does not exist: {service_account_key_file}"
@@ -27,180 +42,268 @@ class GoogleSheetExporter(DataExporter):
             raise Exception(message)
         self.service_account_key_file = service_account_key_file
         self.spreadsheet_id = spreadsheet_id
-        self.insert_time = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+        self.layout_cache_file = layout_cache_file
+        self.gspread_client: gspread.Client = None
 
     def exportor_info(self) -> str:
         return f"Google sheet exporter with spreadsheet id: {self.spreadsheet_id}"
 
     def export_data(self, item_groups: list[ItemGroup]) -> None:
+        self.insert_time = datetime.now().replace(microsecond=0)
+        group_names = [item_group.group_name for item_group in item_groups]
+        layout, is_cached_layout = self.__load_spreadsheet_layout(group_names)
+        spreadsheet_title = layout['title']
+        requests = self.__build_all_requests(layout, item_groups)
+        if requests:
+            try:
+                self.__batch_update(self.spreadsheet, requests)
+            except Exception as error:
+                if not is_cached_layout:
+                    logger.error(f"Unable to update worksheets in Google Sheet: {spreadsheet_title}. Error: {error}")
+                    raise error
+                # the probe does not catch every change, e.g. a column inserted and deleted again, so retry once with the layout of the spreadsheet
+                logger.warn(f"Unable to update worksheets in Google Sheet: {spreadsheet_title} with cached layout, loading layout again. Error: {error}")
+                self.__delete_layout_cache()
+                layout = self.__load_layout(group_names)
+                requests = self.__build_all_requests(layout, item_groups)
+                try:
+                    self.__batch_update(self.spreadsheet, requests)
+                except Exception as error:
+                    logger.error(f"Unable to update worksheets in Google Sheet: {spreadsheet_title}. Error: {error}")
+                    raise error
+        self.__save_layout(layout)
+        logger.info(f"Finished exporting data to Google Sheet: {spreadsheet_title}")
+
+    def dry_run(self, item_groups: list[ItemGroup], work_directory: Path) -> None:
+        # the spreadsheet is only read, the requests of the export are built but not sent
+        self.insert_time = datetime.now().replace(microsecond=0)
+        layout, _ = self.__load_spreadsheet_layout([item_group.group_name for item_group in item_groups])
+        requests = self.__build_all_requests(layout, item_groups)
+        logger.info(f"Dry run. Skip sending {len(requests)} requests to Google Sheet: {layout['title']}")
+
+    def __load_spreadsheet_layout(self, group_names: list[str]) -> tuple[dict, bool]:
         try:
             self.spreadsheet = self.__load_spreadsheet()
-            logger.info(f"Loaded Google Sheet: {self.spreadsheet.title}")
+            layout = self.__load_cached_layout(group_names)
+            is_cached_layout = layout is not None
+            if not is_cached_layout:
+                layout = self.__load_layout(group_names)
+            logger.info(f"Loaded Google Sheet: {layout['title']}")
         except Exception as error:
             logger.error(f"Unable to load spreadsheet with id: {self.spreadsheet_id}. Error: {error}")
             raise error
-        try:
-            all_sheets = self.__load_all_worksheets(self.spreadsheet)
-        except Exception as error:
-            logger.error(f"Unable to load worksheets in Google sheet: {self.spreadsheet.title}. Error: {error}")
-            raise error
+        return layout, is_cached_layout
 
+    def __build_all_requests(self, layout: dict, item_groups: list[ItemGroup]) -> list[dict]:
+        # all changes of all worksheets are sent in a single batchUpdate
+        all_sheets = layout['sheets']
+        requests = []
+        next_sheet_id = max([sheet['properties']['sheetId'] for sheet in all_sheets.values()], default=0) + 1
+        # worksheet titles are unique regardless of case, one addSheet with a taken title would reject the whole batchUpdate
+        sheet_titles = {sheet_title.lower(): sheet_title for sheet_title in all_sheets}
         for item_group in item_groups:
             group_name = item_group.group_name
-            items = item_group.items
-            if group_name in all_sheets:
-                self.sheet = all_sheets[group_name]
-            else:
-                try:
-                    self.sheet = self.__create_new_worksheet(self.spreadsheet, group_name)
-                    logger.info(f"Created new worksheet with title: {group_name}")
-                except Exception as error:
-                    logger.error(f"Unable to create new worksheet with title: {group_name}. Error: {error}")
-                    traceback.print_exc()
-                    continue
             try:
-                item_index_dict = {}
-                if self.__get_col_count(self.sheet) > 1:
-                    labels = self.__row_values(self.sheet, 1)
-                    item_index_dict = {value: i + 1 for i, value in enumerate(labels)}
-                self.sheet = self.__update_labels(self.sheet, items, item_index_dict)
-                self.sheet = self.__insert_new_data(self.sheet, items, item_index_dict)
-                logger.info(f"Finished exporting data to worksheet: {self.sheet.title} in Google Sheet: {self.spreadsheet.title}")
+                if group_name not in all_sheets:
+                    if group_name.lower() in sheet_titles:
+                        logger.error(f"Unable to export data to worksheet: {group_name} in Google Sheet: {layout['title']}. Worksheet title is already used by: {sheet_titles[group_name.lower()]}")
+                        continue
+                    sheet_titles[group_name.lower()] = group_name
+                    properties = {
+                        'sheetId': next_sheet_id,
+                        'title': group_name,
+                        'gridProperties': {'rowCount': NEW_WORKSHEET_ROWS, 'columnCount': NEW_WORKSHEET_COLS}
+                    }
+                    next_sheet_id += 1
+                    requests.append({'addSheet': {'properties': properties}})
+                    all_sheets[group_name] = {'properties': properties, 'labels': []}
+                    logger.info(f"Creating new worksheet with title: {group_name}")
+                requests.extend(self.__build_requests(all_sheets[group_name], item_group.items))
             except Exception as error:
-                logger.error(f"Unable to export data to worksheet: {self.sheet.title} in Google Sheet: {self.spreadsheet.title}. Error: {error}")
+                logger.error(f"Unable to export data to worksheet: {group_name} in Google Sheet: {layout['title']}. Error: {error}")
                 traceback.print_exc()
+                all_sheets.pop(group_name, None)
                 continue
-        logger.info(f"Finished exporting data to Google Sheet: {self.spreadsheet.title}")
+        return requests
 
-    @retry((Exception), tries=5, delay=1, backoff=2)
-    def __load_spreadsheet(self) -> Spreadsheet:
-        credentials = service_account.Credentials.from_service_account_file(self.service_account_key_file, scopes=SCOPES)
-        gspread_client = gspread.authorize(credentials)
-        return gspread_client.open_by_key(self.spreadsheet_id)
+    def __load_layout(self, group_names: list[str]) -> dict:
+        metadata = self.__fetch_sheet_metadata(self.spreadsheet)
+        all_sheets = {sheet['properties']['title']: {'properties': sheet['properties'], 'labels': []} for sheet in metadata.get('sheets', [])}
+        all_labels = self.__load_all_labels(self.spreadsheet, [group_name for group_name in group_names if group_name in all_sheets])
+        for sheet_title, labels in all_labels.items():
+            all_sheets[sheet_title]['labels'] = labels
+        return {'title': metadata['properties']['title'], 'sheets': all_sheets}
 
-    @retry((Exception), tries=5, delay=1, backoff=2)
-    def __load_all_worksheets(self, spreadsheet: Spreadsheet) -> list[Worksheet]:
-        return {sheet.title: sheet for sheet in spreadsheet.worksheets()}
+    def __load_cached_layout(self, group_names: list[str]) -> dict:
+        """
+        Returns the worksheet layout saved by the last export, if it still matches the spreadsheet.
+        Only the sheet properties and the label row are read for each worksheet,
+        so the cost does not grow with the number of rows.
+        """
+        if not self.layout_cache_file or not self.layout_cache_file.exists():
+            return None
+        try:
+            with self.layout_cache_file.open('r') as file:
+                layout = json.load(file).get(self.spreadsheet_id, None)
+        except (OSError, ValueError) as error:
+            logger.warn(f"Unable to load layout cache file: {self.layout_cache_file.absolute()}. Error: {error}")
+            return None
+        if not layout or any(group_name not in layout['sheets'] for group_name in group_names):
+            return None
+        sheets = [layout['sheets'][group_name] for group_name in group_names]
+        ranges = [absolute_range_name(sheet['properties']['title'], '1:1') for sheet in sheets]
+        try:
+            # not retried, the layout is loaded again if the probe fails, e.g. for a renamed worksheet
+            self.__count_api_call('spreadsheets.get')
+            metadata = self.spreadsheet.fetch_sheet_metadata({
+                'ranges': ranges,
+                'includeGridData': 'true',
+                'fields': 'sheets(properties(sheetId,title,gridProperties(rowCount,columnCount)),data(rowData(values(formattedValue))))'
+            })
+        except Exception as error:
+            logger.warn(f"Unable to validate cached layout of Google Sheet: {layout['title']}. Error: {error}")
+            return None
+        probed_sheets = {sheet['properties']['title']: sheet for sheet in metadata.get('sheets', [])}
+        for sheet in sheets:
+            title = sheet['properties']['title']
+            probed_sheet = probed_sheets.get(title, None)
+            if probed_sheet is None or probed_sheet['properties']['sheetId'] != sheet['properties']['sheetId']:
+                logger.info(f"Cached layout of worksheet: {title} is outdated. The worksheet was deleted or replaced")
+                return None
+            probed = self.__remove_trailing_empty_values(self.__row_values(probed_sheet))
+            if probed != sheet['labels']:
+                logger.info(f"Cached layout of worksheet: {title} is outdated. Its labels changed")
+                return None
+            sheet['properties']['gridProperties'] = probed_sheet['properties']['gridProperties']
+        return layout
 
-    @retry((Exception), tries=5, delay=1, backoff=2)
-    def __create_new_worksheet(self, spreadsheet: Spreadsheet, sheet_title: str) -> Worksheet:
-        return self.spreadsheet.add_worksheet(title=sheet_title, rows="10000", cols="50")
+    def __delete_layout_cache(self) -> None:
+        if not self.layout_cache_file:
+            return
+        try:
+            self.layout_cache_file.unlink(missing_ok=True)
+        except OSError as error:
+            logger.error(f"Unable to delete layout cache file: {self.layout_cache_file.absolute()}. Error: {error}")
 
-    def __insert_new_data(self, sheet: Worksheet, items: list[Item], item_index_dict: dict[str, int]) -> Worksheet:
-        col_number = self.__get_col_count(sheet)
-        new_row = [''] * col_number
-        new_row[0] = self.insert_time
-        for item in items:
-            item_col = item_index_dict[item.name]
-            new_row[item_col - 1] = item.price
-        row_number = self.__get_row_count(sheet) + 1
-        cell_to_insert = rowcol_to_a1(row_number, 1)
-        sheet.append_row(new_row, value_input_option='USER_ENTERED', table_range=cell_to_insert)
-        logger.info(f"Inserted new data row: {new_row} at cell: {cell_to_insert} in worksheet: {sheet.title}")
-        self.__format_date_cell(sheet, row_number, 1)
-        self.__format_currency_cells(sheet, row_number, 2, row_number, col_number)
-        return sheet
-
-    def __update_labels(self, sheet: Worksheet, items: list[Item], item_index_dict: dict[str, int]) -> Worksheet:
-        new_labels = []
-        col_number = self.__get_col_count(sheet)
-        if col_number == 0:
-            sheet.update_cell(1, 1, 'Date')
-            col_number += 1
-        col_start = col_number + 1
-        col_number = col_start
-        for item in items:
-            item_name = item.name
-            if not item_name in item_index_dict:
-                item_index_dict[item_name] = col_number
-                new_labels.append(item_name)
-                col_number += 1
-        if len(new_labels) == 0:
-            return sheet
-        cell_to_insert = rowcol_to_a1(1, col_start)
-        sheet.append_row(new_labels, value_input_option='USER_ENTERED', table_range=cell_to_insert)
-        logger.info(f"Created new labels: {new_labels} at cell: {cell_to_insert} in worksheet: {sheet.title}")
-        return sheet
-
-    def __get_row_count(self, sheet: Worksheet) -> int:
-        raw_values = self.__col_values(sheet, 1)
-        values = self.__remove_trailing_none_values(raw_values)
-        row_count = len(values)
-        if row_count == sheet.row_count - 100:
-            try:
-                self.__create_rows(sheet, 10000)
-                self.sheet = self.__refresh_sheet(self.spreadsheet, sheet)
-            except Exception as error:
-                logger.warn(f"Unable to create new rows: {error}")
-                pass
-        return row_count
-
-    def __get_col_count(self, sheet: Worksheet) -> int:
-        raw_values = self.__row_values(sheet, 1)
-        values = self.__remove_trailing_none_values(raw_values)
-        col_count = len(values)
-        if col_count == sheet.col_count - 20:
+    def __row_values(self, sheet: dict) -> list[str]:
+        data = sheet.get('data', [])
+        row_data = data[0].get('rowData', []) if data else []
+        cells = row_data[0].get('values', []) if row_data else []
+        return [cell.get('formattedValue', '') for cell in cells]
+
+    def __save_layout(self, layout: dict) -> None:
+        if not self.layout_cache_file:
+            return
+        all_layouts = {}
+        if self.layout_cache_file.exists():
             try:
-                self.__create_cols(sheet, 50)
-                self.sheet = self.__refresh_sheet(self.spreadsheet, sheet)
-            except Exception as error:
-                logger.warn(f"Unable to create new columns: {error}")
-                pass
-        return col_count
+                with self.layout_cache_file.open('r') as file:
+                    all_layouts = json.load(file)
+            except (OSError, ValueError):
+                all_layouts = {}
+        all_layouts[self.spreadsheet_id] = layout
+        new_layout_cache_file = self.layout_cache_file.with_name(f"{self.layout_cache_file.name}.tmp")
+        try:
+            with new_layout_cache_file.open('w') as file:
+                json.dump(all_layouts, file)
+            os.replace(new_layout_cache_file, self.layout_cache_file)
+        except OSError as error:
+            logger.error(f"Unable to save layout cache file: {self.layout_cache_file.absolute()}. Error: {error}")
+            new_layout_cache_file.unlink(missing_ok=True)
 
     @retry((Exception), tries=5, delay=1, backoff=2)
-    def __row_values(self, sheet: Worksheet, row_num: int) -> list[object]:
+    def __load_spreadsheet(self) -> Spreadsheet:
+        # the authorized client is kept between exports, credentials are refreshed by the client when expired
+        if self.gspread_client is None:
+            credentials = service_account.Credentials.from_service_account_file(self.service_account_key_file, scopes=SCOPES)
+            self.gspread_client = gspread.authorize(credentials)
         try:
-            return sheet.row_values(row_num)
-        except IndexError:
-            return []
+            return self.gspread_client.open_by_key(self.spreadsheet_id)
+        except Exception:
+            self.gspread_client = None
+            raise
 
     @retry((Exception), tries=5, delay=1, backoff=2)
-    def __col_values(self, sheet: Worksheet, col_num: int) -> list[object]:
-        return sheet.col_values(col_num)
+    def __fetch_sheet_metadata(self, spreadsheet: Spreadsheet) -> dict:
+        self.__count_api_call('spreadsheets.get')
+        return spreadsheet.fetch_sheet_metadata()
 
-    @retry((Exception), tries=5, delay=1, backoff=2)
-    def __create_rows(self, sheet: Worksheet, rows: int) -> None:
-        sheet.add_rows(rows)
+    def __load_all_labels(self, spreadsheet: Spreadsheet, sheet_titles: list[str]) -> dict[str, list[str]]:
+        if not sheet_titles:
+            return {}
+        ranges = [absolute_range_name(sheet_title, '1:1') for sheet_title in sheet_titles]
+        value_ranges = self.__values_batch_get(spreadsheet, ranges)
+        all_labels = {}
+        for sheet_title, value_range in zip(sheet_titles, value_ranges):
+            values = value_range.get('values', [])
+            all_labels[sheet_title] = self.__remove_trailing_empty_values(values[0] if values else [])
+        return all_labels
 
     @retry((Exception), tries=5, delay=1, backoff=2)
-    def __create_cols(self, sheet: Worksheet, cols: int) -> None:
-        sheet.add_cols(cols)
-
-    def __remove_trailing_none_values(self, values):
-        while values and values[-1] is None:
-            values.pop()
-        return values
+    def __values_batch_get(self, spreadsheet: Spreadsheet, ranges: list[str]) -> list[dict]:
+        self.__count_api_call('values.batchGet')
+        return spreadsheet.values_batch_get(ranges, params={'majorDimension': 'ROWS'}).get('valueRanges', [])
 
     @retry((Exception), tries=5, delay=1, backoff=2)
-    def __refresh_sheet(self, spreadsheet: Spreadsheet, sheet: Worksheet) -> Worksheet:
-        return spreadsheet.get_worksheet_by_id(sheet.id)
-
-    def __format_date_cell(self, sheet: Worksheet, row: int, col: int) -> None:
-        self.__format_date_cells(sheet, row, col, row, col)
+    def __batch_update(self, spreadsheet: Spreadsheet, requests: list[dict]) -> None:
+        self.__count_api_call('spreadsheets.batchUpdate')
+        spreadsheet.batch_update({'requests': requests})
 
-    @retry((Exception), tries=5, delay=1, backoff=2)
-    def __format_date_cells(self, sheet: Worksheet, start_row: int, start_col: int, end_row: int, end_col: int) -> None:
-        cell_range = self.__cast_to_a1_notation(start_row, start_col, end_row, end_col)
-        sheet.format(cell_range, {
-            'numberFormat': {
-                'type': 'DATE_TIME'
+    def __build_requests(self, sheet_layout: dict, items: list[Item]) -> list[dict]:
+        requests = []
+        sheet = sheet_layout['properties']
+        labels = sheet_layout['labels']
+        sheet_id = sheet['sheetId']
+        item_index_dict = {label: i for i, label in enumerate(labels)}
+        new_labels = [] if labels else ['Date']
+        col_start = len(labels)
+        col_number = col_start + len(new_labels)
+        for item in items:
+            if not item.name in item_index_dict and not item.name in new_labels:
+                item_index_dict[item.name] = col_number
+                new_labels.append(item.name)
+                col_number += 1
+        col_count = sheet['gridProperties'].get('columnCount', 0)
+        if col_number > col_count - COLS_THRESHOLD:
+            cols_to_add = col_number - col_count + COLS_TO_ADD
+            requests.append({'appendDimension': {'sheetId': sheet_id, 'dimension': 'COLUMNS', 'length': cols_to_add}})
+            sheet['gridProperties']['columnCount'] = col_count + cols_to_add
+        if new_labels:
+            requests.append({
+                'updateCells': {
+                    'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': col_start},
+                    'rows': [{'values': [{'userEnteredValue': {'stringValue': label}} for label in new_labels]}],
+                    'fields': 'userEnteredValue'
+                }
+            })
+            logger.info(f"Creating new labels: {new_labels} in worksheet: {sheet['title']}")
+            labels.extend(new_labels)
+        new_row = [None] * col_number
+        for item in items:
+            new_row[item_index_dict[item.name]] = item.price
+        new_row[0] = (self.insert_time - SHEETS_EPOCH).total_seconds() / 86400
+        # appendCells adds the row after the last row with data, inserting new rows when the sheet is full
+        requests.append({
+            'appendCells': {
+                'sheetId': sheet_id,
+                'rows': [{'values': [self.__cell_data(value, 'DATE_TIME' if i == 0 else 'CURRENCY') for i, value in enumerate(new_row)]}],
+                'fields': 'userEnteredValue,userEnteredFormat.numberFormat'
             }
         })
+        logger.info(f"Inserting new data row: {[self.insert_time.strftime('%Y/%m/%d %H:%M:%S')] + new_row[1:]} in worksheet: {sheet['title']}")
+        return requests
 
-    def __format_currency_cell(self, sheet: Worksheet, row: int, col: int) -> None:
-        self.__format_currency_cells(sheet, row, col, row, col)
+    def __count_api_call(self, call: str) -> None:
+        self.api_calls[call] = self.api_calls.get(call, 0) + 1
+        metrics.inc('pricechecker_exporter_api_calls_total', {'exporter': 'google_sheet', 'call': call}, help='Remote API calls made by data exporters')
 
-    @retry((Exception), tries=5, delay=1, backoff=2)
-    def __format_currency_cells(self, sheet: Worksheet, start_row: int, start_col: int, end_row: int, end_col: int) -> None:
-        cell_range = self.__cast_to_a1_notation(start_row, start_col, end_row, end_col)
-        sheet.format(cell_range, {
-            'numberFormat': {
-                'type': 'CURRENCY'
-            }
-        })
+    def __cell_data(self, value: float, number_format_type: str) -> dict:
+        cell_data = {'userEnteredFormat': {'numberFormat': {'type': number_format_type}}}
+        if value is not None:
+            cell_data['userEnteredValue'] = {'numberValue': value}
+        return cell_data
 
-    def __cast_to_a1_notation(self, start_row: int, start_col: int, end_row: int, end_col: int) -> str: 
-        range_start = rowcol_to_a1(start_row, start_col)
-        range_end = rowcol_to_a1(end_row,end_col )
-        return ':'.join((range_start, range_end))
+    def __remove_trailing_empty_values(self, values):
+        while values and (values[-1] is None or values[-1] == ''):
+            values.pop()
+        return values
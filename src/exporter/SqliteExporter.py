@@ -0,0 +1,144 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from exporter.DataExporter import DataExporter
+from model.ItemGroup import ItemGroup
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS observations (
+        observed_at REAL NOT NULL,
+        group_name TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        price REAL,
+        fetch_latency REAL,
+        status TEXT
+    )
+    """,
+    # covers price range queries without reading the table
+    'CREATE INDEX IF NOT EXISTS observations_item_time_price ON observations (group_name, item_name, observed_at, price)',
+    'CREATE INDEX IF NOT EXISTS observations_time ON observations (observed_at)',
+    """
+    CREATE TABLE IF NOT EXISTS latest_observations (
+        group_name TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        observed_at REAL NOT NULL,
+        price REAL NOT NULL,
+        PRIMARY KEY (group_name, item_name)
+    ) WITHOUT ROWID
+    """
+]
+
+class SqliteExporter(DataExporter):
+    """
+    Exports every price observation to a SQLite database and answers price history queries from it.
+    The latest price of each item is also kept in its own table, so it is looked up without scanning the history.
+    Timestamps are unix timestamps in seconds. The database is opened on first use.
+    """
+    def __init__(self, database_file: Path):
+        super().__init__()
+        self.database_file = database_file
+        self.lock = threading.Lock()
+        self.connection: sqlite3.Connection = None
+
+    def exportor_info(self) -> str:
+        return f"SQLite exporter exports all data to database: {self.database_file.absolute()}"
+
+    def export_data(self, item_groups: list[ItemGroup]) -> None:
+        observed_at = time.time()
+        rows = [
+            (observed_at, item_group.group_name, item.name, item.price, item.fetch_latency, item.fetch_status)
+            for item_group in item_groups
+            for item in item_group.items
+        ]
+        with self.lock:
+            connection = self.__connect()
+            with connection:
+                connection.executemany(
+                    'INSERT INTO observations (observed_at, group_name, item_name, price, fetch_latency, status) VALUES (?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+                connection.executemany(
+                    """
+                    INSERT INTO latest_observations (group_name, item_name, observed_at, price) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (group_name, item_name) DO UPDATE SET observed_at = excluded.observed_at, price = excluded.price
+                    WHERE excluded.observed_at >= latest_observations.observed_at
+                    """,
+                    [(group_name, item_name, observed_at, price) for observed_at, group_name, item_name, price, _, _ in rows if price is not None]
+                )
+        logger.info(f"Finished exporting {len(rows)} observations to database: {self.database_file.absolute()}")
+
+    def dry_run(self, item_groups: list[ItemGroup], work_directory: Path) -> None:
+        # the configured database may be large, observations are written to a new database with the same schema
+        dry_run_exporter = SqliteExporter(work_directory.joinpath(self.database_file.name))
+        try:
+            dry_run_exporter.export_data(item_groups)
+            for item_group in item_groups:
+                dry_run_exporter.latest_prices(item_group.group_name)
+        finally:
+            dry_run_exporter.close()
+
+    def latest_prices(self, group_name: str) -> dict[str, tuple[float, float]]:
+        """
+        Returns the latest known price and its timestamp per item in the group, as `{item_name: (observed_at, price)}`.
+        """
+        rows = self.__query('SELECT item_name, observed_at, price FROM latest_observations WHERE group_name = ?', (group_name,))
+        return {item_name: (observed_at, price) for item_name, observed_at, price in rows}
+
+    def price_ranges(self, group_name: str, since: float=None, until: float=None) -> dict[str, tuple[float, float]]:
+        """
+        Returns the min and max price per item in the group between `since` and `until`, as `{item_name: (min_price, max_price)}`.
+        """
+        condition, params = self.__time_condition(since, until)
+        rows = self.__query(
+            f"SELECT item_name, MIN(price), MAX(price) FROM observations WHERE group_name = ?{condition} AND price IS NOT NULL GROUP BY item_name",
+            (group_name, *params)
+        )
+        return {item_name: (min_price, max_price) for item_name, min_price, max_price in rows}
+
+    def price_history(self, group_name: str, item_name: str, since: float=None, until: float=None) -> list[tuple[float, float, float, str]]:
+        """
+        Returns observations of an item between `since` and `until` in time order, as `(observed_at, price, fetch_latency, status)`.
+        """
+        condition, params = self.__time_condition(since, until)
+        return self.__query(
+            f"SELECT observed_at, price, fetch_latency, status FROM observations WHERE group_name = ? AND item_name = ?{condition} ORDER BY observed_at",
+            (group_name, item_name, *params)
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def __time_condition(self, since: float, until: float) -> tuple[str, list[float]]:
+        condition = ''
+        params = []
+        if since is not None:
+            condition += ' AND observed_at >= ?'
+            params.append(since)
+        if until is not None:
+            condition += ' AND observed_at < ?'
+            params.append(until)
+        return condition, params
+
+    def __query(self, sql: str, params: tuple) -> list[tuple]:
+        with self.lock:
+            return self.__connect().execute(sql, params).fetchall()
+
+    def __connect(self) -> sqlite3.Connection:
+        # e.g. `--validate-only` creates the exporter without exporting, so the database file is not created until then
+        if self.connection is None:
+            self.database_file.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.database_file), check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            self.connection = connection
+        return self.connection
@@ -1,15 +1,16 @@
 import logging
-import requests
-import time
-import traceback
-from pyquery import PyQuery
-from retry import retry
-from model.SpecialTweak import SpecialTweak, default_headers
+from model.SpecialTweak import SpecialTweak
 from model.PriceSelector import PriceSelector
 
 logger = logging.getLogger(__name__)
 
 class Item(object):
+    # large watch-lists hold tens of thousands of items
+    __slots__ = (
+        'name', 'url', 'price_selector', 'special_tweak', 'get_price_delay', 'price', 'is_hard_coded',
+        'fetch_status', 'fetch_latency', 'fetch_attempts', 'fetch_timings', 'response_size'
+    )
+
     def __init__(self, 
                  name: str, 
                  url: str, 
@@ -21,30 +22,13 @@ class Item(object):
         self.url = url
         self.price_selector = price_selector
         self.special_tweak = special_tweak
-        if price:
-            self.price = price
+        self.get_price_delay = get_price_delay
+        self.price = price if price else None
+        self.is_hard_coded = self.price is not None
+        self.fetch_status: str = 'hard_coded' if self.is_hard_coded else None
+        self.fetch_latency: float = None
+        self.fetch_attempts: int = 0
+        self.fetch_timings: dict[str, float] = {}
+        self.response_size: int = None
+        if self.is_hard_coded:
             logger.info(f"HardCoded '{self.name}' priced at {self.price}")
-        else:
-            self.price = self.__get_price(get_price_delay)
-            logger.info(f"Fetched '{self.name}' priced at {self.price}")
-
-    def __get_price(self, get_price_delay: float=0) -> float:
-        if (get_price_delay > 0):
-            time.sleep(get_price_delay)
-        headers = default_headers
-        cookies = {}
-        if self.special_tweak:
-            headers = default_headers | self.special_tweak.headers
-            cookies = self.special_tweak.cookies
-        try:
-            return self.__fetch_price(headers, cookies)
-        except Exception as error:
-            logger.error(f"Unable to get price for '{self.name}'. Error: {error}")
-            traceback.print_exc()
-            return None
-
-    @retry((Exception), tries=5, delay=5)
-    def __fetch_price(self, headers: dict[str, str], cookies: dict[str, str]) -> float:
-        req = requests.get(self.url, headers=headers, cookies=cookies, timeout=20)
-        html = req.text
-        return self.price_selector.scrape_price(PyQuery(html))
@@ -2,9 +2,12 @@ from model.Item import Item
 
 
 class ItemGroup(object):
-    def __init__(self, group_name: str, items: list[Item]=None):
+    __slots__ = ('group_name', 'items', 'interval')
+
+    def __init__(self, group_name: str, items: list[Item]=None, interval: float=None):
         self.group_name = group_name
         self.items = items if items else []
+        self.interval = interval
 
     def add(self, item: Item) -> None:
         self.items.append(item)
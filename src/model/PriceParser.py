@@ -0,0 +1,78 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# a number is either grouped by thousands, like `1,299.00`, `1.299,00` or `1 299`, or plain, like `1299.00` or `12,50`
+NUMBER_PATTERN = re.compile(r"(?:\d{1,3}(?:[.,'\s\u00a0\u202f]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?)(?!\d)")
+GROUPING_PATTERN = re.compile(r"['\s\u00a0\u202f]")
+DIGITS_PATTERN = re.compile(r'\D')
+
+DECIMAL_POINTS = ('.', ',', 'auto')
+
+class PriceParser(object):
+    def __init__(self, decimal_point: str='.', currency: str=None):
+        if decimal_point not in DECIMAL_POINTS:
+            message = f"Unsupported decimal_point: {decimal_point}. Supported values: {', '.join(DECIMAL_POINTS)}"
+            logger.error(message)
+            raise Exception(message)
+        self.decimal_point = decimal_point
+        self.currency = currency
+        self.currency_pattern = None
+        if currency:
+            escaped_currency = re.escape(currency)
+            self.currency_pattern = re.compile(
+                rf"{escaped_currency}\s*({NUMBER_PATTERN.pattern})|({NUMBER_PATTERN.pattern})\s*{escaped_currency}"
+            )
+
+    def parse_price(self, price_text: str) -> float:
+        """
+        Parses the first price in a text like `$1,299.00`, `from 1.299,00 €` or `$10 - $20` in one pass.
+        If currency is set, the first number next to the currency is used instead.
+        """
+        number_text = self.__find_number(price_text)
+        if number_text is None:
+            raise ValueError(f"No price found in text: '{price_text}'")
+        return float(self.__normalize(number_text))
+
+    def parse_split_price(self, integer_text: str, fraction_text: str) -> float:
+        integer_number = self.__find_number(integer_text)
+        if integer_number is None:
+            raise ValueError(f"No price found in text: '{integer_text}'")
+        fraction_number = NUMBER_PATTERN.search(fraction_text)
+        fraction_digits = DIGITS_PATTERN.sub('', fraction_number.group(0)) if fraction_number else '0'
+        return float(f"{DIGITS_PATTERN.sub('', integer_number)}.{fraction_digits}")
+
+    def __find_number(self, text: str) -> str:
+        if self.currency_pattern:
+            match = self.currency_pattern.search(text)
+            if match:
+                return match.group(1) or match.group(2)
+        match = NUMBER_PATTERN.search(text)
+        return match.group(0) if match else None
+
+    def __normalize(self, number_text: str) -> str:
+        number_text = GROUPING_PATTERN.sub('', number_text)
+        decimal_point = self.decimal_point
+        if decimal_point == 'auto':
+            decimal_point = self.__detect_decimal_point(number_text)
+        elif self.__has_other_decimal_point(number_text, decimal_point):
+            # e.g. `1 299,00` with `.` as decimal point would be read as 129900
+            message = f"Price: '{number_text}' has a decimal point other than '{decimal_point}'. Set decimal_point to 'auto' to detect it from the price text"
+            raise ValueError(message)
+        thousands_separator = ',' if decimal_point == '.' else '.'
+        return number_text.replace(thousands_separator, '').replace(decimal_point, '.')
+
+    def __has_other_decimal_point(self, number_text: str, decimal_point: str) -> bool:
+        last_separator_index = max(number_text.rfind('.'), number_text.rfind(','))
+        return last_separator_index >= 0 and number_text[last_separator_index] != decimal_point and len(number_text) - last_separator_index - 1 in (1, 2)
+
+    def __detect_decimal_point(self, number_text: str) -> str:
+        # the last separator is a decimal point only if it is followed by one or two digits, like `12,50` or `1.299,9`
+        last_separator_index = max(number_text.rfind('.'), number_text.rfind(','))
+        if last_separator_index < 0:
+            return '.'
+        separator = number_text[last_separator_index]
+        if len(number_text) - last_separator_index - 1 in (1, 2):
+            return separator
+        return ',' if separator == '.' else '.'
@@ -1,20 +1,51 @@
+import json
 import logging
 import re
+from cssselect import SelectorError
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
 from pyquery import PyQuery
+from model.PriceParser import PriceParser
 
 logger = logging.getLogger(__name__)
 
+# most retailers render the price near the top of the page, so try a parse of the first chunk before the full page
+PREFIX_PARSE_SIZE = 256 * 1024
+
+META_PRICE_PATTERN = re.compile(rb'<meta\s[^>]*?(?:property|itemprop|name)\s*=\s*["\'](?:og:price:amount|product:price:amount|price)["\'][^>]*>', re.IGNORECASE)
+META_CONTENT_PATTERN = re.compile(rb'\scontent\s*=\s*["\']([^"\']*)["\']', re.IGNORECASE)
+JSON_LD_PATTERN = re.compile(rb'<script[^>]+type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+# pseudo classes whose match depends on content after the element, a truncated page can match another element
+LOOKAHEAD_PSEUDO_CLASS_PATTERN = re.compile(r':(?:last|nth-last|only-|has\b)', re.IGNORECASE)
+
 class PriceSelector(object):
-    def __init__(self, 
-                 full_price_selector: str=None, 
-                 decimal_integer_selector: str=None, 
-                 decimal_fraction_selector: str=None, 
-                 is_euro: bool=False):
+    def __init__(self,
+                 full_price_selector: str=None,
+                 decimal_integer_selector: str=None,
+                 decimal_fraction_selector: str=None,
+                 is_euro: bool=False,
+                 use_structured_data: bool=False,
+                 decimal_point: str=None,
+                 currency: str=None,
+                 render_javascript: bool=False):
         self.full_price_selector = full_price_selector
         self.decimal_integer_selector = decimal_integer_selector
         self.decimal_fraction_selector = decimal_fraction_selector
-        self.decimal_point = ',' if is_euro else '.'
-        self.number_dilemma = '.' if is_euro else ','
+        if not decimal_point:
+            decimal_point = ',' if is_euro else '.'
+        self.price_parser = PriceParser(decimal_point=decimal_point, currency=currency)
+        self.use_structured_data = use_structured_data
+        self.render_javascript = render_javascript
+        # identifies selectors that scrape the same price from a page, also across config reloads
+        self.key = json.dumps({
+            'full_price_selector': full_price_selector,
+            'decimal_integer_selector': decimal_integer_selector,
+            'decimal_fraction_selector': decimal_fraction_selector,
+            'use_structured_data': use_structured_data,
+            'decimal_point': decimal_point,
+            'currency': currency
+        }, sort_keys=True)
         if not self.full_price_selector:
             if not self.decimal_integer_selector or not self.decimal_fraction_selector:
                 message = 'If full_price_selector is not provided, both decimal_integer_selector and decimal_fraction_selector should be provided.'
@@ -25,22 +56,110 @@ class PriceSelector(object):
                 message = 'If full_price_selector is provided, both decimal_integer_selector and decimal_fraction_selector should not be provided.'
                 logger.error(message)
                 raise Exception(message)
+        self.compiled_selectors: dict[str, CSSSelector] = {}
+        for selector in (self.full_price_selector, self.decimal_integer_selector, self.decimal_fraction_selector):
+            if selector:
+                self.compiled_selectors[selector] = self.__compile_selector(selector)
+        self.use_prefix_parse = not any(LOOKAHEAD_PSEUDO_CLASS_PATTERN.search(selector) for selector in self.compiled_selectors)
+
+    def __getstate__(self) -> dict:
+        # compiled selectors can not be pickled, they are compiled again when unpickled
+        state = self.__dict__.copy()
+        state['compiled_selectors'] = list(state['compiled_selectors'].keys())
+        return state
 
-    def scrape_price(self, py_query: PyQuery) -> float:
+    def __setstate__(self, state: dict) -> None:
+        selectors = state.pop('compiled_selectors')
+        self.__dict__.update(state)
+        self.compiled_selectors = {selector: self.__compile_selector(selector) for selector in selectors}
+
+    def scrape_price(self, page: bytes) -> float:
+        if self.use_structured_data:
+            price = self.__scrape_structured_price(page)
+            if price is not None:
+                return price
+        if self.use_prefix_parse and len(page) > PREFIX_PARSE_SIZE:
+            number_texts = self.__scrape_number_texts(self.__parse(page[:PREFIX_PARSE_SIZE]), complete_only=True)
+            if number_texts:
+                return self.__to_price(number_texts)
+        number_texts = self.__scrape_number_texts(self.__parse(page), complete_only=False)
+        return self.__to_price(number_texts)
+
+    def __to_price(self, number_texts: list[str]) -> float:
         if self.full_price_selector:
-            price_text = self.__scrape_number_text(py_query, self.full_price_selector)
-            return float(price_text)
+            return self.price_parser.parse_price(number_texts[0])
+        else:
+            integer_text, fraction_text = number_texts
+            return self.price_parser.parse_split_price(integer_text, fraction_text)
+
+    def __scrape_number_texts(self, document: etree._Element, complete_only: bool) -> list[str]:
+        selectors = [self.full_price_selector] if self.full_price_selector else [self.decimal_integer_selector, self.decimal_fraction_selector]
+        number_texts = []
+        for selector in selectors:
+            element = self.__select_first(document, selector)
+            if element is None:
+                if complete_only:
+                    return None
+                number_texts.append('')
+                continue
+            # in a truncated document, the element may be cut off unless something was parsed after it
+            if complete_only and not element.xpath('following::*[1]'):
+                return None
+            number_texts.append(element.text_content())
+        return number_texts
+
+    def __select_first(self, document: etree._Element, selector: str) -> etree._Element:
+        compiled_selector = self.compiled_selectors[selector]
+        if compiled_selector is not None:
+            elements = compiled_selector(document)
         else:
-            integer_text = self.__scrape_number_text(py_query, self.decimal_integer_selector)
-            fraction_text = self.__scrape_number_text(py_query, self.decimal_fraction_selector)
-            return float(f"{integer_text}.{fraction_text}")
-
-    def __scrape_number_text(self, py_query: PyQuery, selector: str) -> str:
-        number_text = py_query(selector).eq(0).text()
-        return self.__clean_up_price_text(number_text)
-
-    def __clean_up_price_text(self, price_text: str) -> str:
-        cleaned = price_text
-        cleaned = re.sub(r'(^.*?)(\d)', r'\g<2>', cleaned)
-        cleaned = re.sub(r'[^\d]+$', '', cleaned)
-        return cleaned.replace(self.number_dilemma, '')
+            elements = PyQuery(document)(selector)
+        return elements[0] if len(elements) > 0 else None
+
+    def __parse(self, page: bytes) -> etree._Element:
+        return lxml_html.document_fromstring(page)
+
+    def __compile_selector(self, selector: str) -> CSSSelector:
+        try:
+            return CSSSelector(selector, translator='html')
+        except SelectorError:
+            # jQuery style pseudo classes are only supported by PyQuery
+            logger.info(f"Selector '{selector}' is not a standard css selector. Falling back to PyQuery")
+            return None
+
+    def __scrape_structured_price(self, page: bytes) -> float:
+        for match in JSON_LD_PATTERN.finditer(page):
+            try:
+                price = self.__find_json_ld_price(json.loads(match.group(1)))
+            except ValueError:
+                continue
+            if price is not None:
+                return price
+        for match in META_PRICE_PATTERN.finditer(page):
+            content = META_CONTENT_PATTERN.search(match.group(0))
+            if content:
+                try:
+                    # structured data always uses `.` as decimal point
+                    return float(content.group(1).decode('utf-8', 'ignore').strip())
+                except ValueError:
+                    continue
+        return None
+
+    def __find_json_ld_price(self, node) -> float:
+        if isinstance(node, list):
+            for child in node:
+                price = self.__find_json_ld_price(child)
+                if price is not None:
+                    return price
+        elif isinstance(node, dict):
+            if 'offers' in node:
+                return self.__find_json_ld_price(node['offers'])
+            if '@graph' in node:
+                return self.__find_json_ld_price(node['@graph'])
+            for key in ('price', 'lowPrice'):
+                if key in node:
+                    try:
+                        return float(node[key])
+                    except (TypeError, ValueError):
+                        return None
+        return None
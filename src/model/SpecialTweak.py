@@ -1,7 +1,20 @@
+import json
+
 class SpecialTweak(object):
-    def __init__(self, cookies: dict[str, str]=None, headers: dict[str, str]=None):
-        self.cookies = cookies if cookies else {}
-        self.headers = headers if headers else {}
+    def __init__(self, cookies: dict[str, str]=None, headers: dict[str, str]=None, render_javascript: bool=False):
+        self.cookies = self.__to_dict(cookies)
+        self.headers = self.__to_dict(headers)
+        self.render_javascript = render_javascript
+        # identifies tweaks with the same cookies and headers, also across config reloads
+        self.key = json.dumps({'cookies': self.cookies, 'headers': self.headers}, sort_keys=True, default=str)
+
+    def __to_dict(self, values) -> dict[str, str]:
+        # config file may define cookies/headers as a list of single-entry mappings
+        if not values:
+            return {}
+        if isinstance(values, list):
+            return {key: value for entry in values for key, value in entry.items()}
+        return dict(values)
 
 default_headers: dict[str, str] = {
     'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.159 Safari/537.36'
@@ -1,28 +1,78 @@
 import argparse
 import logging
 import pathlib
-import traceback
+import signal
+import sys
+from app.PriceChecker import PriceChecker
 from app.PriceCheckerConfig import PriceCheckerConfig
-from exporter.GoogleSheetExporter import GoogleSheetExporter
+from app.PriceCheckerDaemon import PriceCheckerDaemon
+from shard.ShardCoordinator import ShardCoordinator
+from shard.ShardWorker import ShardWorker
+from shard.SqliteShardQueue import SqliteShardQueue
 
 def __parse_args():
     parser = argparse.ArgumentParser(description='Price Checker')
     parser.add_argument('--config', dest='config_file', type=pathlib.Path, required=True, help='Config file to be used')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--validate-only', dest='validate_only', action='store_true', help='Only load and validate config file, without fetching prices')
+    mode.add_argument('--dry-run', dest='dry_run', action='store_true', help='Export hard coded or sample prices with every data exporter into a temporary directory, without fetching prices or changing exported data')
+    mode.add_argument('--no-export', dest='no_export', action='store_true', help='Fetch prices without exporting data')
+    parser.add_argument('--daemon', dest='daemon', action='store_true', help='Keep running and check prices on schedule, reloading config file when it changes')
+    parser.add_argument('--shard-worker', dest='shard_worker', type=int, help='Run as shard worker with this index, fetching prices for the coordinator through `sharding.queue_file`')
     return parser.parse_args()
 
 def main():
     logger = logging.getLogger(__name__)
 
     args = __parse_args()
+    if args.shard_worker is not None:
+        __run_shard_worker(args.config_file, args.shard_worker)
+        return
+    if args.daemon and not args.validate_only and not args.dry_run:
+        PriceCheckerDaemon(args.config_file, no_export=args.no_export).run()
+        return
     with args.config_file.open('r') as config_file:
         config = PriceCheckerConfig(config_file)
-    for data_exporter in config.data_exporters:
-        try:
-            data_exporter.export_data(config.item_groups)
-        except Exception as error:
-            logger.error(f"Unable to export data for exporter: {data_exporter.exportor_info()}. Error: {error}")
-            traceback.print_exc()
-            continue
+    item_count = sum(len(item_group.items) for item_group in config.item_groups)
+    logger.info(f"Loaded {len(config.item_groups)} item groups with {item_count} items and {len(config.data_exporters)} data exporters")
+    if config.price_alerter and not config.price_alerter.state_file:
+        # a single run starts without last known prices, so it has nothing to compare with
+        logger.warn('price_alerts.state_file is not set, no price drop can be alerted outside --daemon mode')
+    if args.validate_only:
+        for data_exporter in config.data_exporters:
+            logger.info(f"Validated exporter: {data_exporter.exportor_info()}")
+        return
+    if args.dry_run:
+        succeeded = PriceChecker(config).dry_run()
+        config.price_fetcher.close()
+        for data_exporter in config.data_exporters:
+            data_exporter.close()
+        if not succeeded:
+            sys.exit(1)
+        return
+    shard_coordinator = ShardCoordinator.from_config(args.config_file, config) if config.shard_workers else None
+    try:
+        PriceChecker(config, shard_coordinator).run(no_export=args.no_export)
+    finally:
+        if shard_coordinator:
+            shard_coordinator.close()
+        config.price_fetcher.close()
+        for data_exporter in config.data_exporters:
+            data_exporter.close()
+
+def __run_shard_worker(config_file: pathlib.Path, worker_index: int):
+    with config_file.open('r') as file:
+        config = PriceCheckerConfig(file, fetch_only=True)
+    # the worker loads the config file again for each task, this copy only provides the sharding settings
+    config.price_fetcher.close()
+    if not config.shard_queue_file:
+        raise Exception('sharding.queue_file must be set to run a shard worker')
+    if not 0 <= worker_index < config.shard_workers:
+        raise Exception(f"Shard worker index must be between 0 and {config.shard_workers - 1}. Got: {worker_index}")
+    shard_worker = ShardWorker(config_file, SqliteShardQueue(config.shard_queue_file, config.shard_result_timeout), worker_index)
+    signal.signal(signal.SIGTERM, lambda signum, frame: shard_worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: shard_worker.stop())
+    shard_worker.run()
 
 if __name__ == '__main__':
     logging.basicConfig(
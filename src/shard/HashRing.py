@@ -0,0 +1,20 @@
+import bisect
+import hashlib
+
+class HashRing(object):
+    """
+    Consistent hash ring mapping keys, like hosts, to workers.
+    When the number of workers changes, only about 1/N of the keys move to another worker.
+    """
+    def __init__(self, worker_count: int, virtual_nodes: int=100):
+        self.worker_count = worker_count
+        points = sorted((self.__hash(f"worker-{worker_index}-{node}"), worker_index) for worker_index in range(worker_count) for node in range(virtual_nodes))
+        self.hashes = [point_hash for point_hash, _ in points]
+        self.workers = [worker_index for _, worker_index in points]
+
+    def worker_for(self, key: str) -> int:
+        index = bisect.bisect(self.hashes, self.__hash(key)) % len(self.hashes)
+        return self.workers[index]
+
+    def __hash(self, key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
@@ -0,0 +1,33 @@
+import multiprocessing
+import queue
+from shard.ShardQueue import ShardQueue
+
+class MemoryShardQueue(ShardQueue):
+    """
+    In-memory queue for worker processes started by the coordinator on the same machine.
+    """
+    def __init__(self, worker_count: int):
+        context = multiprocessing.get_context('spawn')
+        self.task_queues = [context.Queue() for _ in range(worker_count)]
+        self.result_queue = context.Queue()
+
+    def queue_info(self) -> str:
+        return f"In-memory shard queue for {len(self.task_queues)} local workers"
+
+    def put_task(self, worker_index: int, task: dict) -> None:
+        self.task_queues[worker_index].put(task)
+
+    def get_task(self, worker_index: int, timeout: float) -> dict:
+        try:
+            return self.task_queues[worker_index].get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put_result(self, result: dict) -> None:
+        self.result_queue.put(result)
+
+    def get_result(self, timeout: float) -> dict:
+        try:
+            return self.result_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
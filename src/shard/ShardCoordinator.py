@@ -0,0 +1,170 @@
+import logging
+import multiprocessing
+import time
+import uuid
+from typing import Callable
+from pathlib import Path
+from urllib.parse import urlsplit
+from app.PriceCheckerConfig import PriceCheckerConfig
+from model.ItemGroup import ItemGroup
+from shard.HashRing import HashRing
+from shard.MemoryShardQueue import MemoryShardQueue
+from shard.ShardQueue import ShardQueue
+from shard.SqliteShardQueue import SqliteShardQueue
+from shard.ShardWorker import run_local_worker
+
+logger = logging.getLogger(__name__)
+
+RESULT_POLL_TIMEOUT = 1
+WORKER_STOP_TIMEOUT = 30
+
+class ShardCoordinator(object):
+    """
+    Fetches prices across shard workers instead of in this process, with the same `fetch_all` as `PriceFetcher`.
+    Items are partitioned by host on a consistent hash ring, so all requests to a site come from one worker
+    and per-site limits still hold. Results are merged into the items of this process, so alerts and
+    data exporters run here as usual.
+    """
+    def __init__(self,
+                 config_file: Path,
+                 shard_queue: ShardQueue,
+                 worker_count: int,
+                 local_workers: bool=True,
+                 result_timeout: float=3600):
+        if worker_count < 1:
+            message = f"Number of shard workers must be positive. Got: {worker_count}"
+            logger.error(message)
+            raise Exception(message)
+        self.config_file = config_file
+        self.shard_queue = shard_queue
+        self.worker_count = worker_count
+        self.local_workers = local_workers
+        self.result_timeout = result_timeout
+        self.hash_ring = HashRing(worker_count)
+        self.processes: list[multiprocessing.Process] = []
+
+    @staticmethod
+    def from_config(config_file: Path, config: PriceCheckerConfig) -> 'ShardCoordinator':
+        if config.shard_queue_file:
+            shard_queue = SqliteShardQueue(config.shard_queue_file, config.shard_result_timeout)
+        else:
+            shard_queue = MemoryShardQueue(config.shard_workers)
+        return ShardCoordinator(config_file, shard_queue, config.shard_workers, config.shard_local_workers, config.shard_result_timeout)
+
+    def fetch_all(self, item_groups: list[ItemGroup], on_group_fetched: Callable[[ItemGroup], None]=None) -> None:
+        start = time.monotonic()
+        self.__start_local_workers()
+        run_id = uuid.uuid4().hex
+        tasks: list[dict[str, list[str]]] = [{} for _ in range(self.worker_count)]
+        # item groups still waiting for results, by worker
+        pending_shards: dict[str, set[int]] = {}
+        for item_group in item_groups:
+            pending_shards[item_group.group_name] = set()
+            for item in item_group.items:
+                if item.is_hard_coded:
+                    continue
+                worker_index = self.hash_ring.worker_for(urlsplit(item.url).netloc.lower())
+                tasks[worker_index].setdefault(item_group.group_name, []).append(item.name)
+                pending_shards[item_group.group_name].add(worker_index)
+        for worker_index, task_item_groups in enumerate(tasks):
+            if task_item_groups:
+                self.shard_queue.put_task(worker_index, {'run_id': run_id, 'item_groups': task_item_groups})
+        logger.info(f"Sent items of run: {run_id} to workers: {[worker_index for worker_index, task in enumerate(tasks) if task]}")
+
+        item_groups_by_name = {item_group.group_name: item_group for item_group in item_groups}
+        for item_group in item_groups:
+            if not pending_shards[item_group.group_name]:
+                self.__on_group_fetched(item_group, pending_shards, on_group_fetched)
+        deadline = time.monotonic() + self.result_timeout
+        while pending_shards and time.monotonic() < deadline:
+            self.__restart_dead_local_workers(item_groups_by_name, pending_shards, on_group_fetched)
+            result = self.shard_queue.get_result(RESULT_POLL_TIMEOUT)
+            if result is None:
+                continue
+            group_name = result['group_name']
+            worker_index = result['worker_index']
+            if result['run_id'] != run_id or worker_index not in pending_shards.get(group_name, ()):
+                logger.warn(f"Ignoring stale result of item group: {group_name} from worker: {worker_index}")
+                continue
+            self.__merge_result(item_groups_by_name[group_name], result['items'])
+            pending_shards[group_name].discard(worker_index)
+            if not pending_shards[group_name]:
+                self.__on_group_fetched(item_groups_by_name[group_name], pending_shards, on_group_fetched)
+        for group_name, worker_indexes in list(pending_shards.items()):
+            logger.error(f"No result of item group: {group_name} from workers: {sorted(worker_indexes)} within {self.result_timeout} seconds")
+            self.__fail_shards(item_groups_by_name[group_name], worker_indexes)
+            self.__on_group_fetched(item_groups_by_name[group_name], pending_shards, on_group_fetched)
+        item_count = sum(1 for item_group in item_groups for item in item_group.items if not item.is_hard_coded)
+        logger.info(f"Fetched {item_count} items across {self.worker_count} workers in {time.monotonic() - start:.2f} seconds")
+
+    def close(self) -> None:
+        if not self.processes:
+            return
+        for worker_index in range(self.worker_count):
+            self.shard_queue.put_task(worker_index, {'stop': True})
+        for process in self.processes:
+            process.join(WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                logger.warn(f"Terminating shard worker process: {process.name}")
+                process.terminate()
+        self.processes = []
+
+    def __start_local_workers(self) -> None:
+        if not self.local_workers or self.processes:
+            return
+        self.processes = [self.__start_local_worker(worker_index) for worker_index in range(self.worker_count)]
+        logger.info(f"Started {self.worker_count} local shard workers with {self.shard_queue.queue_info()}")
+
+    def __start_local_worker(self, worker_index: int) -> multiprocessing.Process:
+        # workers fetch with threads, so they are spawned rather than forked
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(
+            target=run_local_worker,
+            args=(self.config_file, self.shard_queue, worker_index, logging.getLogger().level),
+            name=f"shard-worker-{worker_index}",
+            # daemonic processes can not start parse pool workers, `close` stops the workers instead
+            daemon=False
+        )
+        process.start()
+        return process
+
+    def __restart_dead_local_workers(self,
+                                     item_groups_by_name: dict[str, ItemGroup],
+                                     pending_shards: dict[str, set[int]],
+                                     on_group_fetched: Callable[[ItemGroup], None]) -> None:
+        for worker_index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            logger.error(f"Shard worker process: {process.name} exited with code: {process.exitcode}. Restarting it")
+            self.processes[worker_index] = self.__start_local_worker(worker_index)
+            # the task of the dead worker is lost, its items fail in this run
+            for group_name, worker_indexes in list(pending_shards.items()):
+                if worker_index in worker_indexes:
+                    worker_indexes.discard(worker_index)
+                    self.__fail_shards(item_groups_by_name[group_name], {worker_index})
+                    if not worker_indexes:
+                        self.__on_group_fetched(item_groups_by_name[group_name], pending_shards, on_group_fetched)
+
+    def __on_group_fetched(self, item_group: ItemGroup, pending_shards: dict[str, set[int]], on_group_fetched: Callable[[ItemGroup], None]) -> None:
+        pending_shards.pop(item_group.group_name, None)
+        if on_group_fetched:
+            on_group_fetched(item_group)
+
+    def __merge_result(self, item_group: ItemGroup, item_results: list[dict]) -> None:
+        items_by_name = {item.name: item for item in item_group.items}
+        for item_result in item_results:
+            item = items_by_name.get(item_result['name'], None)
+            if item is None:
+                continue
+            item.price = item_result['price']
+            item.fetch_status = item_result['status']
+            item.fetch_attempts = item_result.get('attempts', 0)
+            item.fetch_latency = item_result.get('latency', None)
+            item.fetch_timings = item_result.get('timings', {})
+            item.response_size = item_result.get('response_size', None)
+
+    def __fail_shards(self, item_group: ItemGroup, worker_indexes: set[int]) -> None:
+        for item in item_group.items:
+            if not item.is_hard_coded and self.hash_ring.worker_for(urlsplit(item.url).netloc.lower()) in worker_indexes:
+                item.price = None
+                item.fetch_status = 'failed'
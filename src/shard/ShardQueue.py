@@ -0,0 +1,33 @@
+from abc import ABC, abstractmethod
+
+class ShardQueue(ABC):
+    """
+    Carries tasks from the shard coordinator to workers and their results back.
+    Tasks and results are JSON serializable dicts.
+    """
+
+    @abstractmethod
+    def queue_info(self) -> str:
+        pass
+
+    @abstractmethod
+    def put_task(self, worker_index: int, task: dict) -> None:
+        pass
+
+    @abstractmethod
+    def get_task(self, worker_index: int, timeout: float) -> dict:
+        """
+        Returns the next task of the worker, or None if there is none within `timeout` seconds.
+        """
+        pass
+
+    @abstractmethod
+    def put_result(self, result: dict) -> None:
+        pass
+
+    @abstractmethod
+    def get_result(self, timeout: float) -> dict:
+        """
+        Returns the next result of any worker, or None if there is none within `timeout` seconds.
+        """
+        pass
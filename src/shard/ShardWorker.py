@@ -0,0 +1,147 @@
+import hashlib
+import io
+import logging
+import signal
+import threading
+import traceback
+from pathlib import Path
+from app.PriceCheckerConfig import PriceCheckerConfig
+from model.Item import Item
+from model.ItemGroup import ItemGroup
+from shard.ShardQueue import ShardQueue
+
+logger = logging.getLogger(__name__)
+
+TASK_POLL_TIMEOUT = 1
+
+class ShardWorker(object):
+    """
+    Fetches the prices of the items the shard coordinator assigned to this worker.
+    Items are looked up by group and item name in the worker's own copy of the config file.
+    A result is sent back for each item group as soon as its items are fetched.
+    """
+    def __init__(self, config_file: Path, shard_queue: ShardQueue, worker_index: int):
+        self.config_file = config_file
+        self.shard_queue = shard_queue
+        self.worker_index = worker_index
+        self.config: PriceCheckerConfig = None
+        self.config_mtime: float = None
+        self.config_digest: str = None
+        self.stop_event = threading.Event()
+
+    def run(self) -> None:
+        logger.info(f"Started shard worker: {self.worker_index} with {self.shard_queue.queue_info()}")
+        while not self.stop_event.is_set():
+            task = self.shard_queue.get_task(self.worker_index, TASK_POLL_TIMEOUT)
+            if task is None:
+                continue
+            if task.get('stop', False):
+                break
+            try:
+                self.__run_task(task)
+            except Exception as error:
+                logger.error(f"Unable to run task of run: {task['run_id']}. Error: {error}")
+                traceback.print_exc()
+                for group_name, item_names in task['item_groups'].items():
+                    self.shard_queue.put_result(self.__result(task['run_id'], group_name, [], item_names))
+        if self.config:
+            self.config.price_fetcher.close()
+        logger.info(f"Stopped shard worker: {self.worker_index}")
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def __run_task(self, task: dict) -> None:
+        self.__reload_config_if_changed()
+        run_id = task['run_id']
+        items_by_name = {(item_group.group_name, item.name): item for item_group in self.config.item_groups for item in item_group.items}
+        item_groups = []
+        missing_item_names: dict[str, list[str]] = {}
+        for group_name, item_names in task['item_groups'].items():
+            item_group = ItemGroup(group_name)
+            missing_item_names[group_name] = []
+            for item_name in item_names:
+                item = items_by_name.get((group_name, item_name), None)
+                if item is None:
+                    logger.error(f"Item: {item_name} in item group: {group_name} is not in config file: {self.config_file}")
+                    missing_item_names[group_name].append(item_name)
+                else:
+                    item_group.add(item)
+            if item_group.items:
+                item_groups.append(item_group)
+            else:
+                self.shard_queue.put_result(self.__result(run_id, group_name, [], missing_item_names[group_name]))
+        self.config.price_fetcher.fetch_all(
+            item_groups,
+            on_group_fetched=lambda item_group: self.shard_queue.put_result(self.__result(run_id, item_group.group_name, item_group.items, missing_item_names[item_group.group_name]))
+        )
+
+    def __result(self, run_id: str, group_name: str, items: list[Item], failed_item_names: list[str]) -> dict:
+        item_results = [
+            {
+                'name': item.name,
+                'price': item.price,
+                'status': item.fetch_status,
+                'attempts': item.fetch_attempts,
+                'latency': item.fetch_latency,
+                'timings': item.fetch_timings,
+                'response_size': item.response_size
+            }
+            for item in items
+        ]
+        item_results.extend({'name': item_name, 'price': None, 'status': 'failed'} for item_name in failed_item_names)
+        return {'run_id': run_id, 'worker_index': self.worker_index, 'group_name': group_name, 'items': item_results}
+
+    def __reload_config_if_changed(self) -> None:
+        try:
+            mtime = self.config_file.stat().st_mtime
+            if mtime == self.config_mtime:
+                return
+            config_bytes = self.config_file.read_bytes()
+        except OSError as error:
+            self.__keep_last_valid_config(error)
+            return
+        # e.g. a file touched or saved without changes is not loaded again
+        digest = hashlib.sha256(config_bytes).hexdigest()
+        if digest == self.config_digest:
+            self.config_mtime = mtime
+            return
+        try:
+            config = PriceCheckerConfig(io.StringIO(config_bytes.decode('utf-8')), self.config, fetch_only=True)
+        except Exception as error:
+            self.__keep_last_valid_config(error)
+            # the file is not loaded again until it changes
+            self.config_mtime = mtime
+            self.config_digest = digest
+            return
+        if self.config is not None:
+            self.config.price_fetcher.close()
+            logger.info(f"Reloaded config file: {self.config_file} with {config.config_diff.summary()}")
+        # workers on the same machine must not overwrite each other's http cache, hosts stay on the same worker anyway
+        http_cache = config.price_fetcher.http_cache
+        if http_cache:
+            http_cache.cache_file = http_cache.cache_file.with_name(f"{http_cache.cache_file.stem}.worker{self.worker_index}{http_cache.cache_file.suffix}")
+        self.config = config
+        self.config_mtime = mtime
+        self.config_digest = digest
+
+    def __keep_last_valid_config(self, error: Exception) -> None:
+        if self.config is None:
+            # without a valid config, the items of the task can not be fetched
+            message = f"Unable to load config file: {self.config_file}. Error: {error}"
+            logger.error(message)
+            raise Exception(message)
+        logger.error(f"Unable to reload config file: {self.config_file}, keeping the last valid config. Error: {error}")
+        traceback.print_exc()
+
+def run_local_worker(config_file: Path, shard_queue: ShardQueue, worker_index: int, log_level: int) -> None:
+    # entry point of worker processes started by the coordinator, which stops them on Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        level=log_level,
+        format=f"%(asctime)s [worker {worker_index}] [%(module)s.%(funcName)s:%(lineno)d] [%(levelname)s] %(message)s",
+        handlers=[
+            logging.StreamHandler()
+        ]
+    )
+    ShardWorker(config_file, shard_queue, worker_index).run()
@@ -0,0 +1,86 @@
+import json
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from shard.ShardQueue import ShardQueue
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, worker_index INTEGER NOT NULL, payload TEXT NOT NULL, created_at REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS tasks_worker ON tasks (worker_index, id)',
+    'CREATE TABLE IF NOT EXISTS results (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)'
+]
+
+POLL_INTERVAL = 0.2
+
+class SqliteShardQueue(ShardQueue):
+    """
+    Queue in a SQLite database file, for workers on other nodes sharing the file, e.g. over a network file system.
+    Each process opens its own connection, tasks and results are removed when they are taken.
+    Tasks older than `task_timeout` are removed without being run, the coordinator stopped waiting for their results.
+    """
+    def __init__(self, database_file: Path, task_timeout: float=3600):
+        self.database_file = database_file
+        self.task_timeout = task_timeout
+        self.connection: sqlite3.Connection = None
+
+    def __getstate__(self) -> dict:
+        # worker processes open their own connection
+        return {'database_file': self.database_file, 'task_timeout': self.task_timeout, 'connection': None}
+
+    def queue_info(self) -> str:
+        return f"SQLite shard queue in database: {self.database_file.absolute()}"
+
+    def put_task(self, worker_index: int, task: dict) -> None:
+        connection = self.__connect()
+        with connection:
+            # wall clock time, the file may be shared by nodes
+            connection.execute('INSERT INTO tasks (worker_index, payload, created_at) VALUES (?, ?, ?)', (worker_index, json.dumps(task), time.time()))
+
+    def get_task(self, worker_index: int, timeout: float) -> dict:
+        connection = self.__connect()
+        with connection:
+            # e.g. tasks of a worker that was not running, and stop tasks that would stop it as soon as it starts
+            expired = connection.execute('DELETE FROM tasks WHERE worker_index = ? AND created_at < ?', (worker_index, time.time() - self.task_timeout)).rowcount
+        if expired:
+            logger.warn(f"Removed {expired} expired tasks of shard worker: {worker_index}")
+        return self.__poll('SELECT id, payload FROM tasks WHERE worker_index = ? ORDER BY id LIMIT 1', (worker_index,), 'tasks', timeout)
+
+    def put_result(self, result: dict) -> None:
+        connection = self.__connect()
+        with connection:
+            connection.execute('INSERT INTO results (payload) VALUES (?)', (json.dumps(result),))
+
+    def get_result(self, timeout: float) -> dict:
+        return self.__poll('SELECT id, payload FROM results ORDER BY id LIMIT 1', (), 'results', timeout)
+
+    def __poll(self, query: str, parameters: tuple, table: str, timeout: float) -> dict:
+        connection = self.__connect()
+        deadline = time.monotonic() + timeout
+        while True:
+            # the row is taken in a write transaction, so no other process takes it too
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute(query, parameters).fetchone()
+                if row:
+                    connection.execute(f"DELETE FROM {table} WHERE id = ?", (row[0],))
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            if row:
+                return json.loads(row[1])
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(min(POLL_INTERVAL, max(0, deadline - time.monotonic())))
+
+    def __connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            self.database_file.parent.mkdir(parents=True, exist_ok=True)
+            # no WAL, it needs shared memory and does not work for nodes sharing the file over a network file system
+            self.connection = sqlite3.connect(str(self.database_file), timeout=30, isolation_level=None)
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+        return self.connection
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+# modules are imported the way `src/price_checker.py` imports them, the fakes are shared with the benchmarks
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root.joinpath('src')))
+sys.path.insert(0, str(root.joinpath('benchmark')))
+
+from model.Item import Item
+from model.ItemGroup import ItemGroup
+from model.PriceSelector import PriceSelector
+
+def build_item_group(group_name: str, prices: dict[str, float], hard_coded_prices: dict[str, float]=None) -> ItemGroup:
+    """
+    Builds an item group whose items got `prices` from a fetch, and items with `hard_coded_prices` from the config.
+    """
+    price_selector = PriceSelector(full_price_selector='span.price')
+    item_group = ItemGroup(group_name)
+    for item_name, price in prices.items():
+        item = Item(item_name, f"http://localhost/{item_name}", price_selector)
+        item.price = price
+        item.fetch_status = 'fetched' if price is not None else 'failed'
+        item_group.add(item)
+    for item_name, price in (hard_coded_prices or {}).items():
+        item_group.add(Item(item_name, f"http://localhost/{item_name}", price_selector, price=price))
+    return item_group
@@ -0,0 +1,97 @@
+import os
+import threading
+import pytest
+from fake_retailer_server import FakeRetailerServer
+from app.BrowserPool import BrowserPool, async_playwright, registrable_domain
+from app.PriceFetcher import PriceFetcher
+from model.Item import Item
+from model.ItemGroup import ItemGroup
+from model.PriceSelector import PriceSelector
+
+INTEGER_SELECTOR = 'div#app div.product-price > ul > li.price-current > strong'
+FRACTION_SELECTOR = 'div#app div.product-price > ul > li.price-current > sup'
+
+def has_browser() -> bool:
+    if async_playwright is None:
+        return False
+    from playwright.sync_api import sync_playwright
+    try:
+        with sync_playwright() as playwright:
+            return os.path.exists(playwright.chromium.executable_path)
+    except Exception:
+        return False
+
+@pytest.fixture
+def fake_server():
+    server = FakeRetailerServer(page_size=4 * 1024, latency=0)
+    server.start()
+    yield server
+    server.stop()
+
+class StubBrowserPool(object):
+    """
+    Renders the static page of the fake server after another item was fetched, or fails after a timeout.
+    """
+    def __init__(self, page: bytes, other_item_fetched: threading.Event):
+        self.max_pages = 1
+        self.page = page
+        self.other_item_fetched = other_item_fetched
+
+    def render(self, url: str, special_tweak=None, wait_selector: str=None) -> bytes:
+        if not self.other_item_fetched.wait(10):
+            raise TimeoutError('Other items were not fetched while rendering')
+        return self.page
+
+    def close(self) -> None:
+        pass
+
+def test_render_does_not_block_fetches(fake_server):
+    other_item_fetched = threading.Event()
+    price_fetcher = PriceFetcher(max_concurrency=1, max_concurrency_per_host=1, browser_pool=StubBrowserPool(fake_server.page, other_item_fetched))
+    rendered_group = ItemGroup('Rendered')
+    rendered_item = Item('Rendered', f"http://127.0.0.1:{fake_server.port}/rendered/1", PriceSelector(full_price_selector=INTEGER_SELECTOR, render_javascript=True))
+    rendered_group.add(rendered_item)
+    static_group = ItemGroup('Static')
+    static_item = Item('Static', f"http://127.0.0.1:{fake_server.port}/product/1", PriceSelector(full_price_selector=INTEGER_SELECTOR))
+    static_group.add(static_item)
+    try:
+        price_fetcher.fetch_all([rendered_group, static_group], on_group_fetched=lambda item_group: other_item_fetched.set() if item_group is static_group else None)
+    finally:
+        price_fetcher.close()
+    assert static_item.price == 1299
+    assert rendered_item.price == 1299
+    assert rendered_item.fetch_status == 'rendered'
+
+@pytest.mark.skipif(not has_browser(), reason='playwright with chromium is not installed')
+def test_render_scripted_price(fake_server):
+    browser_pool = BrowserPool(max_pages=1, timeout=10)
+    price_selector = PriceSelector(decimal_integer_selector=INTEGER_SELECTOR, decimal_fraction_selector=FRACTION_SELECTOR, render_javascript=True)
+    price_fetcher = PriceFetcher(browser_pool=browser_pool)
+    item_group = ItemGroup('Rendered')
+    item = Item('Rendered', f"http://127.0.0.1:{fake_server.port}/rendered/1", price_selector)
+    item_group.add(item)
+    try:
+        price_fetcher.fetch_all([item_group])
+    finally:
+        price_fetcher.close()
+    assert item.price == 1299.99
+    assert item.fetch_status == 'rendered'
+    # images, fonts and third-party scripts are not loaded, `localhost` is another site than `127.0.0.1`
+    assert fake_server.request_counts['/static/price.js'] == 1
+    assert fake_server.request_counts['/static/product.png'] == 0
+    assert fake_server.request_counts['/static/font.woff2'] == 0
+    assert fake_server.request_counts['/static/tracker.js'] == 0
+
+@pytest.mark.parametrize('host, domain', [
+    ('www.site3.com', 'site3.com'),
+    ('static.site3.com', 'site3.com'),
+    ('www.amazon.co.uk', 'amazon.co.uk'),
+    ('tracker.co.uk', 'tracker.co.uk'),
+    ('images.example.com.au', 'example.com.au'),
+    ('shop.de', 'shop.de'),
+    ('WWW.Site3.com.', 'site3.com'),
+    ('127.0.0.1', '127.0.0.1'),
+    ('localhost', 'localhost')
+])
+def test_registrable_domain(host, domain):
+    assert registrable_domain(host) == domain
@@ -0,0 +1,43 @@
+from conftest import build_item_group
+from exporter.CsvExporter import CsvExporter
+
+def read_rows(csv_file) -> list[list[str]]:
+    # the date column differs per export
+    return [line.split(',')[1:] for line in csv_file.read_text().splitlines()]
+
+def test_rows_are_appended(tmp_path):
+    exporter = CsvExporter(tmp_path)
+    exporter.export_data([build_item_group('Group', {'A': 1, 'B': 2})])
+    exporter.export_data([build_item_group('Group', {'A': 3, 'B': None})])
+    assert tmp_path.joinpath('Group.csv').read_bytes().count(b'\r\n') == 3
+    assert read_rows(tmp_path.joinpath('Group.csv')) == [['A', 'B'], ['1', '2'], ['3', '']]
+
+def test_new_items_rewrite_headers(tmp_path):
+    exporter = CsvExporter(tmp_path)
+    exporter.export_data([build_item_group('Group', {'A': 1})])
+    exporter.export_data([build_item_group('Group', {'B': 2, 'A': 3})])
+    assert read_rows(tmp_path.joinpath('Group.csv')) == [['A', 'B'], ['1'], ['3', '2']]
+    assert not tmp_path.joinpath('Group.csv.tmp').exists()
+
+def test_partial_row_is_removed(tmp_path):
+    csv_file = tmp_path.joinpath('Group.csv')
+    # a crash during the previous append
+    csv_file.write_bytes(b'Date,A,B\r\n2024/01/01 00:00:00,10.0,20.0\r\n2024/01/02 00:00:00,11.0')
+    CsvExporter(tmp_path).export_data([build_item_group('Group', {'A': 1, 'B': 2})])
+    assert read_rows(csv_file) == [['A', 'B'], ['10.0', '20.0'], ['1', '2']]
+
+def test_last_row_without_line_ending_is_kept(tmp_path):
+    csv_file = tmp_path.joinpath('Group.csv')
+    # saved by a spreadsheet app
+    csv_file.write_bytes(b'Date,A\r\n2024/01/01 00:00:00,10.0\r\n2024/01/02 00:00:00,11.0')
+    CsvExporter(tmp_path).export_data([build_item_group('Group', {'A': 1})])
+    assert read_rows(csv_file) == [['A'], ['10.0'], ['11.0'], ['1']]
+    csv_file.write_bytes(b'Date,A\n2024/01/02 00:00:00,11.0')
+    CsvExporter(tmp_path).export_data([build_item_group('Group', {'A': 1})])
+    assert csv_file.read_bytes().startswith(b'Date,A\n2024/01/02 00:00:00,11.0\n')
+
+def test_header_rewrite_keeps_last_row_without_line_ending(tmp_path):
+    csv_file = tmp_path.joinpath('Group.csv')
+    csv_file.write_bytes(b'Date,A\r\n2024/01/01 00:00:00,10.0\r\n2024/01/02 00:00:00,11.0')
+    CsvExporter(tmp_path).export_data([build_item_group('Group', {'A': 1, 'B': 2})])
+    assert read_rows(csv_file) == [['A', 'B'], ['10.0'], ['11.0'], ['1', '2']]
@@ -0,0 +1,37 @@
+import threading
+from pathlib import Path
+from app.ExportPipeline import ExportPipeline
+from exporter.DataExporter import DataExporter
+from model.ItemGroup import ItemGroup
+
+class StubExporter(DataExporter):
+    def __init__(self, batches_exports: bool):
+        super().__init__()
+        self.batches_exports = batches_exports
+        self.exported_group_names: list[list[str]] = []
+        self.exported = threading.Event()
+
+    def exportor_info(self) -> str:
+        return f"Stub exporter, batches exports: {self.batches_exports}"
+
+    def export_data(self, item_groups: list[ItemGroup]) -> None:
+        self.exported_group_names.append([item_group.group_name for item_group in item_groups])
+        self.exported.set()
+
+    def dry_run(self, item_groups: list[ItemGroup], work_directory: Path) -> None:
+        pass
+
+def test_batching_exporters_export_once_at_close():
+    streaming_exporter = StubExporter(batches_exports=False)
+    batching_exporter = StubExporter(batches_exports=True)
+    export_pipeline = ExportPipeline([streaming_exporter, batching_exporter])
+    export_pipeline.start()
+    export_pipeline.submit(ItemGroup('A'))
+    # the streaming exporter does not wait for the other item groups
+    assert streaming_exporter.exported.wait(5)
+    export_pipeline.submit(ItemGroup('B'))
+    export_pipeline.submit(ItemGroup('C'))
+    assert batching_exporter.exported_group_names == []
+    export_pipeline.close()
+    assert [group_name for group_names in streaming_exporter.exported_group_names for group_name in group_names] == ['A', 'B', 'C']
+    assert batching_exporter.exported_group_names == [['A', 'B', 'C']]
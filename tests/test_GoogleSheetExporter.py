@@ -0,0 +1,88 @@
+import gspread
+import pytest
+from fake_google_sheets import FakeSheetsSession
+from conftest import build_item_group
+from exporter.GoogleSheetExporter import GoogleSheetExporter
+
+SPREADSHEET_ID = 'fake_spreadsheet_id'
+
+class FailingSheetsSession(FakeSheetsSession):
+    def __init__(self, spreadsheet_id: str):
+        super().__init__(spreadsheet_id)
+        self.failing_batch_updates = 0
+
+    def post(self, url: str, json: dict=None, **kwargs):
+        if url.endswith(':batchUpdate') and self.failing_batch_updates > 0:
+            self.failing_batch_updates -= 1
+            self.calls['spreadsheets.batchUpdate'] += 1
+            raise ConnectionError('Simulated failure')
+        return super().post(url, json=json, **kwargs)
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr('retry.api.time.sleep', lambda seconds: None)
+
+def build_exporter(tmp_path, session: FakeSheetsSession, layout_cache: bool=True) -> GoogleSheetExporter:
+    key_file = tmp_path.joinpath('key.json')
+    key_file.write_text('{}')
+    exporter = GoogleSheetExporter(str(key_file), SPREADSHEET_ID, tmp_path.joinpath('layout_cache.json') if layout_cache else None)
+    exporter.gspread_client = gspread.Client(None, session=session)
+    return exporter
+
+def test_cached_layout_detects_inserted_column(tmp_path):
+    session = FakeSheetsSession(SPREADSHEET_ID)
+    exporter = build_exporter(tmp_path, session)
+    exporter.export_data([build_item_group('Group', {'A': 1, 'B': 2})])
+    # a column inserted by hand between the labels
+    sheet = session.sheets['Group']
+    for row in sheet.rows:
+        row.insert(2, None)
+    sheet.rows[0][2] = 'Notes'
+    session.calls.clear()
+    exporter.export_data([build_item_group('Group', {'A': 3, 'B': 4})])
+    assert session.calls['values.batchGet'] == 1
+    assert sheet.rows[0] == ['Date', 'A', 'Notes', 'B']
+    assert sheet.rows[2][1:] == [3, None, 4]
+
+def test_cached_layout_detects_replaced_worksheet(tmp_path):
+    session = FakeSheetsSession(SPREADSHEET_ID)
+    exporter = build_exporter(tmp_path, session)
+    exporter.export_data([build_item_group('Group', {'A': 1})])
+    # the worksheet is deleted and created again with the same title and labels
+    sheet = session.sheets['Group']
+    sheet.sheet_id = 100
+    session.calls.clear()
+    exporter.export_data([build_item_group('Group', {'A': 2})])
+    assert session.calls['values.batchGet'] == 1
+    assert [row[1] for row in sheet.rows[1:]] == [1, 2]
+
+def test_failed_update_with_cached_layout_loads_layout_again(tmp_path):
+    session = FailingSheetsSession(SPREADSHEET_ID)
+    exporter = build_exporter(tmp_path, session)
+    exporter.export_data([build_item_group('Group', {'A': 1})])
+    session.failing_batch_updates = 5
+    session.calls.clear()
+    exporter.export_data([build_item_group('Group', {'A': 2})])
+    assert session.calls['values.batchGet'] == 1
+    assert session.calls['spreadsheets.batchUpdate'] == 6
+    assert [row[1] for row in session.sheets['Group'].rows[1:]] == [1, 2]
+    assert tmp_path.joinpath('layout_cache.json').exists()
+
+def test_export_api_calls(tmp_path):
+    session = FakeSheetsSession(SPREADSHEET_ID)
+    exporter = build_exporter(tmp_path, session, layout_cache=False)
+    item_groups = [build_item_group(f"Group {index}", {'A': 1, 'B': 2}) for index in range(3)]
+    exporter.export_data(item_groups)
+    assert dict(session.calls) == {'spreadsheets.get': 1, 'spreadsheets.batchUpdate': 1}
+    session.calls.clear()
+    exporter.export_data(item_groups)
+    assert dict(session.calls) == {'spreadsheets.get': 1, 'values.batchGet': 1, 'spreadsheets.batchUpdate': 1}
+    assert [len(sheet.rows) for sheet in session.sheets.values()] == [3, 3, 3]
+
+def test_duplicate_worksheet_title_is_skipped(tmp_path):
+    session = FakeSheetsSession(SPREADSHEET_ID)
+    exporter = build_exporter(tmp_path, session, layout_cache=False)
+    exporter.export_data([build_item_group('Group', {'A': 1}), build_item_group('GROUP', {'A': 2}), build_item_group('Other', {'A': 3})])
+    assert list(session.sheets) == ['Group', 'Other']
+    assert session.sheets['Group'].rows[1][1] == 1
+    assert session.calls['spreadsheets.batchUpdate'] == 1
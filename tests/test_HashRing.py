@@ -0,0 +1,17 @@
+from shard.HashRing import HashRing
+
+HOSTS = [f"shop{index}.example" for index in range(1000)]
+
+def test_keys_are_spread_over_all_workers():
+    hash_ring = HashRing(4)
+    worker_indexes = [hash_ring.worker_for(host) for host in HOSTS]
+    assert worker_indexes == [HashRing(4).worker_for(host) for host in HOSTS]
+    assert all(worker_indexes.count(worker_index) > 100 for worker_index in range(4))
+
+def test_new_worker_moves_few_keys():
+    old_ring = HashRing(4)
+    new_ring = HashRing(5)
+    moved_hosts = [host for host in HOSTS if old_ring.worker_for(host) != new_ring.worker_for(host)]
+    # about 1/5 of the keys move, all of them to the new worker
+    assert len(moved_hosts) < len(HOSTS) * 0.3
+    assert {new_ring.worker_for(host) for host in moved_hosts} == {4}
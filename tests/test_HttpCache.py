@@ -0,0 +1,35 @@
+import pytest
+from app.HttpCache import HttpCache
+from model.PriceSelector import PriceSelector
+from model.SpecialTweak import SpecialTweak
+
+URL = 'http://localhost/product'
+
+def test_entries_are_saved_and_loaded(tmp_path):
+    cache_file = tmp_path.joinpath('http_cache.json')
+    price_selector = PriceSelector(full_price_selector='span.price')
+    special_tweak = SpecialTweak(cookies=[{'currency': 'CAD'}])
+    http_cache = HttpCache(cache_file)
+    http_cache.load()
+    http_cache.put(URL, price_selector, special_tweak, '"etag"', None, 12.5)
+    http_cache.save()
+    http_cache = HttpCache(cache_file)
+    entry = http_cache.get(URL, PriceSelector(full_price_selector='span.price'), SpecialTweak(cookies={'currency': 'CAD'}))
+    assert (entry.etag, entry.price) == ('"etag"', 12.5)
+    assert http_cache.get(URL, price_selector) is None
+
+def test_entries_depend_on_price_selector(tmp_path):
+    http_cache = HttpCache(tmp_path.joinpath('http_cache.json'))
+    http_cache.load()
+    http_cache.put(URL, PriceSelector(full_price_selector='span.price'), None, '"etag"', None, 12.5)
+    assert http_cache.get(URL, PriceSelector(full_price_selector='span.sale-price')) is None
+    assert http_cache.get(URL, PriceSelector(full_price_selector='span.price', decimal_point=',')) is None
+    assert http_cache.get(URL, PriceSelector(full_price_selector='span.price')).price == 12.5
+
+@pytest.mark.parametrize('content', ['{"http://localhost/product": {"etag": "\\"etag\\""}}', '[["key", {"tag": "x"}]]', '[["key", null]]', '42', '{'])
+def test_unreadable_cache_file_starts_empty(tmp_path, content):
+    cache_file = tmp_path.joinpath('http_cache.json')
+    cache_file.write_text(content)
+    http_cache = HttpCache(cache_file)
+    assert http_cache.get(URL, PriceSelector(full_price_selector='span.price')) is None
+    assert len(http_cache.entries) == 0
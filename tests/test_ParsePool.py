@@ -0,0 +1,17 @@
+import os
+import signal
+from app.ParsePool import ParsePool
+from model.PriceSelector import PriceSelector
+
+PAGE = b'<html><body><span class="price">$1,299.99</span></body></html>'
+
+def test_scrape_price_after_worker_process_died():
+    price_selector = PriceSelector(full_price_selector='span.price')
+    parse_pool = ParsePool({'selector': price_selector}, processes=1)
+    try:
+        assert parse_pool.scrape_price(price_selector, PAGE) == 1299.99
+        for pid in list(parse_pool.executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        assert parse_pool.scrape_price(price_selector, PAGE) == 1299.99
+    finally:
+        parse_pool.close()
@@ -0,0 +1,62 @@
+import json
+from conftest import build_item_group
+from alert.Notifier import Notifier
+from alert.PriceAlert import PriceAlert
+from alert.PriceAlerter import PriceAlerter
+
+class StubNotifier(Notifier):
+    def __init__(self):
+        super().__init__()
+        self.price_alerts: list[PriceAlert] = []
+
+    def notifier_info(self) -> str:
+        return 'Stub notifier'
+
+    def notify(self, price_alerts: list[PriceAlert]) -> None:
+        self.price_alerts.extend(price_alerts)
+
+def run(price_alerter: PriceAlerter, prices: dict[str, float], hard_coded_prices: dict[str, float]=None) -> None:
+    price_alerter.check(build_item_group('Group', prices, hard_coded_prices))
+    price_alerter.flush()
+
+def test_absolute_drop():
+    notifier = StubNotifier()
+    price_alerter = PriceAlerter([notifier], absolute_drop=10)
+    run(price_alerter, {'A': 100, 'B': 100})
+    run(price_alerter, {'A': 91, 'B': 90})
+    assert [(price_alert.item_name, price_alert.old_price, price_alert.new_price, price_alert.reasons) for price_alert in notifier.price_alerts] == [('B', 100, 90, ['dropped by 10.00'])]
+
+def test_percent_drop():
+    notifier = StubNotifier()
+    price_alerter = PriceAlerter([notifier], percent_drop=5)
+    run(price_alerter, {'A': 200, 'B': 200})
+    run(price_alerter, {'A': 191, 'B': 190})
+    assert [(price_alert.item_name, price_alert.reasons) for price_alert in notifier.price_alerts] == [('B', ['dropped by 5.0%'])]
+
+def test_all_time_low():
+    notifier = StubNotifier()
+    price_alerter = PriceAlerter([notifier], all_time_low=True)
+    run(price_alerter, {'A': 100})
+    run(price_alerter, {'A': 120})
+    # a drop that is still above the lowest price is not an all time low
+    run(price_alerter, {'A': 110})
+    run(price_alerter, {'A': 99})
+    assert [(price_alert.old_price, price_alert.new_price, price_alert.lowest_price, price_alert.reasons) for price_alert in notifier.price_alerts] == [(110, 99, 100, ['all time low'])]
+
+def test_alerts_are_not_repeated_across_runs(tmp_path):
+    state_file = tmp_path.joinpath('state.json')
+    notifier = StubNotifier()
+    run(PriceAlerter([notifier], state_file=state_file, absolute_drop=1), {'A': 100})
+    run(PriceAlerter([notifier], state_file=state_file, absolute_drop=1), {'A': 90})
+    run(PriceAlerter([notifier], state_file=state_file, absolute_drop=1), {'A': 90})
+    run(PriceAlerter([notifier], state_file=state_file, absolute_drop=1), {'A': None})
+    run(PriceAlerter([notifier], state_file=state_file, absolute_drop=1), {'A': 90})
+    assert [(price_alert.old_price, price_alert.new_price) for price_alert in notifier.price_alerts] == [(100, 90)]
+
+def test_hard_coded_items_are_skipped(tmp_path):
+    state_file = tmp_path.joinpath('state.json')
+    notifier = StubNotifier()
+    run(PriceAlerter([notifier], state_file=state_file, absolute_drop=1), {'A': 100}, {'B': 100})
+    run(PriceAlerter([notifier], state_file=state_file, absolute_drop=1), {'A': 100}, {'B': 50})
+    assert notifier.price_alerts == []
+    assert list(json.loads(state_file.read_text())) == ['Group\tA']
@@ -0,0 +1,49 @@
+import gspread
+import pytest
+import yaml
+from fake_google_sheets import FakeSheetsSession
+from app.PriceChecker import PriceChecker
+from app.PriceCheckerConfig import PriceCheckerConfig
+from exporter.GoogleSheetExporter import GoogleSheetExporter
+
+@pytest.fixture
+def config(tmp_path):
+    key_file = tmp_path.joinpath('key.json')
+    key_file.write_text('{}')
+    config_file = tmp_path.joinpath('config.yaml')
+    config_file.write_text(yaml.safe_dump({
+        'price_selectors': [{'selector_name': 'selector', 'full_price_selector': 'span.price'}],
+        'item_groups': [{'group_name': 'Group', 'items': [
+            {'name': 'A', 'url': 'http://localhost/a', 'price_selector': 'selector'},
+            {'name': 'B', 'url': 'http://localhost/b', 'price_selector': 'selector', 'price': 12.5}
+        ]}],
+        'data_exporters': [
+            {'type': 'csv', 'csv_file_directory': str(tmp_path.joinpath('csv'))},
+            {'type': 'sqlite', 'database_file': str(tmp_path.joinpath('prices.db'))},
+            {'type': 'google_sheet', 'google_service_account_key_file': str(key_file), 'spreadsheet_id': 'fake_spreadsheet_id'}
+        ]
+    }))
+    with config_file.open('r') as file:
+        config = PriceCheckerConfig(file)
+    yield config
+    config.price_fetcher.close()
+
+def test_dry_run_does_not_change_exported_data(tmp_path, config):
+    csv_file = tmp_path.joinpath('csv', 'Group.csv')
+    csv_file.write_text('Date,A\n2024/01/01 00:00:00,10.0\n')
+    session = FakeSheetsSession('fake_spreadsheet_id')
+    for data_exporter in config.data_exporters:
+        if isinstance(data_exporter, GoogleSheetExporter):
+            data_exporter.gspread_client = gspread.Client(None, session=session)
+    assert PriceChecker(config).dry_run()
+    assert csv_file.read_text() == 'Date,A\n2024/01/01 00:00:00,10.0\n'
+    assert not tmp_path.joinpath('prices.db').exists()
+    assert dict(session.calls) == {'spreadsheets.get': 1}
+    assert session.sheets == {}
+    # items are not changed, only copies get the dry run prices
+    assert [item.price for item in config.item_groups[0].items] == [None, 12.5]
+
+def test_dry_run_reports_failed_exporters(monkeypatch, config):
+    monkeypatch.setattr('retry.api.time.sleep', lambda seconds: None)
+    # no fake Sheets API, the service account key file is not valid
+    assert not PriceChecker(config).dry_run()
@@ -0,0 +1,43 @@
+import io
+import pytest
+import yaml
+from app.PriceCheckerConfig import PriceCheckerConfig
+
+def load_config(settings: dict) -> PriceCheckerConfig:
+    config_yaml = {
+        'price_selectors': [{'selector_name': 'selector', 'full_price_selector': 'span.price'}],
+        'item_groups': [{'group_name': 'Group', 'items': [{'name': 'A', 'url': 'http://localhost/a', 'price_selector': 'selector'}]}]
+    }
+    config_yaml.update(settings)
+    return PriceCheckerConfig(io.StringIO(yaml.safe_dump(config_yaml)))
+
+@pytest.mark.parametrize('settings, error', [
+    ({'item_groups': [{'group_name': 'Group', 'interval': '15m', 'items': []}]}, 'interval must be a positive number of seconds for item group: Group. Got: 15m'),
+    ({'item_groups': [{'group_name': 'Group', 'interval': 0, 'items': []}]}, 'interval must be a positive number of seconds for item group: Group. Got: 0'),
+    ({'daemon': {'interval': '1h'}}, 'daemon.interval must be a positive number. Got: 1h'),
+    ({'data_exporters': [{'csv_file_directory': '/tmp/csv'}]}, 'Data exporter 1 has no type.'),
+    ({'data_exporters': [{'type': 'excel'}]}, 'Data exporter 1 has unsupported type: excel.'),
+    ({'data_exporters': [{'type': 'sqlite'}]}, 'No database_file for Data exporter 1 of type: sqlite.'),
+    ({'data_exporters': {'type': 'csv'}}, 'data_exporters must be a list.'),
+    ({'price_alerts': {'notifiers': [{'type': 'webhook'}]}}, 'No url for Notifier 1 of type: webhook.'),
+    ({'sharding': {'queue_file': '/tmp/queue.db'}}, 'No workers for sharding.'),
+    ({'sharding': {'workers': 2.5}}, 'sharding.workers must be a positive integer. Got: 2.5'),
+    ({'sharding': {'workers': 2, 'local_workers': False}}, 'sharding.queue_file must be set'),
+    ({'price_fetcher': {'http_cache': {'max_entries': 10}}}, 'No cache_file for price_fetcher.http_cache.')
+])
+def test_invalid_settings_are_reported(settings, error):
+    with pytest.raises(Exception, match='Invalid config file') as error_info:
+        load_config(settings)
+    assert error in str(error_info.value)
+
+def test_all_errors_are_reported_at_once():
+    with pytest.raises(Exception, match='with 3 errors'):
+        load_config({
+            'item_groups': [{'group_name': 'Group', 'interval': '15m', 'items': [{'name': 'A', 'url': 'http://localhost/a', 'price_selector': 'other'}]}],
+            'data_exporters': [{'type': 'csv'}],
+            'daemon': {'interval': -1}
+        })
+
+def test_config_must_be_a_mapping():
+    with pytest.raises(Exception, match='expected a mapping'):
+        PriceCheckerConfig(io.StringIO('- item'))
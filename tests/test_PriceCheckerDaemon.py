@@ -0,0 +1,86 @@
+import os
+import time
+import pytest
+import yaml
+from conftest import build_item_group
+from app.PriceCheckerDaemon import PriceCheckerDaemon
+
+def write_config(config_file, database_file, group_interval: float=None, daemon_interval: float=3600, price_alerts: dict=None) -> None:
+    item_group = {'group_name': 'Group', 'items': [{'name': 'A', 'url': 'http://localhost/a', 'price_selector': 'selector'}]}
+    if group_interval:
+        item_group['interval'] = group_interval
+    config_yaml = {
+        'price_selectors': [{'selector_name': 'selector', 'full_price_selector': 'span.price'}],
+        'item_groups': [item_group, {'group_name': 'Other', 'items': [{'name': 'B', 'url': 'http://localhost/b', 'price_selector': 'selector'}]}],
+        'data_exporters': [{'type': 'sqlite', 'database_file': str(database_file)}],
+        'daemon': {'interval': daemon_interval}
+    }
+    if price_alerts:
+        config_yaml['price_alerts'] = price_alerts
+    config_file.write_text(yaml.safe_dump(config_yaml))
+    # the daemon only reads the file again if its modification time changed
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+def reload_config(daemon: PriceCheckerDaemon) -> None:
+    daemon._PriceCheckerDaemon__reload_config_if_changed()
+
+def test_changed_interval_reschedules_item_groups(tmp_path):
+    config_file = tmp_path.joinpath('config.yaml')
+    write_config(config_file, tmp_path.joinpath('prices.db'), group_interval=600)
+    daemon = PriceCheckerDaemon(config_file)
+    reload_config(daemon)
+    now = time.monotonic()
+    daemon.next_runs = {'Group': now + 600, 'Other': now + 3600}
+    write_config(config_file, tmp_path.joinpath('prices.db'), group_interval=60, daemon_interval=7200)
+    reload_config(daemon)
+    assert daemon.config.config_diff.changed_intervals == {'Group': 60, 'Other': 7200}
+    assert daemon.next_runs == pytest.approx({'Group': now + 60, 'Other': now + 7200})
+    assert daemon.pending_items == {}
+    daemon.config.price_fetcher.close()
+
+def test_unchanged_file_is_not_loaded_again(tmp_path):
+    config_file = tmp_path.joinpath('config.yaml')
+    write_config(config_file, tmp_path.joinpath('prices.db'))
+    daemon = PriceCheckerDaemon(config_file)
+    reload_config(daemon)
+    config = daemon.config
+    write_config(config_file, tmp_path.joinpath('prices.db'))
+    reload_config(daemon)
+    assert daemon.config is config
+    assert daemon.config_mtime == config_file.stat().st_mtime
+    daemon.config.price_fetcher.close()
+
+def test_replaced_data_exporters_are_closed(tmp_path):
+    config_file = tmp_path.joinpath('config.yaml')
+    write_config(config_file, tmp_path.joinpath('prices.db'))
+    daemon = PriceCheckerDaemon(config_file)
+    reload_config(daemon)
+    data_exporter = daemon.config.data_exporters[0]
+    data_exporter.latest_prices('Group')
+    # same exporter settings, the exporter of the old config is kept
+    write_config(config_file, tmp_path.joinpath('prices.db'), group_interval=60)
+    reload_config(daemon)
+    assert daemon.config.data_exporters == [data_exporter]
+    assert data_exporter.connection is not None
+    # other exporter settings, the exporter of the old config is closed
+    write_config(config_file, tmp_path.joinpath('other.db'))
+    reload_config(daemon)
+    assert daemon.config.data_exporters[0] is not data_exporter
+    assert data_exporter.connection is None
+    daemon.config.price_fetcher.close()
+
+def test_price_alert_state_is_kept_across_reloads(tmp_path):
+    config_file = tmp_path.joinpath('config.yaml')
+    # without state file, the last known prices are only in memory
+    price_alerts = {'absolute_drop': 1, 'notifiers': [{'type': 'log', 'file': str(tmp_path.joinpath('alerts.log'))}]}
+    write_config(config_file, tmp_path.joinpath('prices.db'), price_alerts=price_alerts)
+    daemon = PriceCheckerDaemon(config_file)
+    reload_config(daemon)
+    daemon.config.price_alerter.check(build_item_group('Group', {'A': 100}))
+    write_config(config_file, tmp_path.joinpath('prices.db'), group_interval=60, price_alerts=price_alerts)
+    reload_config(daemon)
+    price_alerter = daemon.config.price_alerter
+    price_alerter.check(build_item_group('Group', {'A': 90}))
+    assert [(price_alert.old_price, price_alert.new_price) for price_alert in price_alerter.price_alerts] == [(100, 90)]
+    daemon.config.price_fetcher.close()
@@ -0,0 +1,48 @@
+import pytest
+from fake_retailer_server import FakeRetailerServer
+from app.PriceFetcher import PriceFetcher
+from model.Item import Item
+from model.ItemGroup import ItemGroup
+from model.PriceSelector import PriceSelector
+
+INTEGER_SELECTOR = 'div#app div.product-price > ul > li.price-current > strong'
+
+@pytest.fixture
+def fake_server():
+    server = FakeRetailerServer(page_size=4 * 1024, latency=0.1)
+    server.start()
+    yield server
+    server.stop()
+
+def build_item_group(fake_server: FakeRetailerServer, host_count: int, items_per_host: int, get_price_delay: float=0) -> ItemGroup:
+    # the server listens on all loopback addresses, each one is another site
+    price_selector = PriceSelector(full_price_selector=INTEGER_SELECTOR)
+    item_group = ItemGroup('Group')
+    for host_index in range(host_count):
+        for item_index in range(items_per_host):
+            url = f"http://127.0.0.{host_index + 1}:{fake_server.port}/product/{item_index}"
+            item_group.add(Item(f"{host_index}-{item_index}", url, price_selector, get_price_delay=get_price_delay))
+    return item_group
+
+def test_concurrency_limits_hold(fake_server):
+    item_group = build_item_group(fake_server, host_count=4, items_per_host=4)
+    price_fetcher = PriceFetcher(max_concurrency=3, max_concurrency_per_host=2)
+    price_fetcher.fetch_all([item_group])
+    price_fetcher.close()
+    assert all(item.fetch_status == 'fetched' for item in item_group.items)
+    assert max(fake_server.max_active_requests.values()) == 2
+    assert fake_server.max_active_total == 3
+
+def test_get_price_delay_spaces_requests_per_host(fake_server):
+    item_group = build_item_group(fake_server, host_count=2, items_per_host=3, get_price_delay=0.3)
+    price_fetcher = PriceFetcher(max_concurrency=4, max_concurrency_per_host=2)
+    price_fetcher.fetch_all([item_group])
+    price_fetcher.close()
+    assert all(item.fetch_status == 'fetched' for item in item_group.items)
+    assert len(fake_server.request_starts) == 2
+    for request_starts in fake_server.request_starts.values():
+        gaps = [later - earlier for earlier, later in zip(request_starts, request_starts[1:])]
+        assert min(gaps) >= 0.25
+    # the hosts do not wait for each other
+    first_starts = sorted(request_starts[0] for request_starts in fake_server.request_starts.values())
+    assert first_starts[1] - first_starts[0] < 0.2
@@ -0,0 +1,47 @@
+import pytest
+from model.PriceParser import PriceParser
+
+@pytest.mark.parametrize('decimal_point, price_text, price', [
+    ('.', '$1,299.00', 1299.0),
+    ('.', '$1,299', 1299.0),
+    ('.', '1299.5', 1299.5),
+    ('.', '$10 - $20', 10.0),
+    ('.', "CHF 1'299.90", 1299.9),
+    (',', '1.299,00 €', 1299.0),
+    (',', '1 299,00 €', 1299.0),
+    (',', '12.345.678,90', 12345678.9),
+    (',', '12,5', 12.5),
+    (',', '1299', 1299.0),
+    ('auto', '1 299,00 €', 1299.0),
+    ('auto', '12.345.678,90', 12345678.9),
+    ('auto', '$1,299.00', 1299.0),
+    ('auto', '1.299', 1299.0),
+    ('auto', '12,50', 12.5),
+])
+def test_parse_price(decimal_point, price_text, price):
+    assert PriceParser(decimal_point=decimal_point).parse_price(price_text) == price
+
+@pytest.mark.parametrize('decimal_point, price_text', [
+    ('.', '1 299,00 €'),
+    ('.', '12.345.678,90'),
+    ('.', '12,50'),
+    (',', '$1,299.00'),
+    (',', '1299.5'),
+])
+def test_other_decimal_point_is_rejected(decimal_point, price_text):
+    with pytest.raises(ValueError, match='decimal point'):
+        PriceParser(decimal_point=decimal_point).parse_price(price_text)
+
+def test_currency_picks_number_next_to_it():
+    assert PriceParser(decimal_point=',', currency='€').parse_price('2 Stück für 1.299,00 €') == 1299.0
+
+def test_no_price_is_rejected():
+    with pytest.raises(ValueError, match='No price found'):
+        PriceParser().parse_price('Sold out')
+
+def test_parse_split_price():
+    assert PriceParser().parse_split_price('1,299', '.99') == 1299.99
+
+def test_unsupported_decimal_point_is_rejected():
+    with pytest.raises(Exception, match='Unsupported decimal_point'):
+        PriceParser(decimal_point=';')
@@ -0,0 +1,32 @@
+import pytest
+from model.PriceSelector import PREFIX_PARSE_SIZE, PriceSelector
+
+def build_page(head: str, tail: str) -> bytes:
+    # the prefix parse cuts the page between `head` and `tail`
+    padding = '<p>' + 'x' * PREFIX_PARSE_SIZE + '</p>'
+    return f"<html><body><div id=\"prices\">{head}{padding}{tail}</div></body></html>".encode('utf-8')
+
+def test_prefix_parse_finds_early_price():
+    page = build_page('<span>1.00</span>', '<span>2.00</span>')
+    assert PriceSelector(full_price_selector='#prices span').scrape_price(page) == 1.0
+
+@pytest.mark.parametrize('selector, head, tail', [
+    ('#prices span:last-of-type', '<span>1.00</span>', '<span>2.00</span>'),
+    ('#prices span:nth-last-child(1)', '<span>1.00</span>', '<span>2.00</span>'),
+    # jQuery pseudo class, only supported through PyQuery
+    ('#prices span:last', '<span>1.00</span>', '<span>2.00</span>')
+])
+def test_selectors_depending_on_later_content_parse_full_page(selector, head, tail):
+    price_selector = PriceSelector(full_price_selector=selector)
+    assert not price_selector.use_prefix_parse
+    assert price_selector.scrape_price(build_page(head, tail)) == 2.0
+
+@pytest.mark.parametrize('selector, use_prefix_parse', [
+    ('#prices span.price', True),
+    ('#prices span:first-of-type', True),
+    ('li:only-child > span', False),
+    ('div:has(> span.sale) > span', False),
+    ('#prices span:LAST-CHILD', False)
+])
+def test_prefix_parse_depends_on_selector(selector, use_prefix_parse):
+    assert PriceSelector(full_price_selector=selector).use_prefix_parse == use_prefix_parse
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+import requests
+from app.RetryScheduler import FetchError, RetryScheduler, parse_retry_after
+
+@pytest.fixture(autouse=True)
+def full_jitter(monkeypatch):
+    # jitter always picks the largest delay
+    monkeypatch.setattr('app.RetryScheduler.random.uniform', lambda low, high: high)
+
+@pytest.mark.parametrize('error', [FetchError('HTTP 429', 429), FetchError('HTTP 503', 503), FetchError('No response'), requests.ConnectionError(), requests.Timeout()])
+def test_transient_errors_are_retried(error):
+    assert RetryScheduler().next_delay(error, 1) == 1
+
+@pytest.mark.parametrize('error', [FetchError('HTTP 404', 404), FetchError('HTTP 403', 403), ValueError('No price found'), Exception()])
+def test_permanent_errors_are_not_retried(error):
+    assert RetryScheduler().next_delay(error, 1) is None
+
+def test_delay_grows_up_to_max_delay_and_max_tries():
+    retry_scheduler = RetryScheduler(max_tries=6, base_delay=1, max_delay=10)
+    error = FetchError('HTTP 503', 503)
+    assert [retry_scheduler.next_delay(error, attempt) for attempt in range(1, 7)] == [1, 2, 4, 8, 10, None]
+
+def test_retry_after_is_respected_up_to_max_delay():
+    retry_scheduler = RetryScheduler(max_delay=60)
+    assert retry_scheduler.next_delay(FetchError('HTTP 429', 429, retry_after=30), 1) == 30
+    # waiting longer than max_delay is not worth it
+    assert retry_scheduler.next_delay(FetchError('HTTP 429', 429, retry_after=120), 1) is None
+
+def test_retries_stop_when_budget_is_exhausted():
+    retry_scheduler = RetryScheduler(max_tries=10, retry_budget=5)
+    error = FetchError('HTTP 429', 429, retry_after=2)
+    assert [retry_scheduler.next_delay(error, 1) for _ in range(3)] == [2, 2, None]
+    assert retry_scheduler.remaining_budget == 1
+    retry_scheduler.reset()
+    assert retry_scheduler.next_delay(error, 1) == 2
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after(' 120 ') == 120
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert parse_retry_after(format_datetime(retry_at, usegmt=True)) == pytest.approx(90, abs=2)
+    # a date in the past means retry right away
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
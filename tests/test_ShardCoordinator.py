@@ -0,0 +1,91 @@
+import threading
+import pytest
+from model.Item import Item
+from model.ItemGroup import ItemGroup
+from model.PriceSelector import PriceSelector
+from shard.HashRing import HashRing
+from shard.MemoryShardQueue import MemoryShardQueue
+from shard.ShardCoordinator import ShardCoordinator
+
+class StubProcess(object):
+    def __init__(self, is_alive: bool):
+        self.name = 'stub-worker'
+        self.exitcode = None if is_alive else 1
+        self.alive = is_alive
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+def host_of_worker(worker_index: int) -> str:
+    hash_ring = HashRing(2)
+    return next(host for host in (f"shop{index}.example" for index in range(100)) if hash_ring.worker_for(host) == worker_index)
+
+def build_item_groups() -> list[ItemGroup]:
+    price_selector = PriceSelector(full_price_selector='span.price')
+    return [
+        ItemGroup('Group', [
+            Item('A', f"http://{host_of_worker(0)}/a", price_selector),
+            Item('B', f"http://{host_of_worker(1)}/b", price_selector),
+            Item('C', f"http://{host_of_worker(1)}/c", price_selector, price=5)
+        ]),
+        ItemGroup('Other', [Item('D', f"http://{host_of_worker(1)}/d", price_selector)])
+    ]
+
+def answer_tasks(shard_queue: MemoryShardQueue, worker_index: int, price: float) -> threading.Thread:
+    # stands in for a shard worker, every item gets `price`
+    def run():
+        while True:
+            task = shard_queue.get_task(worker_index, 5)
+            if task is None or task.get('stop', False):
+                return
+            for group_name, item_names in task['item_groups'].items():
+                items = [{'name': item_name, 'price': price, 'status': 'fetched', 'attempts': 1} for item_name in item_names]
+                shard_queue.put_result({'run_id': task['run_id'], 'worker_index': worker_index, 'group_name': group_name, 'items': items})
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+@pytest.fixture(autouse=True)
+def short_result_poll(monkeypatch):
+    monkeypatch.setattr('shard.ShardCoordinator.RESULT_POLL_TIMEOUT', 0.05)
+
+def test_results_are_merged(tmp_path):
+    shard_queue = MemoryShardQueue(2)
+    coordinator = ShardCoordinator(tmp_path.joinpath('config.yaml'), shard_queue, 2, local_workers=False)
+    threads = [answer_tasks(shard_queue, 0, 1.5), answer_tasks(shard_queue, 1, 2.5)]
+    item_groups = build_item_groups()
+    fetched_group_names = []
+    coordinator.fetch_all(item_groups, on_group_fetched=lambda item_group: fetched_group_names.append(item_group.group_name))
+    assert sorted(fetched_group_names) == ['Group', 'Other']
+    assert [(item.price, item.fetch_status) for item in item_groups[0].items] == [(1.5, 'fetched'), (2.5, 'fetched'), (5, 'hard_coded')]
+    assert item_groups[1].items[0].price == 2.5
+    for worker_index in range(2):
+        shard_queue.put_task(worker_index, {'stop': True})
+    for thread in threads:
+        thread.join()
+
+def test_missing_results_fail_after_timeout(tmp_path):
+    coordinator = ShardCoordinator(tmp_path.joinpath('config.yaml'), MemoryShardQueue(2), 2, local_workers=False, result_timeout=0.2)
+    item_groups = build_item_groups()
+    fetched_group_names = []
+    coordinator.fetch_all(item_groups, on_group_fetched=lambda item_group: fetched_group_names.append(item_group.group_name))
+    assert sorted(fetched_group_names) == ['Group', 'Other']
+    assert [item.fetch_status for item in item_groups[0].items] == ['failed', 'failed', 'hard_coded']
+
+def test_items_of_dead_worker_fail(tmp_path):
+    shard_queue = MemoryShardQueue(2)
+    coordinator = ShardCoordinator(tmp_path.joinpath('config.yaml'), shard_queue, 2)
+    # worker 0 died, worker 1 answers
+    coordinator.processes = [StubProcess(is_alive=False), StubProcess(is_alive=True)]
+    restarted_worker_indexes = []
+    def start_local_worker(worker_index: int) -> StubProcess:
+        restarted_worker_indexes.append(worker_index)
+        return StubProcess(is_alive=True)
+    coordinator._ShardCoordinator__start_local_worker = start_local_worker
+    thread = answer_tasks(shard_queue, 1, 2.5)
+    item_groups = build_item_groups()
+    coordinator.fetch_all(item_groups)
+    assert restarted_worker_indexes == [0]
+    assert [(item.price, item.fetch_status) for item in item_groups[0].items] == [(None, 'failed'), (2.5, 'fetched'), (5, 'hard_coded')]
+    shard_queue.put_task(1, {'stop': True})
+    thread.join()
@@ -0,0 +1,26 @@
+import time
+import pytest
+from shard.MemoryShardQueue import MemoryShardQueue
+from shard.SqliteShardQueue import SqliteShardQueue
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def shard_queue(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryShardQueue(2)
+    return SqliteShardQueue(tmp_path.joinpath('shard_queue.db'))
+
+def test_tasks_and_results_round_trip(shard_queue):
+    shard_queue.put_task(1, {'run_id': 'run', 'item_groups': {'Group': ['A']}})
+    shard_queue.put_task(1, {'stop': True})
+    assert shard_queue.get_task(0, 0.1) is None
+    assert shard_queue.get_task(1, 5) == {'run_id': 'run', 'item_groups': {'Group': ['A']}}
+    assert shard_queue.get_task(1, 5) == {'stop': True}
+    shard_queue.put_result({'run_id': 'run', 'worker_index': 1, 'group_name': 'Group', 'items': []})
+    assert shard_queue.get_result(5) == {'run_id': 'run', 'worker_index': 1, 'group_name': 'Group', 'items': []}
+    assert shard_queue.get_result(0.1) is None
+
+def test_expired_tasks_are_removed(tmp_path):
+    shard_queue = SqliteShardQueue(tmp_path.joinpath('shard_queue.db'), task_timeout=0.05)
+    shard_queue.put_task(0, {'stop': True})
+    time.sleep(0.1)
+    assert shard_queue.get_task(0, 0.1) is None
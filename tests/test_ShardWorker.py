@@ -0,0 +1,42 @@
+import os
+import pytest
+import yaml
+from fake_retailer_server import FakeRetailerServer
+from shard.MemoryShardQueue import MemoryShardQueue
+from shard.ShardWorker import ShardWorker
+
+INTEGER_SELECTOR = 'div#app div.product-price > ul > li.price-current > strong'
+TASK = {'run_id': 'run', 'item_groups': {'Group': ['A']}}
+
+@pytest.fixture
+def fake_server():
+    server = FakeRetailerServer(page_size=4 * 1024, latency=0)
+    server.start()
+    yield server
+    server.stop()
+
+def write_config(config_file, content: str) -> None:
+    config_file.write_text(content)
+    # the worker only reads the file again if its modification time changed
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+def run_task(worker: ShardWorker, shard_queue: MemoryShardQueue) -> dict:
+    worker._ShardWorker__run_task(TASK)
+    return shard_queue.get_result(5)
+
+def test_invalid_config_keeps_last_valid_config(tmp_path, fake_server):
+    config_file = tmp_path.joinpath('config.yaml')
+    write_config(config_file, yaml.safe_dump({
+        'price_selectors': [{'selector_name': 'selector', 'full_price_selector': INTEGER_SELECTOR}],
+        'item_groups': [{'group_name': 'Group', 'items': [{'name': 'A', 'url': f"http://127.0.0.1:{fake_server.port}/product/1", 'price_selector': 'selector'}]}]
+    }))
+    shard_queue = MemoryShardQueue(1)
+    worker = ShardWorker(config_file, shard_queue, 0)
+    assert run_task(worker, shard_queue)['items'][0]['status'] == 'fetched'
+    config = worker.config
+    write_config(config_file, 'item_groups: [')
+    assert run_task(worker, shard_queue)['items'][0]['status'] == 'fetched'
+    assert worker.config is config
+    assert worker.config_mtime == config_file.stat().st_mtime
+    worker.config.price_fetcher.close()
@@ -0,0 +1,21 @@
+from conftest import build_item_group
+from exporter.SqliteExporter import SqliteExporter
+
+def test_database_is_created_on_first_export(tmp_path):
+    database_file = tmp_path.joinpath('data', 'prices.db')
+    exporter = SqliteExporter(database_file)
+    assert not database_file.exists()
+    exporter.export_data([build_item_group('Group', {'A': 1})])
+    assert database_file.exists()
+    exporter.close()
+
+def test_latest_prices_skip_failed_fetches(tmp_path):
+    exporter = SqliteExporter(tmp_path.joinpath('prices.db'))
+    exporter.export_data([build_item_group('Group', {'A': 3, 'B': 5}), build_item_group('Other', {'A': 7})])
+    exporter.export_data([build_item_group('Group', {'A': 2, 'B': None})])
+    latest_prices = exporter.latest_prices('Group')
+    assert {item_name: price for item_name, (_, price) in latest_prices.items()} == {'A': 2, 'B': 5}
+    assert latest_prices['A'][0] > latest_prices['B'][0]
+    assert exporter.price_ranges('Group') == {'A': (2, 3), 'B': (5, 5)}
+    assert [price for _, price, _, _ in exporter.price_history('Group', 'B')] == [5, None]
+    exporter.close()